@@ -2,9 +2,12 @@ from flask import Flask
 from src.controllers.query_controller import query_bp
 from src.controllers.web_controller import web_bp
 from src.controllers.health_controller import health_bp
+from src.controllers.metrics_controller import metrics_bp
 from src.middlewares.error_handler import register_error_handlers
 from src.config.settings import API_PREFIX
 from src.controllers.tatva_controller import tatvaAI_bp
+from src.services.warmup_service import warmup_service
+from src.data_analysis_dckdb.sql_examples import sql_examples
 
 def create_app():
     app = Flask(__name__)
@@ -13,8 +16,15 @@ def create_app():
     app.register_blueprint(web_bp, url_prefix=API_PREFIX)
     app.register_blueprint(health_bp, url_prefix=API_PREFIX)
     app.register_blueprint(tatvaAI_bp, url_prefix=API_PREFIX)
+    # Scraped by Prometheus at the conventional path, outside the API prefix
+    app.register_blueprint(metrics_bp)
 
     register_error_handlers(app)
+
+    if warmup_service.enabled:
+        warmup_service.start()
+    # Loads past question/SQL pairs for few-shot prompts off the request path
+    sql_examples.start()
     return app
 
 if __name__ == "__main__":
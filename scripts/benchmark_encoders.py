@@ -0,0 +1,123 @@
+"""
+Benchmark query encoder backends and check their parity with existing indexes.
+
+For each backend reports load time, memory, single-query encode latency (p50/p99)
+and batch throughput. With a profile, also reports parity against that profile's
+built index: cosine similarity between the backend's chunk embeddings and the
+vectors stored in the index, and top-k overlap with the reference backend's
+retrieval for the profile's FAQ questions.
+
+Usage:
+    python -m scripts.benchmark_encoders plambo
+    python -m scripts.benchmark_encoders plambo --backends torch onnx-int8 --k 5
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from src.config.settings import EMBEDDING_BACKENDS
+from src.profiles.embedder import EmbeddingService
+from src.profiles.faq import load_faq
+from src.profiles.loader import VectorStoreLoader
+
+DEFAULT_QUERIES = [
+    "What services do you offer?",
+    "Where is the company based?",
+    "Who is the founder?",
+    "What are the warranty terms?",
+    "Do you provide long-term support?",
+]
+
+
+def sample_queries(profile_id: str) -> list:
+    """Questions from the profile's faq.txt, or a generic set"""
+    questions = [pair.question for pair in load_faq(profile_id)] if profile_id else []
+    if profile_id and not questions:
+        print(f"WARNING: no FAQ questions for profile '{profile_id}', timing the generic query set instead")
+    return questions or DEFAULT_QUERIES
+
+
+def measure_speed(service: EmbeddingService, queries: list, batch_size: int) -> dict:
+    service.model.encode(queries[:1])  # first call pays lazy initialisation
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        service.model.encode([query])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    batch = (queries * (batch_size // max(len(queries), 1) + 1))[:batch_size]
+    start = time.perf_counter()
+    service.model.encode(batch, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "load_seconds": service.load_time_seconds,
+        "memory_bytes": service.memory_bytes,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "throughput_per_second": len(batch) / elapsed if elapsed else 0.0,
+    }
+
+
+def measure_parity(service: EmbeddingService, store: VectorStoreLoader, queries: list,
+                   reference_ids: list, k: int) -> dict:
+    chunk_ids = list(store.metadata) if not isinstance(store.metadata, list) else list(range(len(store.metadata)))
+    texts = [store.metadata[i] for i in chunk_ids]
+    encoded = service.encode_documents(texts)
+    stored = np.vstack([store.index.reconstruct(int(i)) for i in chunk_ids])
+
+    def unit(matrix):
+        return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    cosines = np.sum(unit(encoded) * unit(stored), axis=1)
+    _, found = store.index.search(np.asarray(service.model.encode(queries), dtype="float32"), k)
+    overlap = [len(set(row) & set(ref)) / k for row, ref in zip(found.tolist(), reference_ids)]
+
+    return {
+        "index_cosine_mean": float(cosines.mean()),
+        "index_cosine_min": float(cosines.min()),
+        f"top{k}_overlap": float(np.mean(overlap)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument("profile", nargs="?", help="Profile whose index to check parity against")
+    parser.add_argument("--backends", nargs="+", default=list(EMBEDDING_BACKENDS))
+    parser.add_argument("--reference", default="torch", help="Backend the index was built with")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    args = parser.parse_args()
+
+    queries = sample_queries(args.profile)
+    store = VectorStoreLoader(args.profile) if args.profile else None
+    reference_ids = None
+    if store is not None:
+        reference = EmbeddingService(args.reference)
+        k = min(args.k, store.index.ntotal)
+        reference_ids = store.index.search(np.asarray(reference.model.encode(queries), dtype="float32"), k)[1].tolist()
+
+    results = {}
+    for backend in args.backends:
+        service = EmbeddingService(backend)
+        try:
+            result = measure_speed(service, queries, args.batch_size)
+            if store is not None:
+                result.update(measure_parity(service, store, queries, reference_ids, k))
+        except Exception as e:
+            result = {"error": str(e)}
+        results[backend] = result
+        print(f"{backend}: {json.dumps(result, indent=2)}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"profile": args.profile, "queries": len(queries), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
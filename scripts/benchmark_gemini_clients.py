@@ -0,0 +1,119 @@
+"""
+Per-call setup overhead of Gemini clients: a new genai.Client per prompt
+(what AnalyticalFilter used to do) vs the long-lived GeminiClientPool.
+
+Each mode sends the same prompts and reports client construction time, call
+latency and how many TCP connections the server saw. By default the calls go
+to the local fake Gemini server (scripts/fake_gemini.py); pass --real to use
+the Google endpoint with GEMINI_API_KEYS, where TLS handshakes make the gap
+larger.
+
+Usage:
+    python -m scripts.benchmark_gemini_clients --calls 50
+    GEMINI_API_KEYS=... python -m scripts.benchmark_gemini_clients --real --calls 10
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+from google import genai
+from google.genai import types
+
+from src.config.settings import GEMINI_API_KEYS
+from src.data_analysis_dckdb.gemini_pool import GeminiClientPool
+from scripts.fake_gemini import FakeGeminiHandler, start_fake_gemini
+
+MODEL = "gemini-2.5-flash"
+PROMPT = "Generate a DuckDB query for: total amount by brand. Columns: ['brand', 'amount']"
+
+
+def _call(client: genai.Client) -> str:
+    return "".join(chunk.text or "" for chunk in client.models.generate_content_stream(
+        model=MODEL,
+        contents=[types.Content(role="user", parts=[types.Part.from_text(text=PROMPT)])],
+    ))
+
+
+def run_per_call(api_keys, base_url, calls: int) -> dict:
+    setup, latency = [], []
+    http_options = types.HttpOptions(base_url=base_url) if base_url else None
+    for i in range(calls):
+        start = time.perf_counter()
+        client = genai.Client(api_key=api_keys[i % len(api_keys)], http_options=http_options)
+        built = time.perf_counter()
+        _call(client)
+        done = time.perf_counter()
+        setup.append(built - start)
+        latency.append(done - start)
+    return {"setup": setup, "latency": latency}
+
+
+def run_pooled(api_keys, base_url, calls: int) -> dict:
+    pool = GeminiClientPool(api_keys=api_keys, base_url=base_url)
+    latency = []
+    try:
+        for _ in range(calls):
+            start = time.perf_counter()
+            with pool.client() as client:
+                _call(client)
+            latency.append(time.perf_counter() - start)
+    finally:
+        pool.close()
+    return {"setup": [0.0] * calls, "latency": latency, "clients_created": pool.clients_created}
+
+
+def summarize(samples: dict, connections: int = None) -> dict:
+    setup_ms = np.array(samples["setup"]) * 1000
+    latency_ms = np.array(samples["latency"]) * 1000
+    summary = {
+        "setup_ms_avg": float(setup_ms.mean()),
+        "latency_ms_p50": float(np.percentile(latency_ms, 50)),
+        "latency_ms_p95": float(np.percentile(latency_ms, 95)),
+        "latency_ms_avg": float(latency_ms.mean()),
+    }
+    if "clients_created" in samples:
+        summary["clients_created"] = samples["clients_created"]
+    if connections is not None:
+        summary["connections_opened"] = connections
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gemini client setup overhead: per-call vs pooled")
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--keys", type=int, default=2, help="Fake API keys to rotate over (fake server only)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Fake server latency per call")
+    parser.add_argument("--real", action="store_true", help="Call the Google endpoint with GEMINI_API_KEYS")
+    args = parser.parse_args()
+
+    server = None
+    if args.real:
+        if not GEMINI_API_KEYS:
+            parser.error("--real needs GEMINI_API_KEYS")
+        api_keys, base_url = GEMINI_API_KEYS, None
+    else:
+        FakeGeminiHandler.latency_ms = args.latency_ms
+        server = start_fake_gemini()
+        api_keys = [f"fake-key-{i}" for i in range(max(1, args.keys))]
+        base_url = "http://%s:%d" % server.server_address
+
+    results = {}
+    try:
+        for mode, run in (("per_call_client", run_per_call), ("pooled", run_pooled)):
+            opened_before = FakeGeminiHandler.connections
+            samples = run(api_keys, base_url, args.calls)
+            connections = FakeGeminiHandler.connections - opened_before if server else None
+            results[mode] = summarize(samples, connections)
+            print(f"{mode}: {json.dumps(results[mode], indent=2)}")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    saved = results["per_call_client"]["latency_ms_avg"] - results["pooled"]["latency_ms_avg"]
+    print(f"Per-call overhead removed by pooling: {saved:.1f} ms/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Quota behaviour of GeminiScheduler against the local fake Gemini server.
+
+The fake enforces a per-key request quota over a short window (429 with
+Retry-After past it) and can fail every Nth request with 503. A burst of
+concurrent prompts is sent two ways:
+  - naive: least-used key, no quota tracking, no retries (errors surface)
+  - scheduled: GeminiScheduler with token buckets matching the fake's quota
+and per mode it reports completed calls, errors, 429s seen by the server,
+retries, wall time and per-key utilization.
+
+Usage:
+    python -m scripts.benchmark_gemini_quota
+    python -m scripts.benchmark_gemini_quota --keys 3 --rpm-per-key 5 --window-seconds 2 --calls 40 --fail-every 15
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google.genai import types
+
+from src.data_analysis_dckdb.gemini_pool import GeminiClientPool
+from src.data_analysis_dckdb.gemini_scheduler import GeminiScheduler
+from scripts.fake_gemini import FakeGeminiHandler, start_fake_gemini
+
+MODEL = "gemini-2.5-flash"
+PROMPT = "Generate a DuckDB query for: total amount by brand. Columns: ['brand', 'amount']"
+CONTENTS = [types.Content(role="user", parts=[types.Part.from_text(text=PROMPT)])]
+
+
+def _reset_fake():
+    FakeGeminiHandler.requests = FakeGeminiHandler.throttled = FakeGeminiHandler.failed = 0
+    FakeGeminiHandler.per_key = {}
+
+
+def _burst(call, calls: int, concurrency: int) -> dict:
+    def run(_):
+        try:
+            call()
+            return None
+        except Exception as e:
+            return f"{e.__class__.__name__}: {getattr(e, 'code', '')}"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(run, range(calls)))
+    errors = [o for o in outcomes if o]
+    return {
+        "completed": calls - len(errors),
+        "errors": len(errors),
+        "error_kinds": sorted(set(errors)),
+        "server_429s": FakeGeminiHandler.throttled,
+        "server_503s": FakeGeminiHandler.failed,
+        "wall_seconds": time.perf_counter() - start,
+    }
+
+
+def run_naive(api_keys, base_url, args) -> dict:
+    pool = GeminiClientPool(api_keys=api_keys, base_url=base_url)
+
+    def call():
+        with pool.client() as client:
+            return "".join(c.text or "" for c in client.models.generate_content_stream(model=MODEL, contents=CONTENTS))
+
+    try:
+        return _burst(call, args.calls, args.concurrency)
+    finally:
+        pool.close()
+
+
+def run_scheduled(api_keys, base_url, args) -> dict:
+    pool = GeminiClientPool(api_keys=api_keys, base_url=base_url)
+    scheduler = GeminiScheduler(pool=pool, rpm=args.rpm_per_key, tpm=0, rpd=0, window_seconds=args.window_seconds,
+                                backoff_base=0.05, backoff_max=0.5, queue_timeout=args.calls * args.window_seconds)
+    try:
+        result = _burst(lambda: scheduler.generate(MODEL, CONTENTS, None, prompt_text=PROMPT),
+                        args.calls, args.concurrency)
+        stats = scheduler.stats()
+        result.update(retries=stats["retries"], queued=stats["queued"], wait_ms_avg=stats["wait_ms_avg"],
+                      calls_per_key={label: key["calls"] for label, key in pool.stats()["per_key"].items()},
+                      per_key=stats["per_key"])
+        return result
+    finally:
+        pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GeminiScheduler quota handling against a fake Gemini server")
+    parser.add_argument("--keys", type=int, default=3)
+    parser.add_argument("--rpm-per-key", type=int, default=5, help="Fake quota: requests per window per key")
+    parser.add_argument("--window-seconds", type=float, default=2.0)
+    parser.add_argument("--fail-every", type=int, default=15, help="Fake returns 503 on every Nth request")
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    FakeGeminiHandler.latency_ms = args.latency_ms
+    FakeGeminiHandler.rpm_per_key = args.rpm_per_key
+    FakeGeminiHandler.window_seconds = args.window_seconds
+    FakeGeminiHandler.fail_every = args.fail_every
+    server = start_fake_gemini()
+    base_url = "http://%s:%d" % server.server_address
+    api_keys = [f"fake-key-{i}" for i in range(max(1, args.keys))]
+
+    try:
+        for mode, run in (("naive", run_naive), ("scheduled", run_scheduled)):
+            _reset_fake()
+            print(f"{mode}: {json.dumps(run(api_keys, base_url, args), indent=2)}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
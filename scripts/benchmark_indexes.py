@@ -0,0 +1,125 @@
+"""
+Compare FAISS index types against the exact flat baseline.
+
+Reports recall@k, p50/p99 single-query search latency, build time and memory per index.
+
+Usage:
+    python -m scripts.benchmark_indexes plambo
+    python -m scripts.benchmark_indexes --synthetic 200000 --queries 500
+    python -m scripts.benchmark_indexes --synthetic 50000 --spec '{"type": "ivf", "nlist": 512, "nprobe": 32}'
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from src.config.settings import CLIENTS, EMBEDDING_DIMENSION
+from src.profiles.index_builder import IndexBuilder, EmbeddingCache
+from src.profiles.index_factory import (
+    INDEX_DEFAULTS, build_index, index_memory_bytes, min_training_points, resolve_spec
+)
+
+
+def synthetic_vectors(count: int, dimension: int, seed: int = 7) -> np.ndarray:
+    """Clustered unit vectors roughly shaped like sentence embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, count // 500), dimension)).astype("float32")
+    vectors = centers[rng.integers(0, len(centers), count)] + 0.6 * rng.normal(size=(count, dimension))
+    vectors = vectors.astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def profile_vectors(profile_id: str) -> np.ndarray:
+    """Embeddings of the profile's chunks (served from the builder's embedding cache)"""
+    cache = EmbeddingCache()
+    try:
+        builder = IndexBuilder(profile_id, cache=cache)
+        chunks = builder.collect_chunks()
+        vectors, _ = builder._embed(list(chunks), chunks)
+        return vectors
+    finally:
+        cache.close()
+
+
+def make_queries(vectors: np.ndarray, count: int, seed: int = 11) -> np.ndarray:
+    """Perturbed corpus vectors used as queries"""
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.integers(0, len(vectors), count)] + 0.05 * rng.normal(size=(count, vectors.shape[1]))
+    queries = queries.astype("float32")
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def benchmark(spec: dict, vectors: np.ndarray, queries: np.ndarray, k: int, truth: np.ndarray) -> dict:
+    ids = np.arange(len(vectors), dtype="int64")
+    start = time.perf_counter()
+    index = build_index(spec, vectors, ids)
+    build_seconds = time.perf_counter() - start
+
+    latencies = []
+    found = np.empty((len(queries), k), dtype="int64")
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, result = index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found[i] = result[0]
+
+    recall = np.mean([len(set(found[i]) & set(truth[i])) / k for i in range(len(queries))])
+    return {
+        "spec": spec,
+        "recall_at_k": float(recall),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "build_seconds": build_seconds,
+        "memory_bytes": index_memory_bytes(index),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types")
+    parser.add_argument("profile", nargs="?", help="Profile whose chunks to index")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead of a profile")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--spec", action="append", default=[], help="Index spec as JSON (repeatable)")
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        vectors = synthetic_vectors(args.synthetic, EMBEDDING_DIMENSION)
+    elif args.profile:
+        vectors = profile_vectors(args.profile)
+    else:
+        parser.error("Give a profile id or --synthetic N")
+
+    specs = [json.loads(s) for s in args.spec] or [{"type": t} for t in INDEX_DEFAULTS]
+    if args.profile and CLIENTS[args.profile].get("index") not in specs:
+        specs.append(CLIENTS[args.profile]["index"])
+
+    k = min(args.k, len(vectors))
+    queries = make_queries(vectors, args.queries)
+    truth = build_index({"type": "flat"}, vectors, np.arange(len(vectors), dtype="int64")).search(queries, k)[1]
+
+    print(f"{len(vectors)} vectors, {len(queries)} queries, k={k}")
+    print(f"{'index':<44} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8} {'MB':>8}")
+    results = []
+    for spec in map(resolve_spec, specs):
+        label = " ".join([spec["type"]] + [f"{name}={value}" for name, value in spec.items() if name != "type"])
+        if len(vectors) < min_training_points(spec):
+            print(f"{label:<44} skipped: needs {min_training_points(spec)} vectors to train")
+            continue
+        result = benchmark(spec, vectors, queries, k, truth)
+        results.append(result)
+        print(
+            f"{label:<44} {result['recall_at_k']:>9.3f} {result['p50_ms']:>8.3f} {result['p99_ms']:>8.3f} "
+            f"{result['build_seconds']:>8.2f} {result['memory_bytes'] / (1024 * 1024):>8.1f}"
+        )
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"vectors": len(vectors), "queries": len(queries), "k": k, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark prompt evaluation cost of the RAG prompt layouts against a running Ollama.
+
+"legacy" sends the old single-string prompt (system contract formatted inline
+with per-call indentation) to /api/generate; "chat" sends the current layout,
+the cached per-profile system message followed by the query, to /api/chat.
+Each layout runs its queries back to back so Ollama can reuse the prompt
+prefix from the previous request. Reports prompt tokens, prompt-eval time and
+end-to-end latency from Ollama's own timings.
+
+Usage:
+    python -m scripts.benchmark_prompts plambo
+    python -m scripts.benchmark_prompts plambo --rounds 3 --num-predict 32 --json prompts.json
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from src.config.settings import LLM_KEEP_ALIVE, LLM_TEMPERATURE, CLIENTS
+from src.llm.processor import SYSTEM_CONTRACT, llm_processor
+from src.profiles.loader import VectorStoreLoader
+from scripts.benchmark_encoders import sample_queries
+
+
+def legacy_prompt(query: str, context: str, profile_id: str) -> str:
+    """The prompt layout used before the chat/system split"""
+    system_rules = SYSTEM_CONTRACT.format(profile_id=profile_id)
+    return f"""<system_contract>
+                {system_rules}
+                </system_contract>
+
+                CONTEXT FROM KNOWLEDGE BASE:
+                {context}
+                QUESTION: {query}
+
+                ANSWER (using ONLY the context above, following the system contract):"""
+
+
+def run_layout(layout: str, profile_id: str, store: VectorStoreLoader, queries: list, num_predict: int) -> list:
+    options = {"temperature": LLM_TEMPERATURE, "num_predict": num_predict}
+    samples = []
+    for query in queries:
+        context = llm_processor._build_context_string(store.retrieve(query))
+        if layout == "legacy":
+            path = "/api/generate"
+            payload = {"model": llm_processor.model, "prompt": legacy_prompt(query, context, profile_id),
+                       "stream": False, "keep_alive": LLM_KEEP_ALIVE, "options": options}
+        else:
+            path = "/api/chat"
+            payload = llm_processor._chat_payload(llm_processor._build_messages(query, context, profile_id))
+            payload["options"] = options
+
+        start = time.perf_counter()
+        response = llm_processor.client.post(path, payload, timeout=600)
+        response.raise_for_status()
+        body = response.json()
+        samples.append({
+            "prompt_tokens": body.get("prompt_eval_count", 0),
+            "prompt_eval_ms": body.get("prompt_eval_duration", 0) / 1e6,
+            "total_ms": (time.perf_counter() - start) * 1000,
+        })
+    return samples
+
+
+def summarize(samples: list) -> dict:
+    def column(name):
+        return np.array([s[name] for s in samples], dtype="float64")
+
+    return {
+        "requests": len(samples),
+        "prompt_tokens_avg": float(column("prompt_tokens").mean()),
+        "prompt_eval_ms_avg": float(column("prompt_eval_ms").mean()),
+        "prompt_eval_ms_p50": float(np.percentile(column("prompt_eval_ms"), 50)),
+        "total_ms_p50": float(np.percentile(column("total_ms"), 50)),
+        "total_ms_p99": float(np.percentile(column("total_ms"), 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prompt-eval time of the RAG prompt layouts")
+    parser.add_argument("profile", choices=sorted(CLIENTS))
+    parser.add_argument("--layouts", nargs="+", default=["legacy", "chat"], choices=["legacy", "chat"])
+    parser.add_argument("--rounds", type=int, default=2, help="Passes over the query set per layout")
+    parser.add_argument("--num-predict", type=int, default=32, help="Cap generated tokens to keep runs short")
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    args = parser.parse_args()
+
+    store = VectorStoreLoader(args.profile)
+    queries = sample_queries(args.profile) * args.rounds
+    llm_processor.warm_up()
+
+    results = {}
+    for layout in args.layouts:
+        # The first request of a layout pays for a cold prefix; it is measured separately
+        samples = run_layout(layout, args.profile, store, queries, args.num_predict)
+        results[layout] = {"first": samples[0], "steady": summarize(samples[1:] or samples)}
+        print(f"{layout}: {json.dumps(results[layout], indent=2)}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"profile": args.profile, "model": llm_processor.model, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Golden-set benchmark of the RAG pipeline, built from each client's faq.txt.
+
+Every FAQ question is run through retrieval (VectorStoreLoader.search and the
+context packer, as QueryService does) and LLMProcessor.process_query. Caches
+and request coalescing are bypassed. Per client it reports:
+  - recall@k: share of questions whose curated answer is in a retrieved chunk
+  - context tokens sent to the LLM (estimated)
+  - end-to-end latency percentiles and throughput
+
+By default the LLM is a fake Ollama server started in-process with fixed
+per-token costs, so timings are deterministic and runs can be compared; pass
+--ollama-url to benchmark against a real Ollama instead. Indexes must be
+built first (python -m scripts.build_indexes).
+
+A client with no golden questions (no faq.txt, or one that yields no Q/A
+pairs) or whose run failed has no numbers; it is listed under "skipped" in
+the output and the benchmark exits with status 1.
+
+Usage:
+    python -m scripts.benchmark_rag
+    python -m scripts.benchmark_rag plambo --concurrency 4 --json runs/after.json --compare runs/before.json
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from src.config.settings import (
+    CLIENTS, TOP_K_DOCUMENTS, HYBRID_RETRIEVAL, CONTEXT_TOKEN_BUDGET, EMBEDDING_BACKEND
+)
+from src.llm.context_packer import context_packer, count_tokens
+from src.llm.ollama_client import OllamaClient
+from src.llm.processor import llm_processor
+from src.profiles.faq import load_faq
+from src.profiles.loader import VectorStoreLoader
+from scripts.fake_ollama import start_fake_ollama
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def run_question(profile_id: str, store: VectorStoreLoader, question: str, answer: str, k: int) -> dict:
+    start = time.perf_counter()
+    retrieval = store.search(question, k)
+    packed = context_packer.pack(profile_id, store, retrieval)
+    reply = llm_processor.process_query(question, packed.documents, profile_id)
+    elapsed = time.perf_counter() - start
+
+    expected = _normalize(answer)
+    return {
+        "hit": any(expected in _normalize(text) for text, _ in retrieval.documents),
+        "context_tokens": sum(count_tokens(text) for text, _ in packed.documents),
+        "latency_ms": elapsed * 1000,
+        "error": reply.startswith("ERROR:"),
+    }
+
+
+def benchmark_profile(profile_id: str, k: int, concurrency: int) -> dict:
+    golden = load_faq(profile_id)
+    if not golden:
+        return {"error": "no golden questions: faq.txt is missing or yields no Q/A pairs"}
+    store = VectorStoreLoader(profile_id)
+    run_question(profile_id, store, golden[0].question, golden[0].answer, k)  # warm the encoder and connection
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        samples = list(executor.map(lambda pair: run_question(profile_id, store, pair.question, pair.answer, k), golden))
+    wall = time.perf_counter() - start
+
+    latencies = np.array([s["latency_ms"] for s in samples])
+    tokens = np.array([s["context_tokens"] for s in samples])
+    return {
+        "questions": len(samples),
+        f"recall@{k}": float(np.mean([s["hit"] for s in samples])),
+        "llm_errors": int(sum(s["error"] for s in samples)),
+        "context_tokens_avg": float(tokens.mean()),
+        "context_tokens_max": int(tokens.max()),
+        "latency_ms_p50": float(np.percentile(latencies, 50)),
+        "latency_ms_p95": float(np.percentile(latencies, 95)),
+        "latency_ms_p99": float(np.percentile(latencies, 99)),
+        "throughput_qps": len(samples) / wall if wall else 0.0,
+    }
+
+
+def compare(results: dict, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    for profile_id, result in results.items():
+        before = baseline.get(profile_id, {})
+        for metric, value in result.items():
+            if isinstance(value, (int, float)) and isinstance(before.get(metric), (int, float)):
+                print(f"  {profile_id} {metric}: {before[metric]:.3f} -> {value:.3f} ({value - before[metric]:+.3f})")
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Golden-set RAG benchmark from faq.txt")
+    parser.add_argument("profiles", nargs="*", help="Profile ids to benchmark (default: all)")
+    parser.add_argument("--k", type=int, default=TOP_K_DOCUMENTS)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--ollama-url", help="Use this Ollama instead of the in-process fake")
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    parser.add_argument("--compare", help="Earlier --json output to print deltas against")
+    args = parser.parse_args()
+
+    server = None
+    if args.ollama_url:
+        llm_processor.client = OllamaClient(args.ollama_url)
+    else:
+        server = start_fake_ollama()
+        llm_processor.client = OllamaClient("http://%s:%d" % server.server_address)
+
+    results = {}
+    try:
+        for profile_id in args.profiles or sorted(CLIENTS):
+            try:
+                results[profile_id] = benchmark_profile(profile_id, args.k, args.concurrency)
+            except Exception as e:
+                results[profile_id] = {"error": str(e)}
+            print(f"{profile_id}: {json.dumps(results[profile_id], indent=2)}")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    skipped = {profile_id: result["error"] for profile_id, result in results.items() if "error" in result}
+    for profile_id, reason in skipped.items():
+        print(f"WARNING: no recall, latency or throughput numbers for {profile_id}: {reason}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "run_at": datetime.now().isoformat(timespec="seconds"),
+                "revision": _git_revision(),
+                "llm": args.ollama_url or "fake",
+                "settings": {
+                    "k": args.k, "concurrency": args.concurrency, "hybrid": HYBRID_RETRIEVAL,
+                    "context_token_budget": CONTEXT_TOKEN_BUDGET, "embedding_backend": EMBEDDING_BACKEND,
+                },
+                "results": results,
+                "skipped": skipped,
+            }, f, indent=2)
+
+    if skipped:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
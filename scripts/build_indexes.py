@@ -0,0 +1,50 @@
+"""
+Build or incrementally update the FAISS vector stores for client profiles.
+
+Usage:
+    python -m scripts.build_indexes              # all profiles in CLIENTS
+    python -m scripts.build_indexes plambo       # selected profiles
+    python -m scripts.build_indexes --force      # ignore manifests and re-index from scratch
+"""
+
+import argparse
+import sys
+
+from src.config.settings import CLIENTS
+from src.profiles.index_builder import IndexBuilder, EmbeddingCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build knowledge-base vector stores")
+    parser.add_argument("profiles", nargs="*", help="Profile ids to build (default: all)")
+    parser.add_argument("--force", action="store_true", help="Rebuild the index from scratch")
+    args = parser.parse_args()
+
+    profiles = args.profiles or sorted(CLIENTS)
+    cache = EmbeddingCache()
+    failed = []
+    try:
+        for profile_id in profiles:
+            try:
+                summary = IndexBuilder(profile_id, cache=cache).build(force=args.force)
+            except Exception as e:
+                # One broken profile (missing data dir, bad spec) must not stop the others
+                print(f"{profile_id}: FAILED - {e.__class__.__name__}: {e}")
+                failed.append(profile_id)
+                continue
+            print(
+                f"{profile_id}: v{summary['version']} "
+                f"+{summary['added']} -{summary['removed']} ={summary['unchanged']} "
+                f"(embedded {summary['embedded']}, total {summary['total']}) "
+                f"in {summary['elapsed_ms']:.1f} ms"
+            )
+    finally:
+        cache.close()
+
+    if failed:
+        print(f"{len(failed)} of {len(profiles)} profiles failed: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
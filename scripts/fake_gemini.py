@@ -0,0 +1,147 @@
+"""
+Local stand-in for the Gemini generateContent API, for benchmarks.
+
+Serves models/{model}:generateContent and :streamGenerateContent (SSE) with a
+fixed latency and a canned JSON answer shaped like get_sql_query output.
+Point a client at it with http_options base_url (GEMINI_BASE_URL).
+New TCP connections are counted so connection reuse can be checked.
+
+Quota errors can be simulated: with rpm_per_key set, a key making more than
+that many requests in a sliding window gets 429 RESOURCE_EXHAUSTED with a
+Retry-After header, and fail_every returns 503 on every Nth request.
+
+Usage:
+    python -m scripts.fake_gemini --port 11600
+    python -m scripts.fake_gemini --rpm-per-key 10 --fail-every 20
+    GEMINI_BASE_URL=http://127.0.0.1:11600 GEMINI_API_KEYS=fake-a,fake-b python app.py
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_ANSWER = json.dumps({
+    "preface": "You want the total amount for each brand.",
+    "Title": "Amount by Brand",
+    "X-axis": "brand",
+    "Y-axis": "total_amount",
+    "sql_query": "select brand, round(sum(amount), 2) as total_amount from parquet_data group by brand;",
+    "Possible_charts": ["bar", "table"],
+    "col_list": ["brand", "amount"],
+})
+
+_PATH_PATTERN = re.compile(r"^/[^/]+/models/(?P<model>[^:/]+):(?P<method>generateContent|streamGenerateContent)")
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency_ms = 20.0
+    rpm_per_key = 0  # 0 = no quota
+    window_seconds = 60.0
+    fail_every = 0  # 0 = never fail
+    connections = 0
+    requests = 0
+    throttled = 0
+    failed = 0
+    per_key = {}  # api key -> request times in the current window
+    _lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with FakeGeminiHandler._lock:
+            FakeGeminiHandler.connections += 1
+
+    def _send(self, status: int, content_type: str, data: bytes, headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        match = _PATH_PATTERN.match(self.path)
+        if not match:
+            self._send(404, "application/json", b'{"error": {"code": 404, "status": "NOT_FOUND"}}')
+            return
+        error = self._injected_error()
+        if error:
+            self._send(*error)
+            return
+
+        prompt = " ".join(part.get("text", "") for content in request.get("contents", [])
+                          for part in content.get("parts", []))
+        time.sleep(self.latency_ms / 1000)
+        prompt_tokens, answer_tokens = len(prompt) // 4, len(CANNED_ANSWER) // 4
+        body = {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": CANNED_ANSWER}]}, "finishReason": "STOP"}],
+            "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": answer_tokens,
+                              "totalTokenCount": prompt_tokens + answer_tokens},
+            "modelVersion": match.group("model"),
+        }
+        if match.group("method") == "streamGenerateContent":
+            self._send(200, "text/event-stream", f"data: {json.dumps(body)}\r\n\r\n".encode())
+        else:
+            self._send(200, "application/json", json.dumps(body).encode())
+
+    def _injected_error(self):
+        """(status, content type, body, headers) for a simulated failure, or None"""
+        now = time.monotonic()
+        cls = FakeGeminiHandler
+        with cls._lock:
+            cls.requests += 1
+            if cls.fail_every and cls.requests % cls.fail_every == 0:
+                cls.failed += 1
+                body = {"error": {"code": 503, "message": "The model is overloaded.", "status": "UNAVAILABLE"}}
+                return 503, "application/json", json.dumps(body).encode(), None
+            if not cls.rpm_per_key:
+                return None
+            api_key = self.headers.get("x-goog-api-key", "")
+            window = [t for t in cls.per_key.get(api_key, []) if now - t < cls.window_seconds]
+            if len(window) >= cls.rpm_per_key:
+                cls.throttled += 1
+                retry_after = max(1, int(cls.window_seconds - (now - window[0])) + 1)
+                body = {"error": {"code": 429, "message": "Quota exceeded.", "status": "RESOURCE_EXHAUSTED"}}
+                return 429, "application/json", json.dumps(body).encode(), {"Retry-After": str(retry_after)}
+            window.append(now)
+            cls.per_key[api_key] = window
+        return None
+
+
+def start_fake_gemini(port: int = 0, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve in a daemon thread; port 0 picks a free one (see server.server_address)"""
+    server = ThreadingHTTPServer((host, port), FakeGeminiHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-gemini", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake Gemini API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11600)
+    parser.add_argument("--latency-ms", type=float, default=FakeGeminiHandler.latency_ms)
+    parser.add_argument("--rpm-per-key", type=int, default=0, help="Requests per window per key before 429s")
+    parser.add_argument("--window-seconds", type=float, default=FakeGeminiHandler.window_seconds)
+    parser.add_argument("--fail-every", type=int, default=0, help="Return 503 on every Nth request")
+    args = parser.parse_args()
+
+    FakeGeminiHandler.latency_ms = args.latency_ms
+    FakeGeminiHandler.rpm_per_key = args.rpm_per_key
+    FakeGeminiHandler.window_seconds = args.window_seconds
+    FakeGeminiHandler.fail_every = args.fail_every
+    server = ThreadingHTTPServer((args.host, args.port), FakeGeminiHandler)
+    print(f"Fake Gemini listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Deterministic stand-in for the Ollama HTTP API, for benchmarks.
+
+Serves /api/chat and /api/generate (streaming and not). Each call sleeps for
+a fixed cost plus a per-token cost for the prompt and the answer, so latency
+depends only on prompt size, and reports the same prompt_eval/eval fields as
+Ollama. The answer is built from the first retrieved source in the prompt.
+
+Usage:
+    python -m scripts.fake_ollama --port 11500
+    OLLAMA_BASE_URL=http://127.0.0.1:11500 python app.py
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_TOKEN = 4
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _answer_for(prompt: str) -> str:
+    """First sentence of the first retrieved source, as a bullet"""
+    match = re.search(r"\[Source 1\][^\n]*\n-+\n(.+?)(?:\n|$)", prompt)
+    if not match:
+        return "- The provided context does not contain information about this."
+    text = re.sub(r"^(Q:.*?\s+A:\s*)", "", match.group(1).strip())
+    return "- " + re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    base_ms = 5.0
+    prompt_ms_per_token = 0.05
+    eval_ms_per_token = 1.0
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_chunk(self, body: dict):
+        data = (json.dumps(body) + "\n").encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_POST(self):
+        if self.path not in ("/api/chat", "/api/generate"):
+            self.send_error(404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        chat = self.path == "/api/chat"
+        prompt = "\n".join(m.get("content", "") for m in request.get("messages", [])) if chat else request.get("prompt", "")
+
+        if not prompt:
+            # Model load request (warm-up)
+            self._send_json({"model": request.get("model"), "done": True, "done_reason": "load"})
+            return
+
+        answer = _answer_for(prompt)
+        prompt_tokens, answer_tokens = _tokens(prompt), _tokens(answer)
+        prompt_seconds = (self.base_ms + prompt_tokens * self.prompt_ms_per_token) / 1000
+        eval_seconds = answer_tokens * self.eval_ms_per_token / 1000
+        timings = {
+            "done": True,
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prompt_seconds * 1e9),
+            "eval_count": answer_tokens,
+            "eval_duration": int(eval_seconds * 1e9),
+        }
+
+        def piece(text: str) -> dict:
+            return {"message": {"role": "assistant", "content": text}} if chat else {"response": text}
+
+        time.sleep(prompt_seconds)
+        if not request.get("stream", True):
+            time.sleep(eval_seconds)
+            self._send_json({"model": request.get("model"), **piece(answer), **timings})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = answer.split(" ")
+        for i, word in enumerate(words):
+            time.sleep(eval_seconds / len(words))
+            self._send_chunk({"model": request.get("model"), **piece(word if i == 0 else " " + word), "done": False})
+        self._send_chunk({"model": request.get("model"), **piece(""), **timings})
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def start_fake_ollama(port: int = 0, host: str = "127.0.0.1", handler=FakeOllamaHandler) -> ThreadingHTTPServer:
+    """Serve in a daemon thread; port 0 picks a free one (see server.server_address)"""
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-ollama", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic fake Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--base-ms", type=float, default=FakeOllamaHandler.base_ms)
+    parser.add_argument("--prompt-ms-per-token", type=float, default=FakeOllamaHandler.prompt_ms_per_token)
+    parser.add_argument("--eval-ms-per-token", type=float, default=FakeOllamaHandler.eval_ms_per_token)
+    args = parser.parse_args()
+
+    FakeOllamaHandler.base_ms = args.base_ms
+    FakeOllamaHandler.prompt_ms_per_token = args.prompt_ms_per_token
+    FakeOllamaHandler.eval_ms_per_token = args.eval_ms_per_token
+    server = ThreadingHTTPServer((args.host, args.port), FakeOllamaHandler)
+    print(f"Fake Ollama listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
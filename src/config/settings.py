@@ -9,6 +9,13 @@ from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).parent.parent
 
+# Each client may declare an "index" spec used by scripts.build_indexes:
+#   {"type": "flat"}                                          exact search (default)
+#   {"type": "ivf", "nlist": 256, "nprobe": 16}                inverted file
+#   {"type": "hnsw", "M": 32, "efConstruction": 80, "efSearch": 64}
+#   {"type": "pq", "nlist": 256, "m": 48, "nbits": 8, "nprobe": 16}   IVF + product quantization
+# Corpora too small to train IVF/PQ are indexed flat until they grow.
+# A client may also set "context_token_budget" to override CONTEXT_TOKEN_BUDGET.
 CLIENTS = {
     # "vyakhyan": {
     #     "name": "Vyakhyan",
@@ -28,7 +35,12 @@ CLIENTS = {
         "name": "Plambo",
         "data_dir": "src/data/plambo",
         "vector_store_path": "src/vector_stores/plambo_index.faiss",
-        "metadata_path": "src/vector_stores/plambo_metadata.pkl"
+        "metadata_path": "src/vector_stores/plambo_metadata.pkl",
+        "chunk_store_path": "src/vector_stores/plambo_chunks.bin",
+        "bm25_path": "src/vector_stores/plambo_bm25.npz",
+        "manifest_path": "src/vector_stores/plambo_manifest.json",
+        "faq_index_path": "src/vector_stores/plambo_faq.npz",
+        "index": {"type": "flat"}
     },
 
     # "client_a":{
@@ -47,23 +59,38 @@ CLIENTS = {
 
     "kalahari": {
         "name": "Kalahari",
-        "data_dir": "src/backend/data/kalahari",
-        "vector_store_path": "src/backend/vector_stores/kalahari_index.faiss",
-        "metadata_path": "src/backend/vector_stores/kalahari_metadata.pkl"
+        "data_dir": "src/data/kalahari",
+        "vector_store_path": "src/vector_stores/kalahari_index.faiss",
+        "metadata_path": "src/vector_stores/kalahari_metadata.pkl",
+        "chunk_store_path": "src/vector_stores/kalahari_chunks.bin",
+        "bm25_path": "src/vector_stores/kalahari_bm25.npz",
+        "manifest_path": "src/vector_stores/kalahari_manifest.json",
+        "faq_index_path": "src/vector_stores/kalahari_faq.npz",
+        "index": {"type": "flat"}
     },
 
     "sovereignsilver": {
         "name": "Sovereign Silver",
-        "data_dir": "src/backend/data/sovereignsilver",
-        "vector_store_path": "src/backend/vector_stores/sovereignsilver_index.faiss",
-        "metadata_path": "src/backend/vector_stores/sovereignsilver_metadata.pkl"
+        "data_dir": "src/data/sovereignsilver",
+        "vector_store_path": "src/vector_stores/sovereignsilver_index.faiss",
+        "metadata_path": "src/vector_stores/sovereignsilver_metadata.pkl",
+        "chunk_store_path": "src/vector_stores/sovereignsilver_chunks.bin",
+        "bm25_path": "src/vector_stores/sovereignsilver_bm25.npz",
+        "manifest_path": "src/vector_stores/sovereignsilver_manifest.json",
+        "faq_index_path": "src/vector_stores/sovereignsilver_faq.npz",
+        "index": {"type": "flat"}
     },
 
     "optima": {
         "name": "Optima",
-        "data_dir": "src/backend/data/optima",
-        "vector_store_path": "src/backend/vector_stores/optima_index.faiss",
-        "metadata_path": "src/backend/vector_stores/optima_metadata.pkl"
+        "data_dir": "src/data/optima",
+        "vector_store_path": "src/vector_stores/optima_index.faiss",
+        "metadata_path": "src/vector_stores/optima_metadata.pkl",
+        "chunk_store_path": "src/vector_stores/optima_chunks.bin",
+        "bm25_path": "src/vector_stores/optima_bm25.npz",
+        "manifest_path": "src/vector_stores/optima_manifest.json",
+        "faq_index_path": "src/vector_stores/optima_faq.npz",
+        "index": {"type": "flat"}
     }
 }
 
@@ -75,15 +102,111 @@ VALID_PROFILES = set(CLIENTS.keys())
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 EMBEDDING_DIMENSION = 384
 VECTOR_STORE_TYPE = "FAISS"
+VECTOR_STORE_MMAP = os.getenv("VECTOR_STORE_MMAP", "1") == "1"  # Open indexes read-only via mmap, shared across workers
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # Default encoder; clients may set "embedding_backend"
+EMBEDDING_BACKENDS = {
+    # Full-precision PyTorch inference
+    "torch": {"model": EMBEDDING_MODEL},
+    # Same model exported to ONNX and int8-quantized, run through ONNX Runtime
+    "onnx-int8": {"model": EMBEDDING_MODEL, "onnx_file": "onnx/model_quint8_avx2.onnx"},
+    # Distilled static (lookup-table) embeddings truncated to the index dimension;
+    # a different embedding space, so indexes must be rebuilt with this backend
+    "static": {"model": "sentence-transformers/static-retrieval-mrl-en-v1", "truncate_dim": EMBEDDING_DIMENSION},
+}
+EMBEDDING_QUERY_CACHE_SIZE = int(os.getenv("EMBEDDING_QUERY_CACHE_SIZE", "2048"))  # Query embeddings kept in the LRU cache
+
+# Profile Store Cache Settings
+PROFILE_STORE_MEMORY_BUDGET_MB = int(os.getenv("PROFILE_STORE_MEMORY_BUDGET_MB", "0"))  # 0 = keep every loaded store
+HOT_RELOAD_ENABLED = os.getenv("HOT_RELOAD_ENABLED", "1") == "1"  # Swap in rebuilt indexes without a restart
+HOT_RELOAD_CHECK_INTERVAL = 5  # Seconds between on-disk change checks per profile
+
+# Index Builder Settings
+CHUNK_MAX_CHARS = 1200  # Paragraphs longer than this are split on sentence boundaries
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "src/vector_stores/embedding_cache.sqlite")
 
 # Query Settings
 TOP_K_DOCUMENTS = 5  # Number of documents to retrieve per query
 RELEVANCE_THRESHOLD = 0.3  # Minimum similarity score to consider a document relevant
 
+# Context Packing Settings
+CONTEXT_TOKEN_BUDGET = 1200  # Max tokens of retrieved context put into the prompt
+CONTEXT_CHARS_PER_TOKEN = 4  # Token estimate for budgeting; Ollama reports the exact count
+MMR_LAMBDA = 0.7  # Relevance vs novelty trade-off when ordering chunks
+MMR_DUPLICATE_SIMILARITY = 0.95  # Chunks this similar to an already chosen one are dropped
+
+# Hybrid Retrieval Settings (BM25 + vector, fused with reciprocal-rank fusion)
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "1") == "1"
+HYBRID_CANDIDATES = 20  # Candidates taken from each ranking before fusion
+RRF_K = 60  # Reciprocal-rank fusion constant
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# FAQ Direct Answer Settings
+FAQ_DIRECT_ANSWER_ENABLED = os.getenv("FAQ_DIRECT_ANSWER_ENABLED", "1") == "1"  # Serve curated faq.txt answers without the LLM
+FAQ_MATCH_THRESHOLD = 0.92  # Min cosine similarity to an FAQ question; near-verbatim matches only
+
+# Semantic Answer Cache Settings
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+SEMANTIC_CACHE_MAX_DISTANCE = 0.08  # Max cosine distance between query embeddings to reuse an answer
+SEMANTIC_CACHE_TTL_SECONDS = 3600
+SEMANTIC_CACHE_MAX_ENTRIES = 512  # Per profile, least recently used evicted first
+
+# LLM Scheduling
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "1"))  # Ollama calls allowed at once (CPU serves ~one generation)
+LLM_QUEUE_MAX = int(os.getenv("LLM_QUEUE_MAX", "16"))  # Calls allowed to wait; beyond this requests fail fast with 503
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "120"))  # Longest wait before giving up
+
+# Query Coalescing
+QUERY_COALESCING_ENABLED = os.getenv("QUERY_COALESCING_ENABLED", "1") == "1"  # Identical concurrent queries share one answer
+
+# Gemini Settings (tatvaAI / conversational BI)
+GEMINI_API_KEYS = [key.strip() for key in os.getenv("GEMINI_API_KEYS", "").split(",") if key.strip()]  # Comma-separated
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL") or None  # Override the API endpoint, e.g. a local fake for benchmarks
+GEMINI_POOL_SIZE = int(os.getenv("GEMINI_POOL_SIZE", "8"))  # Keep-alive connections per API key
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "120"))
+GEMINI_KEEPALIVE_EXPIRY = 60  # Idle seconds before a pooled connection is closed
+GEMINI_RPM_PER_KEY = int(os.getenv("GEMINI_RPM_PER_KEY", "10"))  # Requests per minute allowed per key (0 = unlimited)
+GEMINI_TPM_PER_KEY = int(os.getenv("GEMINI_TPM_PER_KEY", "250000"))  # Tokens per minute allowed per key (0 = unlimited)
+GEMINI_RPD_PER_KEY = int(os.getenv("GEMINI_RPD_PER_KEY", "250"))  # Requests per day allowed per key (0 = unlimited)
+GEMINI_OUTPUT_TOKEN_ESTIMATE = 2048  # Answer + thinking tokens reserved per call until usage is reported
+GEMINI_MAX_RETRIES = 3  # Retries of a 429/5xx/connection error, each on another key where possible
+GEMINI_BACKOFF_BASE_SECONDS = 0.5
+GEMINI_BACKOFF_MAX_SECONDS = 20
+GEMINI_QUEUE_TIMEOUT_SECONDS = float(os.getenv("GEMINI_QUEUE_TIMEOUT_SECONDS", "120"))  # Longest wait for quota
+
+# Rule-based Question Parser (tatvaAI /run_query)
+QUESTION_PARSER_ENABLED = os.getenv("QUESTION_PARSER_ENABLED", "1") == "1"  # Compile simple questions without Gemini
+QUESTION_PARSER_MAX_DISTINCT = 1000  # Text columns with more distinct values are not indexed for value matching
+QUESTION_PARSER_INDEX_CACHE = 32  # Datasets whose column/value index is kept in memory
+
+# SQL Few-shot Examples (tatvaAI /run_query)
+SQL_EXAMPLES_ENABLED = os.getenv("SQL_EXAMPLES_ENABLED", "1") == "1"  # Add similar past question/SQL pairs to the prompt
+SQL_EXAMPLES_TOP_K = 3  # Examples added per prompt
+SQL_EXAMPLES_MIN_SIMILARITY = 0.5  # Min cosine similarity between questions for an example to be used
+SQL_EXAMPLES_MAX = 20000  # Most recent executed pairs loaded from Session_Management
+SQL_EXAMPLES_REFRESH_SECONDS = 600  # How often pairs recorded by other workers are picked up
+
+# SQL Generation Cache (tatvaAI /run_query)
+SQL_CACHE_ENABLED = os.getenv("SQL_CACHE_ENABLED", "1") == "1"  # Reuse generated SQL for repeated questions
+SQL_CACHE_PATH = os.getenv("SQL_CACHE_PATH", "data/sql_cache.sqlite")
+SQL_CACHE_MEMORY_ENTRIES = 1024  # Hot entries kept in memory, least recently used evicted first
+SQL_CACHE_DISK_ENTRIES = 50000  # Entries kept on disk, least recently used evicted first
+SQL_CACHE_TTL_SECONDS = 7 * 24 * 3600  # Older entries are regenerated
+
+# Batch Query Settings
+BATCH_MAX_QUERIES = 1000  # Maximum questions accepted by /query/batch
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "2"))  # Parallel Ollama calls per batch
+
 # LLM Settings - OLLAMA LOCAL ONLY
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 LLM_MODEL = "gemma3:1b"  # CPU-friendly model (815MB, just pulled)
 LLM_TEMPERATURE = 0.2  # Lower temperature for factual answers
+LLM_KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "30m")  # How long Ollama keeps the model loaded after a call
+OLLAMA_POOL_SIZE = int(os.getenv("OLLAMA_POOL_SIZE", "8"))  # Keep-alive connections held open to Ollama
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))  # Seconds to open a connection
+OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "500"))  # Seconds to wait for a generation
+STREAM_NOT_FOUND_PREFIX_CHARS = 160  # Streamed text held back until the not-found guardrail can judge it
+OLLAMA_KEEPALIVE_EXPIRY = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY", "60"))  # Idle seconds before an async connection is closed
 # NOTE: Ollama doesn't use max_tokens in the same way; it generates until end-of-sequence
 
 # Server Settings
@@ -92,6 +215,9 @@ API_PORT = 8080
 API_PREFIX = "/api"
 
 # Feature Flags
+ENABLE_STARTUP_WARMUP = os.getenv("ENABLE_STARTUP_WARMUP", "0") == "1"  # Preload profiles and the LLM at startup
+# Profiles that must warm up before /health/ready passes; others that fail only mark the app degraded
+WARMUP_REQUIRED_PROFILES = [p.strip() for p in os.getenv("WARMUP_REQUIRED_PROFILES", "").split(",") if p.strip()]
 ENABLE_NO_CONTEXT_FALLBACK = False  # If True, LLM will be called even with no context
 ENABLE_CROSS_PROFILE_INFERENCE = False  # Must always be False for security
 
@@ -1,7 +1,50 @@
 from flask import Blueprint, jsonify
+from src.profiles.embedder import embedding_service
+from src.data_analysis_dckdb.gemini_pool import gemini_pool
+from src.data_analysis_dckdb.gemini_scheduler import gemini_scheduler
+from src.data_analysis_dckdb.question_parser import question_parser
+from src.data_analysis_dckdb.sql_cache import sql_cache
+from src.data_analysis_dckdb.sql_examples import sql_examples
+from src.llm.context_packer import context_packer
+from src.llm.processor import llm_processor
+from src.llm.scheduler import llm_scheduler
+from src.llm.semantic_cache import semantic_cache
+from src.profiles.manager import profile_manager
+from src.services.query_service import query_flights
+from src.services.warmup_service import warmup_service
 
 health_bp = Blueprint("health", __name__)
 
 @health_bp.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "healthy"})
+    return jsonify({
+        "status": "healthy",
+        "live": True,
+        "ready": warmup_service.is_ready(),
+        "warmup": warmup_service.report(),
+        "embedding": embedding_service.stats(),
+        "profile_stores": profile_manager.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "llm": llm_processor.stats(),
+        "context_packer": context_packer.stats(),
+        "llm_queue": llm_scheduler.stats(),
+        "query_coalescing": query_flights.stats(),
+        "question_parser": question_parser.stats(),
+        "sql_cache": sql_cache.stats(),
+        "sql_examples": sql_examples.stats(),
+        "gemini": gemini_pool.stats(),
+        "gemini_quota": gemini_scheduler.stats(),
+    })
+
+
+@health_bp.route("/health/live", methods=["GET"])
+def live():
+    return jsonify({"status": "live"})
+
+
+@health_bp.route("/health/ready", methods=["GET"])
+def ready():
+    if warmup_service.is_ready():
+        status = "degraded" if warmup_service.degraded_components() else "ready"
+        return jsonify({"status": status, "warmup": warmup_service.report()})
+    return jsonify({"status": "warming_up", "warmup": warmup_service.report()}), 503
@@ -1,7 +1,8 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from src.validators.query_validator import QueryValidator
 from src.services.query_service import QueryService
 from src.config.settings import CLIENTS
+from src.utils.metrics import stage_timer
 
 query_bp = Blueprint("query", __name__)
 
@@ -10,10 +11,25 @@ query_bp = Blueprint("query", __name__)
 def query():
     payload = request.get_json()
     print(payload)
-    QueryValidator.validate(payload)
+    with stage_timer("validation", (payload or {}).get("client_id")):
+        QueryValidator.validate(payload)
+    if payload.get("stream"):
+        return Response(
+            stream_with_context(QueryService.stream(payload)),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
     return jsonify(QueryService.process(payload))
 
 
+@query_bp.route("/query/batch", methods=["POST"])
+def query_batch():
+    payload = request.get_json()
+    with stage_timer("validation", (payload or {}).get("client_id")):
+        QueryValidator.validate_batch(payload)
+    return jsonify(QueryService.process_batch(payload))
+
+
 @query_bp.route("/clients", methods=["GET"])
 def get_clients():
     return {
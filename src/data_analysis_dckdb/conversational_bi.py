@@ -10,8 +10,14 @@ import pyarrow.parquet as pq
 import json
 import requests
 # import ollama
-from google import genai
 from google.genai import types
+from src.data_analysis_dckdb.gemini_scheduler import gemini_scheduler
+from src.data_analysis_dckdb.question_parser import VECTOR_KEYWORDS, ATTRIBUTE_KEYWORDS
+from src.data_analysis_dckdb.sql_cache import sql_cache, cache_key
+from src.data_analysis_dckdb.sql_examples import compact_history, format_examples
+
+# Bump whenever the get_sql_query prompt changes, so SQL cached for the old prompt is not reused
+SQL_PROMPT_VERSION = 2
 
 # with open('src/config/config.yml', 'r', encoding='utf8') as ymlfile:
 #     meta_data = yaml.load(ymlfile, Loader=yaml.FullLoader)
@@ -20,13 +26,8 @@ from google.genai import types
 class AnalyticalFilter:
 
     def __init__(self):
-        self.api_counter = 0
-        self.api_limit = 250
-
-        ### APIS -- [Sam Navaantrix, Sam Personal]
-        self.api_keys = []  ##
-        # self.client = genai.Client(
-        #    api_key=self.api_key,)
+        # API keys, their clients and quotas are held by gemini_scheduler (GEMINI_API_KEYS)
+        self.scheduler = gemini_scheduler
 
         self.generate_content_config = types.GenerateContentConfig(
             thinking_config=types.ThinkingConfig(
@@ -39,24 +40,20 @@ class AnalyticalFilter:
         # self.dash_obj = dashboard_main_v2.AnalyticalFilter()
         # self.output_path = meta_data["OUTPUT_DATA_PATH"]
 
-        self.VECTOR_KEYWORDS = [
-            "sales",
-            "amount",
-            "margin",
-            "asp",
-            "abv",
-            "rooms",
-            "occupancy"]
-        self.attrs = ['industry', 'customer', 'branch_name', 'brand', 'lob', 'bill_no', 'date', 'product', 'salesman',
-                      'category', 'subcategory', 'subcategory', 'groupfortax', 'saletype', 'area', 'state', 'city',
-                      'verticle']
-
-    def _get_api_key_client(self):
-        index = (self.api_counter // self.api_limit) % len(self.api_keys)
-        api_ = self.api_keys[index]
-        client = genai.Client(
-            api_key=api_, )
-        return client
+        self.VECTOR_KEYWORDS = VECTOR_KEYWORDS
+        self.attrs = ATTRIBUTE_KEYWORDS
+
+    def _generate(self, prompt):
+        contents = [
+            types.Content(
+                role="user",
+                parts=[
+                    types.Part.from_text(text=prompt),
+                ],
+            ),
+        ]
+
+        return self.scheduler.generate(self.model, contents, self.generate_content_config, prompt_text=prompt)
 
     def get_insights(self, question, payload_prompt, dash_out):
         prompt = f"""
@@ -106,22 +103,7 @@ class AnalyticalFilter:
 
         """
         # print("\nPrompt",prompt,"\n")
-        contents = [
-            types.Content(
-                role="user",
-                parts=[
-                    types.Part.from_text(text=prompt),
-                ],
-            ),
-        ]
-
-        api_client_ = self._get_api_key_client()
-
-        response = "".join(chunk.text for chunk in api_client_.models.generate_content_stream(
-            model=self.model,
-            contents=contents,
-            config=self.generate_content_config,
-        ))
+        response = self._generate(prompt)
 
         return response
 
@@ -187,22 +169,7 @@ class AnalyticalFilter:
 
         print(prompt)
 
-        contents = [
-            types.Content(
-                role="user",
-                parts=[
-                    types.Part.from_text(text=prompt),
-                ],
-            ),
-        ]
-
-        api_client_ = self._get_api_key_client()
-
-        response = "".join(chunk.text for chunk in api_client_.models.generate_content_stream(
-            model=self.model,
-            contents=contents,
-            config=self.generate_content_config,
-        ))
+        response = self._generate(prompt)
 
         return response
 
@@ -481,22 +448,7 @@ class AnalyticalFilter:
 
         """
         # print("\nPrompt",prompt,"\n")
-        contents = [
-            types.Content(
-                role="user",
-                parts=[
-                    types.Part.from_text(text=prompt),
-                ],
-            ),
-        ]
-
-        api_client_ = self._get_api_key_client()
-
-        response = "".join(chunk.text for chunk in api_client_.models.generate_content_stream(
-            model=self.model,
-            contents=contents,
-            config=self.generate_content_config,
-        ))
+        response = self._generate(prompt)
 
         return response
 
@@ -508,8 +460,24 @@ class AnalyticalFilter:
         print(response_body)
         return 1
 
+    def get_sql_query_cached(self, question, schema, parquet_path, user_history, examples=None):
+        """
+        get_sql_query behind sql_cache.
+
+        Returns (response, cache key, source) with source "cache" or "llm". A
+        generated response is not cached here: the caller stores it with
+        sql_cache.put(key, response) once its query has executed.
+        """
+        key = cache_key(question, schema, user_history, examples, prompt_version=SQL_PROMPT_VERSION)
+        response = sql_cache.get(key, schema, parquet_path)
+        if response is not None:
+            return response, key, "cache"
+        return self.get_sql_query(question, schema.names, user_history, examples=examples), key, "llm"
+
     # - Return ** only the SQL query **, nothing else.
-    def get_sql_query(self,question,columns,user_history):
+    def get_sql_query(self,question,columns,user_history,examples=None):
+        # Earlier turns and similar solved questions go in as compact (question, SQL) pairs, not result rows
+        history_pairs = compact_history(user_history)
         prompt = f"""
                 You are an expert in DuckDB and SQL.
                 Your task is to generate a **valid DuckDB query** and return output in a strict JSON dictionary format.
@@ -569,7 +537,7 @@ class AnalyticalFilter:
 
                 ### Process:
                 1. **Review the User’s Question**: Start by reviewing the **User Question** to understand what the user is asking.
-                2. **Check the User History**: Look at the provided `{user_history}` dictionary. If the user has asked similar questions in the past, check if any **columns, filters, or groupings** used in the past query can be applied to the current question.
+                2. **Check the User History**: Look at the user's recent questions and the SQL used for them under **User History** below. If the user has asked similar questions in the past, check if any **columns, filters, or groupings** used in the past query can be applied to the current question.
                 3. **Adapt the Query**: Adjust the new query based on the context from **previous questions**. This includes:
                    - **Referencing columns** or **metrics** used in past queries.
                    - **Applying relevant filters** (e.g., a department filter if it was used in previous queries).
@@ -578,28 +546,21 @@ class AnalyticalFilter:
                 5. **Validate the Query**: Ensure the SQL query is valid and logically consistent. If any inconsistencies or errors are found, adjust the query accordingly.
                 6. **Output the Query**: Return the final query in the strict JSON format, including all necessary fields like Title, X-axis, Y-axis, and column references.
 
+                ### User History (recent questions in this session):
+                {format_examples(history_pairs)}
+
+                ### Similar questions answered before on these columns (SQL that ran successfully):
+                {format_examples(examples or [])}
+
                 ### Example:
                 User Question: {question}
                 Columns: {columns}
                 Output:
                 """
 
-        contents = [
-            types.Content(
-                role="user",
-                parts=[
-                    types.Part.from_text(text=prompt),
-                ],
-            ),
-        ]
-
-        api_client_ = self._get_api_key_client()
-
-        response = "".join(chunk.text for chunk in api_client_.models.generate_content_stream(
-            model=self.model,
-            contents=contents,
-            config=self.generate_content_config,
-        ))
+        print(f"SQL prompt: ~{len(prompt) // 4} tokens, {len(history_pairs)} history turns, "
+              f"{len(examples or [])} examples")
+        response = self._generate(prompt)
         response = response.replace("```json", "").replace("```", "").strip()
         if response.lower().startswith("json"):
             response = response[4:].strip()
@@ -628,22 +589,7 @@ class AnalyticalFilter:
         Return the result strictly as a valid Python dictionary with column names as keys and the corrected datatype as values.   
         Do not include any explanation, and do not wrap the output in triple backticks.
         """
-        contents = [
-            types.Content(
-                role="user",
-                parts=[
-                    types.Part.from_text(text=prompt),
-                ],
-            ),
-        ]
-
-        api_client_ = self._get_api_key_client()
-
-        response = "".join(chunk.text for chunk in api_client_.models.generate_content_stream(
-            model=self.model,
-            contents=contents,
-            config=self.generate_content_config,
-        ))
+        response = self._generate(prompt)
 
         return response
 
@@ -708,21 +654,7 @@ class AnalyticalFilter:
                 Tone:
                 Friendly, clear, professional, and human — like ChatGPT giving smart but simple business insights.
                 """
-        contents = [
-            types.Content(
-                role="user",
-                parts=[
-                    types.Part.from_text(text=prompt),
-                ],
-            ),
-        ]
-        api_client_ = self._get_api_key_client()
-
-        response = "".join(chunk.text for chunk in api_client_.models.generate_content_stream(
-            model=self.model,
-            contents=contents,
-            config=self.generate_content_config,
-        ))
+        response = self._generate(prompt)
         return response
 
     def get_sql_query_1(self, question, columns):
@@ -799,22 +731,7 @@ class AnalyticalFilter:
                 Output:
                 """
 
-        contents = [
-            types.Content(
-                role="user",
-                parts=[
-                    types.Part.from_text(text=prompt),
-                ],
-            ),
-        ]
-
-        api_client_ = self._get_api_key_client()
-
-        response = "".join(chunk.text for chunk in api_client_.models.generate_content_stream(
-            model=self.model,
-            contents=contents,
-            config=self.generate_content_config,
-        ))
+        response = self._generate(prompt)
         response = response.replace("```json", "").replace("```", "").strip()
         if response.lower().startswith("json"):
             response = response[4:].strip()
@@ -0,0 +1,131 @@
+"""
+Gemini Client Pool
+One long-lived genai.Client per API key, with keep-alive HTTP connections and usage-driven key selection
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+import httpx
+from google import genai
+from google.genai import types
+
+from src.config.settings import (
+    GEMINI_API_KEYS, GEMINI_BASE_URL, GEMINI_POOL_SIZE, GEMINI_TIMEOUT_SECONDS, GEMINI_KEEPALIVE_EXPIRY
+)
+
+
+def mask_key(api_key: str) -> str:
+    """Key label safe for logs and stats"""
+    return f"...{api_key[-4:]}" if len(api_key) > 8 else "..."
+
+
+class _KeySlot:
+    def __init__(self, index: int, api_key: str):
+        self.index = index
+        self.api_key = api_key
+        self.label = f"key{index}{mask_key(api_key)}"
+        self.client: Optional[genai.Client] = None
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.seconds_total = 0.0
+        self.last_used = 0.0
+
+
+class GeminiClientPool:
+    """
+    Holds one genai.Client per API key for the life of the process.
+
+    Each client keeps its own httpx connection pool, so TLS handshakes and
+    client setup are paid once per key rather than once per prompt. Calls go
+    to the key with the fewest calls in flight, then the fewest calls made,
+    which spreads usage evenly across keys.
+    """
+
+    def __init__(self, api_keys: List[str] = None, base_url: Optional[str] = GEMINI_BASE_URL,
+                 pool_size: int = GEMINI_POOL_SIZE, timeout: float = GEMINI_TIMEOUT_SECONDS):
+        api_keys = GEMINI_API_KEYS if api_keys is None else api_keys
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._slots = [_KeySlot(i, key) for i, key in enumerate(api_keys)]
+        self._lock = threading.Lock()
+        self.clients_created = 0
+
+    def _http_options(self) -> types.HttpOptions:
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size,
+                              keepalive_expiry=GEMINI_KEEPALIVE_EXPIRY)
+        kwargs = {"timeout": int(self.timeout * 1000), "client_args": {"limits": limits}}
+        if self.base_url:
+            kwargs["base_url"] = self.base_url
+        return types.HttpOptions(**kwargs)
+
+    def _client_for(self, slot: _KeySlot) -> genai.Client:
+        if slot.client is None:
+            with self._lock:
+                if slot.client is None:
+                    slot.client = genai.Client(api_key=slot.api_key, http_options=self._http_options())
+                    self.clients_created += 1
+        return slot.client
+
+    @property
+    def slots(self) -> List[_KeySlot]:
+        return list(self._slots)
+
+    def least_used(self, candidates: List[_KeySlot] = None) -> _KeySlot:
+        """Key with the fewest calls in flight, then the fewest calls made"""
+        candidates = self._slots if candidates is None else candidates
+        if not candidates:
+            raise ValueError("No Gemini API keys configured (set GEMINI_API_KEYS)")
+        with self._lock:
+            return min(candidates, key=lambda s: (s.in_flight, s.calls, s.last_used))
+
+    @contextmanager
+    def client(self, slot: Optional[_KeySlot] = None):
+        """Client for slot (default: the least-used key); usage and failures are recorded against that key"""
+        slot = slot or self.least_used()
+        with self._lock:
+            slot.in_flight += 1
+            slot.calls += 1
+            slot.last_used = time.monotonic()
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield self._client_for(slot)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                slot.in_flight -= 1
+                slot.failures += failed
+                slot.seconds_total += time.perf_counter() - start
+
+    def close(self):
+        with self._lock:
+            for slot in self._slots:
+                if slot.client is not None:
+                    slot.client.close()
+                    slot.client = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "keys": len(self._slots),
+                "clients_created": self.clients_created,
+                "per_key": {
+                    slot.label: {
+                        "calls": slot.calls,
+                        "failures": slot.failures,
+                        "in_flight": slot.in_flight,
+                        "latency_ms_avg": slot.seconds_total / slot.calls * 1000 if slot.calls else 0.0,
+                    }
+                    for slot in self._slots
+                },
+            }
+
+
+gemini_pool = GeminiClientPool()
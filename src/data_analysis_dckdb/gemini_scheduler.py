@@ -0,0 +1,321 @@
+"""
+Gemini Scheduler
+Quota-aware routing of Gemini calls across API keys, with token buckets and retry on a different key
+"""
+
+import math
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import httpx
+from google.genai import errors
+
+from src.config.settings import (
+    GEMINI_RPM_PER_KEY, GEMINI_TPM_PER_KEY, GEMINI_RPD_PER_KEY, GEMINI_OUTPUT_TOKEN_ESTIMATE, GEMINI_MAX_RETRIES,
+    GEMINI_BACKOFF_BASE_SECONDS, GEMINI_BACKOFF_MAX_SECONDS, GEMINI_QUEUE_TIMEOUT_SECONDS
+)
+from src.data_analysis_dckdb.gemini_pool import GeminiClientPool, gemini_pool
+from src.utils.errors import QueueFullError
+from src.utils.metrics import registry, Counter, Gauge, Histogram
+
+GEMINI_CALLS = registry.register(Counter(
+    "gemini_calls_total", "Gemini calls by key and outcome", ("key", "outcome")
+))
+GEMINI_KEY_UTILIZATION = registry.register(Gauge(
+    "gemini_key_utilization", "Share of a key's request/token quota currently used", ("key", "limit")
+))
+GEMINI_QUEUE_WAIT_SECONDS = registry.register(Histogram(
+    "gemini_queue_wait_seconds", "Time Gemini calls waited for quota on any key"
+))
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Prompt tokens plus the expected answer (thinking included), for reserving quota up front"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) + GEMINI_OUTPUT_TOKEN_ESTIMATE
+
+
+class TokenBucket:
+    """Holds up to capacity units, refilled continuously over window seconds; capacity 0 means unlimited"""
+
+    def __init__(self, capacity: float, window_seconds: float):
+        self.capacity = capacity
+        self.rate = capacity / window_seconds if capacity else 0.0
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.capacity:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def headroom(self, now: float) -> float:
+        """Fraction of capacity currently available"""
+        if not self.capacity:
+            return 1.0
+        self._refill(now)
+        return max(0.0, self.tokens / self.capacity)
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount (capped at capacity) is available"""
+        if not self.capacity:
+            return 0.0
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float, now: float):
+        if self.capacity:
+            self._refill(now)
+            self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount: float, now: float):
+        """Return (positive) or charge (negative) units after the real cost is known"""
+        if self.capacity:
+            self._refill(now)
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def drain(self, now: float):
+        if self.capacity:
+            self._refill(now)
+            self.tokens = min(self.tokens, 0.0)
+
+
+class _KeyQuota:
+    def __init__(self, slot, rpm: int, tpm: int, rpd: int, window_seconds: float):
+        self.slot = slot
+        self.requests = TokenBucket(rpm, window_seconds)
+        self.tokens = TokenBucket(tpm, window_seconds)
+        self.daily = TokenBucket(rpd, window_seconds * 24 * 60)
+        self.cooldown_until = 0.0
+        self.throttled = 0
+        self.server_errors = 0
+
+    def wait_time(self, tokens: int, now: float) -> float:
+        return max(self.cooldown_until - now, self.requests.wait_time(1, now),
+                   self.tokens.wait_time(tokens, now), self.daily.wait_time(1, now))
+
+    def headroom(self, now: float) -> float:
+        return min(self.requests.headroom(now), self.tokens.headroom(now), self.daily.headroom(now))
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Server-suggested delay from a Retry-After header or a RetryInfo detail, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        pass
+    match = re.search(r"'retryDelay': '(\d+(?:\.\d+)?)s'", str(getattr(error, "details", "")))
+    return float(match.group(1)) if match else None
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, errors.APIError):
+        return error.code == 429 or error.code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+class GeminiScheduler:
+    """
+    Owns every Gemini call made by AnalyticalFilter.
+
+    Each API key has token buckets for requests per minute, tokens per minute
+    and requests per day. A call reserves one request and its estimated
+    tokens on the key with the most headroom; the token estimate is corrected
+    from the usage the API reports. When no key has quota, callers wait in
+    arrival order until one refills, up to queue_timeout, then QueueFullError
+    is raised. A 429 drains the key's buckets and cools it down for the
+    server's retry delay; 429s, 5xx and connection errors are retried with
+    jittered exponential backoff on a different key where there is one.
+    Quota reserved by a failed call is refunded, so bursts of errors do not
+    use up keys that served nothing.
+    """
+
+    def __init__(self, pool: GeminiClientPool = gemini_pool, rpm: int = GEMINI_RPM_PER_KEY,
+                 tpm: int = GEMINI_TPM_PER_KEY, rpd: int = GEMINI_RPD_PER_KEY, window_seconds: float = 60.0,
+                 max_retries: int = GEMINI_MAX_RETRIES, backoff_base: float = GEMINI_BACKOFF_BASE_SECONDS,
+                 backoff_max: float = GEMINI_BACKOFF_MAX_SECONDS, queue_timeout: float = GEMINI_QUEUE_TIMEOUT_SECONDS):
+        self.pool = pool
+        self.window_seconds = window_seconds
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.queue_timeout = queue_timeout
+        self._quotas = [_KeyQuota(slot, rpm, tpm, rpd, window_seconds) for slot in pool.slots]
+        self._cond = threading.Condition()
+        self._waiting = deque()
+        self.metrics = {"admitted": 0, "calls": 0, "retries": 0, "throttled": 0, "server_errors": 0, "timed_out": 0,
+                        "queued": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+
+    def _pick(self, tokens: int, avoid: set, now: float) -> Optional[_KeyQuota]:
+        ready = [q for q in self._quotas if q.wait_time(tokens, now) <= 0]
+        if not ready:
+            return None
+        preferred = [q for q in ready if q.slot.index not in avoid] or ready
+        return max(preferred, key=lambda q: (q.headroom(now), -q.slot.in_flight))
+
+    def _acquire(self, tokens: int, avoid: set) -> _KeyQuota:
+        """Reserve quota on the key with the most headroom, waiting in line while every key is exhausted"""
+        if not self._quotas:
+            raise ValueError("No Gemini API keys configured (set GEMINI_API_KEYS)")
+        start = time.monotonic()
+        ticket = object()
+        queued = False
+        with self._cond:
+            self._waiting.append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    quota = self._pick(tokens, avoid, now) if self._waiting[0] is ticket else None
+                    if quota is not None:
+                        quota.requests.take(1, now)
+                        quota.tokens.take(tokens, now)
+                        quota.daily.take(1, now)
+                        break
+                    remaining = start + self.queue_timeout - now
+                    if remaining <= 0:
+                        self.metrics["timed_out"] += 1
+                        retry_after = min(q.wait_time(tokens, now) for q in self._quotas)
+                        raise QueueFullError("All Gemini API keys are out of quota, please retry later",
+                                             max(1, math.ceil(retry_after)))
+                    if not queued:
+                        queued = True
+                        self.metrics["queued"] += 1
+                    if self._waiting[0] is ticket:
+                        delay = min(q.wait_time(tokens, now) for q in self._quotas)
+                    else:
+                        delay = remaining
+                    self._cond.wait(min(max(delay, 0.01), remaining))
+            finally:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+
+        waited = time.monotonic() - start
+        GEMINI_QUEUE_WAIT_SECONDS.observe(waited)
+        with self._cond:
+            self.metrics["admitted"] += 1
+            self.metrics["wait_seconds_total"] += waited
+            self.metrics["wait_seconds_max"] = max(self.metrics["wait_seconds_max"], waited)
+        return quota
+
+    def _settle(self, quota: _KeyQuota, reserved: int, used: Optional[int]):
+        if used is None:
+            return
+        with self._cond:
+            quota.tokens.adjust(reserved - used, time.monotonic())
+            self._cond.notify_all()
+
+    def _refund(self, quota: _KeyQuota, reserved: int, used: Optional[int], error: Exception):
+        """
+        Give back what a failed call reserved but did not consume.
+
+        Tokens are reconciled with any usage reported before the failure. A
+        call that failed before the model ran (no usage) also gets its request
+        back, except on a 429, where the key is out of quota anyway.
+        """
+        with self._cond:
+            now = time.monotonic()
+            quota.tokens.adjust(reserved - (used or 0), now)
+            if used is None:
+                quota.daily.adjust(1, now)
+                if getattr(error, "code", None) != 429:
+                    quota.requests.adjust(1, now)
+            self._cond.notify_all()
+
+    def _throttle(self, quota: _KeyQuota, error: Exception, backoff: float):
+        with self._cond:
+            now = time.monotonic()
+            if getattr(error, "code", None) == 429:
+                quota.throttled += 1
+                self.metrics["throttled"] += 1
+                quota.requests.drain(now)
+                quota.cooldown_until = now + (_retry_after(error) or backoff)
+            else:
+                quota.server_errors += 1
+                self.metrics["server_errors"] += 1
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def generate(self, model: str, contents: List, config, prompt_text: str = "") -> str:
+        """Run generate_content_stream on the best key and return the joined text"""
+        reserved = estimate_tokens(prompt_text)
+        avoid = set()
+        for attempt in range(self.max_retries + 1):
+            quota = self._acquire(reserved, avoid)
+            label = quota.slot.label
+            text, used = [], None
+            try:
+                with self.pool.client(quota.slot) as client:
+                    for chunk in client.models.generate_content_stream(model=model, contents=contents, config=config):
+                        text.append(chunk.text or "")
+                        if chunk.usage_metadata and chunk.usage_metadata.total_token_count:
+                            used = chunk.usage_metadata.total_token_count
+                self._settle(quota, reserved, used)
+                GEMINI_CALLS.inc(key=label, outcome="ok")
+                with self._cond:
+                    self.metrics["calls"] += 1
+                return "".join(text)
+            except Exception as e:
+                self._refund(quota, reserved, used, e)
+                if not _is_retryable(e) or attempt == self.max_retries:
+                    GEMINI_CALLS.inc(key=label, outcome="error")
+                    raise
+                backoff = self._backoff(attempt)
+                self._throttle(quota, e, backoff)
+                GEMINI_CALLS.inc(key=label, outcome="retried")
+                with self._cond:
+                    self.metrics["retries"] += 1
+                avoid = {quota.slot.index}
+                print(f"Gemini call on {label} failed ({e.__class__.__name__}: {getattr(e, 'code', '')}), "
+                      f"retrying on another key in {backoff:.2f}s")
+                time.sleep(backoff)
+
+    def utilization(self) -> Dict[str, dict]:
+        with self._cond:
+            now = time.monotonic()
+            return {
+                q.slot.label: {
+                    "requests": 1.0 - q.requests.headroom(now),
+                    "tokens": 1.0 - q.tokens.headroom(now),
+                    "daily_requests": 1.0 - q.daily.headroom(now),
+                    "cooldown_seconds": max(0.0, q.cooldown_until - now),
+                    "in_flight": q.slot.in_flight,
+                    "throttled": q.throttled,
+                    "server_errors": q.server_errors,
+                }
+                for q in self._quotas
+            }
+
+    def stats(self) -> dict:
+        with self._cond:
+            metrics = dict(self.metrics)
+            queue_depth = len(self._waiting)
+        admitted = metrics["admitted"]
+        return {
+            "keys": len(self._quotas),
+            "queue_depth": queue_depth,
+            **metrics,
+            "wait_ms_avg": metrics["wait_seconds_total"] / admitted * 1000 if admitted else 0.0,
+            "per_key": self.utilization(),
+        }
+
+
+gemini_scheduler = GeminiScheduler()
+
+
+def _collect_key_utilization():
+    for label, usage in gemini_scheduler.utilization().items():
+        for limit in ("requests", "tokens", "daily_requests"):
+            GEMINI_KEY_UTILIZATION.set(usage[limit], key=label, limit=limit)
+
+
+registry.on_collect(_collect_key_utilization)
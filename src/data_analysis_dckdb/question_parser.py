@@ -0,0 +1,426 @@
+"""
+Question Parser
+Rule-based fast path that compiles simple analytical questions to DuckDB SQL without calling Gemini
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import duckdb
+import pyarrow as pa
+
+from src.config.settings import QUESTION_PARSER_ENABLED, QUESTION_PARSER_MAX_DISTINCT, QUESTION_PARSER_INDEX_CACHE
+from src.utils.metrics import registry, Counter
+
+QUESTION_PARSER_RESULTS = registry.register(Counter(
+    "question_parser_results_total", "Questions answered by the rule-based parser or passed on to Gemini", ("result",)
+))
+
+# Metric words, and the attribute columns seen across client datasets (also used by the conversation_bi prompt)
+VECTOR_KEYWORDS = ["sales", "amount", "margin", "asp", "abv", "rooms", "occupancy"]
+ATTRIBUTE_KEYWORDS = ['industry', 'customer', 'branch_name', 'brand', 'lob', 'bill_no', 'date', 'product', 'salesman',
+                      'category', 'subcategory', 'subcategory', 'groupfortax', 'saletype', 'area', 'state', 'city',
+                      'verticle']
+
+# Canonical metric -> words that mean it, as in the conversation_bi prompt
+METRIC_SYNONYMS = {
+    "amount": ["sales", "amount", "value", "price", "rev", "revenue", "earnings", "income"],
+    "volume": ["qty", "quantity", "units", "volume"],
+    "margin": ["margin", "markup"],
+}
+
+# Ratio metrics over the standard sales columns; used only when the dataset has every column involved
+DERIVED_METRICS = {
+    "margin": ('((sum("amount") / nullif(sum("total_purchase_price"), 0)) - 1) * 100',
+               ["amount", "total_purchase_price"]),
+    "asp": ('sum("amount") / nullif(sum("volume"), 0)', ["amount", "volume"]),
+    "abv": ('sum("amount") / nullif(count(distinct "bill_no"), 0)', ["amount", "bill_no"]),
+}
+
+AGGREGATE_WORDS = {
+    "total": "sum", "sum": "sum", "overall": "sum", "aggregate": "sum",
+    "average": "avg", "avg": "avg", "mean": "avg",
+    "count": "count", "number": "count", "many": "count",
+    "maximum": "max", "max": "max", "minimum": "min", "min": "min",
+}
+RANK_WORDS = {"top": "desc", "highest": "desc", "best": "desc", "most": "desc",
+              "bottom": "asc", "lowest": "asc", "worst": "asc", "least": "asc"}
+GROUP_WORDS = {"by", "per", "each", "every", "across", "wise"}
+DISTINCT_WORDS = {"unique", "distinct", "different"}
+STOP_WORDS = {"show", "me", "give", "get", "list", "display", "find", "tell", "what", "which", "is", "are", "was",
+              "the", "a", "an", "of", "for", "in", "on", "and", "with", "where", "how", "much", "please", "i",
+              "want", "to", "see", "from", "all", "us", "my", "our", "values", "its"}
+
+# Words that make a question lean on the previous turn ("now by brand", "same for 2023", "only those")
+FOLLOW_UP_WORDS = {"now", "also", "same", "instead", "again", "only", "just", "then", "too", "it", "that", "this",
+                   "those", "these", "them", "their", "its", "above", "previous", "earlier"}
+# Column name words that mark a time dimension stored as text or a number
+TIME_WORDS = {"date", "day", "week", "month", "quarter", "year", "period", "time"}
+
+DEFAULT_RANK_LIMIT = 10
+MAX_NGRAM = 4
+_SQL_AGGREGATE_NAMES = {"sum": "total", "avg": "average", "count": "count", "max": "max", "min": "min"}
+_AGGREGATE_PHRASES = {"sum": "total", "avg": "average", "count": "number of", "max": "highest", "min": "lowest"}
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+(?:['&.-][a-z0-9]+)*", str(text).lower())
+
+
+def _forms(word: str) -> Set[str]:
+    """A word and its plural spellings"""
+    forms = {word, word + "s", word + "es"}
+    if word.endswith("y"):
+        forms.add(word[:-1] + "ies")
+    if word.endswith("man"):
+        forms.add(word[:-3] + "men")
+    return forms
+
+
+def _quote(column: str) -> str:
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+class DatasetIndex:
+    """Column roles and the distinct values of low-cardinality text columns of one parquet file"""
+
+    def __init__(self, schema: pa.Schema, values: Dict[Tuple[str, ...], List[Tuple[str, str]]]):
+        # Grouping by these orders the result by the column (chronologically) rather than by the metric
+        self.temporal = {f.name for f in schema
+                         if pa.types.is_temporal(f.type) or TIME_WORDS & set(tokenize(f.name.replace("_", " ")))}
+        # Numeric columns are metrics, except known attributes such as bill_no and periods such as year
+        self.numeric = [f.name for f in schema
+                        if f.name.lower() not in ATTRIBUTE_KEYWORDS and f.name not in self.temporal
+                        and (pa.types.is_integer(f.type) or pa.types.is_floating(f.type)
+                             or pa.types.is_decimal(f.type))]
+        self.columns = list(schema.names)
+        self.aliases: Dict[Tuple[str, ...], str] = {}
+        for column in self.columns:
+            words = tokenize(column.replace("_", " "))
+            if not words:
+                continue
+            for form in _forms(words[-1]):
+                self.aliases.setdefault(tuple(words[:-1] + [form]), column)
+        by_lower = {c.lower(): c for c in self.columns}
+        for canonical, synonyms in METRIC_SYNONYMS.items():
+            if canonical in by_lower and by_lower[canonical] in self.numeric:
+                for synonym in synonyms:
+                    for form in _forms(synonym):
+                        self.aliases.setdefault((form,), by_lower[canonical])
+        self.derived = {name: spec for name, spec in DERIVED_METRICS.items()
+                        if all(col in by_lower for col in spec[1]) and name not in by_lower}
+        # normalized value tokens -> [(column, lowercased value)]
+        self.values: Dict[Tuple[str, ...], List[Tuple[str, str]]] = values
+
+    @classmethod
+    def build(cls, schema: pa.Schema, parquet_path: str, max_distinct: int = QUESTION_PARSER_MAX_DISTINCT):
+        text_columns = [f.name for f in schema if pa.types.is_string(f.type) or pa.types.is_large_string(f.type)]
+        values: Dict[Tuple[str, ...], List[Tuple[str, str]]] = {}
+        if text_columns:
+            conn = duckdb.connect(database=":memory:")
+            try:
+                source = f"parquet_scan({_literal(parquet_path)})"
+                estimates = ", ".join(f"approx_count_distinct({_quote(c)})" for c in text_columns)
+                counts = conn.execute(f"select {estimates} from {source}").fetchone()
+                for column, count in zip(text_columns, counts):
+                    if not count or count > max_distinct:
+                        continue
+                    rows = conn.execute(
+                        f"select distinct lower({_quote(column)}) from {source} where {_quote(column)} is not null"
+                    ).fetchall()
+                    for (value,) in rows:
+                        key = tuple(tokenize(value))
+                        if key and len(key) <= MAX_NGRAM:
+                            values.setdefault(key, []).append((column, value))
+            finally:
+                conn.close()
+        return cls(schema, values)
+
+
+class _Parse(NamedTuple):
+    metric: Optional[str]
+    aggregate: Optional[str]
+    group: Optional[str]
+    filters: Dict[str, List[str]]
+    distinct: Optional[str]
+    rank: Optional[Tuple[str, int]]
+
+
+class QuestionParser:
+    """
+    Compiles common question shapes straight to DuckDB SQL:
+
+        total amount by brand            -> sum per group
+        top 5 salesman by sales          -> ranked groups with a limit
+        show unique sectors              -> distinct values
+        amount for technology sector     -> KPI with a filter
+
+    Words are matched against the dataset's column names (plurals included),
+    metric synonyms and the distinct values of its low-cardinality text
+    columns. A question is compiled only when every word is accounted for and
+    the reading is unambiguous (one metric, at most one grouping column, each
+    value in a single column); anything else returns None and goes to Gemini.
+    Groupings by a date or period column are ordered by that column.
+    Responses have the same shape as AnalyticalFilter.get_sql_query.
+    """
+
+    def __init__(self, enabled: bool = QUESTION_PARSER_ENABLED, cache_size: int = QUESTION_PARSER_INDEX_CACHE):
+        self.enabled = enabled
+        self.cache_size = cache_size
+        self._indexes: "OrderedDict[tuple, DatasetIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.metrics = {"matched": 0, "fallthrough": 0, "follow_ups": 0, "index_builds": 0}
+
+    def index_for(self, schema: pa.Schema, parquet_path: str) -> DatasetIndex:
+        """Dataset index, rebuilt when the parquet file changes"""
+        stat = os.stat(parquet_path)
+        key = (os.path.abspath(parquet_path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                return index
+        index = DatasetIndex.build(schema, parquet_path)
+        with self._lock:
+            self._indexes[key] = index
+            self.metrics["index_builds"] += 1
+            while len(self._indexes) > self.cache_size:
+                self._indexes.popitem(last=False)
+        return index
+
+    def _read(self, question: str, index: DatasetIndex) -> Optional[_Parse]:
+        tokens = tokenize(question)
+        metric = aggregate = distinct = rank = None
+        dims: List[Tuple[str, bool]] = []  # (column, preceded by a grouping word)
+        filters: Dict[str, List[str]] = {}
+        grouped = False
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            # Single keywords win over data values that happen to be the same word
+            if token in RANK_WORDS:
+                limit = DEFAULT_RANK_LIMIT
+                if i + 1 < len(tokens) and tokens[i + 1].isdigit():
+                    limit = int(tokens[i + 1])
+                    i += 1
+                if rank is not None:
+                    return None
+                rank = (RANK_WORDS[token], limit)
+                i += 1
+                continue
+            if token in AGGREGATE_WORDS and (token, ) not in index.aliases:
+                if aggregate not in (None, AGGREGATE_WORDS[token]):
+                    return None
+                aggregate = AGGREGATE_WORDS[token]
+                i += 1
+                continue
+            if token in GROUP_WORDS:
+                grouped = True
+                i += 1
+                continue
+            if token in DISTINCT_WORDS:
+                distinct = True
+                i += 1
+                continue
+            if token in STOP_WORDS:
+                i += 1
+                continue
+
+            matched = False
+            for n in range(min(MAX_NGRAM, len(tokens) - i), 0, -1):
+                gram = tuple(tokens[i:i + n])
+                column = index.aliases.get(gram)
+                if column is None and n == 1 and gram[0] in index.derived:
+                    column = gram[0]
+                if column is not None:
+                    if column in index.numeric or column in index.derived:
+                        if metric not in (None, column):
+                            return None
+                        metric = column
+                    else:
+                        wise = i + n < len(tokens) and tokens[i + n] == "wise"
+                        dims.append((column, grouped or wise))
+                    grouped = False
+                    i += n
+                    matched = True
+                    break
+                candidates = index.values.get(gram)
+                if candidates:
+                    if len({col for col, _ in candidates}) > 1:
+                        return None
+                    col, value = candidates[0]
+                    filters.setdefault(col, []).append(value)
+                    i += n
+                    matched = True
+                    break
+            if not matched:
+                return None
+
+        dims = [(col, marked) for col, marked in dims if col not in filters]
+        if len({col for col, _ in dims}) > 1:
+            return None
+        group = dims[0][0] if dims else None
+
+        # "show brands" lists values; "by brand" alone is a follow-up that needs the conversation
+        if distinct or (group and not dims[0][1] and metric is None and aggregate is None and rank is None):
+            if group is None or metric is not None or aggregate is not None or rank is not None:
+                return None
+            return _Parse(None, None, None, filters, group, None)
+
+        if metric is None and aggregate != "count":
+            return None
+        if metric is None and group and not dims[0][1] and rank is None:
+            # "number of customers": count the distinct values rather than group by them
+            return _Parse(None, "count", None, filters, group, None)
+        if rank is not None and group is None:
+            return None
+        return _Parse(metric, aggregate or ("count" if metric is None else "sum"), group, filters, None, rank)
+
+    def _compile(self, parse: _Parse, index: DatasetIndex) -> dict:
+        where = []
+        for column, values in parse.filters.items():
+            values = list(dict.fromkeys(values))
+            if len(values) == 1:
+                where.append(f"lower({_quote(column)}) = {_literal(values[0])}")
+            else:
+                where.append(f"lower({_quote(column)}) in ({', '.join(_literal(v) for v in values)})")
+        where_sql = f" where {' and '.join(where)}" if where else ""
+        filter_text = " and ".join(f"{', '.join(v)} {c}" for c, v in parse.filters.items())
+        filter_phrase = f" for {filter_text}" if filter_text else ""
+        used = list(parse.filters)
+
+        if parse.distinct and parse.aggregate is None:
+            column = parse.distinct
+            return {
+                "preface": f"You want to see the distinct {column} values in the data{filter_phrase}.",
+                "Title": f"Unique {column.replace('_', ' ').title()}",
+                "X-axis": column,
+                "Y-axis": column,
+                "sql_query": f"select distinct {_quote(column)} from parquet_data{where_sql} order by 1;",
+                "Possible_charts": ["table"],
+                "col_list": list(dict.fromkeys([column] + used)),
+            }
+
+        if parse.metric is None:
+            if parse.distinct:
+                expression = f"count(distinct {_quote(parse.distinct)})"
+                alias, measured = f"{parse.distinct}_count", parse.distinct
+                used.append(parse.distinct)
+            else:
+                expression, alias, measured = "count(*)", "record_count", "records"
+        elif parse.metric in index.derived:
+            expression, columns = index.derived[parse.metric]
+            alias, measured = parse.metric, parse.metric
+            used.extend(columns)
+        else:
+            expression = f"{parse.aggregate}({_quote(parse.metric)})"
+            alias = f"{_SQL_AGGREGATE_NAMES[parse.aggregate]}_{parse.metric}"
+            measured = parse.metric
+            used.append(parse.metric)
+        select = f"round({expression}, 2) as {_quote(alias)}"
+        label = measured.replace("_", " ")
+        if parse.metric not in index.derived:
+            label = f"{_AGGREGATE_PHRASES[parse.aggregate]} {label}"
+
+        if parse.group is None:
+            return {
+                "preface": f"You're trying to find the {label}{filter_phrase} as a single figure.",
+                "Title": label.title(),
+                "X-axis": "",
+                "Y-axis": alias,
+                "sql_query": f"select {select} from parquet_data{where_sql};",
+                "Possible_charts": ["kpi card", "table"],
+                "col_list": list(dict.fromkeys(used)),
+            }
+
+        group = parse.group
+        charts = ["bar", "pie", "table", "donut", "treemap"]
+        limit_sql = f" limit {parse.rank[1]}" if parse.rank else ""
+        if parse.rank:
+            order = parse.rank[0]
+            which = "top" if order == "desc" else "bottom"
+            order_sql = f"{_quote(alias)} {order}"
+            preface = f"You're looking for the {which} {parse.rank[1]} {group} ranked by {label}{filter_phrase}."
+            title = f"{which.title()} {parse.rank[1]} {group.replace('_', ' ').title()} by {label.title()}"
+        elif group in index.temporal:
+            order_sql = _quote(group)
+            charts = ["line", "bar", "table", "area"]
+            preface = f"You want to see how the {label} changes over {group}{filter_phrase}."
+            title = f"{label.title()} by {group.replace('_', ' ').title()}"
+        else:
+            order_sql = f"{_quote(alias)} desc"
+            preface = f"You want to compare the {label} across each {group}{filter_phrase}."
+            title = f"{label.title()} by {group.replace('_', ' ').title()}"
+        return {
+            "preface": preface,
+            "Title": title,
+            "X-axis": group,
+            "Y-axis": alias,
+            "sql_query": (f"select {_quote(group)}, {select} from parquet_data{where_sql} "
+                          f"group by {_quote(group)} order by {order_sql}{limit_sql};"),
+            "Possible_charts": charts,
+            "col_list": list(dict.fromkeys([group] + used)),
+        }
+
+    @staticmethod
+    def _depends_on_history(question: str, parse: _Parse, user_history: Optional[dict]) -> bool:
+        """
+        Whether Gemini, which sees the session history, could read the question
+        differently: it refers back to an earlier turn, or it sets no filter of
+        its own while the last query was filtered (the prompt carries filters over).
+        """
+        if not user_history:
+            return False
+        if FOLLOW_UP_WORDS & set(tokenize(question)):
+            return True
+        _, answer = user_history[sorted(user_history)[-1]]
+        last_sql = answer.get("sql_query", "") if isinstance(answer, dict) else ""
+        return not parse.filters and re.search(r"\bwhere\b", str(last_sql), re.I) is not None
+
+    def parse(self, question: str, schema: pa.Schema, parquet_path: str,
+              user_history: Optional[dict] = None) -> Optional[dict]:
+        """
+        get_sql_query-style response for a confidently understood question, else None.
+
+        With session history (get_recent_history output), only questions that
+        stand on their own are compiled; follow-ups go to Gemini with the history.
+        """
+        if not self.enabled:
+            return None
+        try:
+            index = self.index_for(schema, parquet_path)
+            parse = self._read(question, index)
+            if parse and self._depends_on_history(question, parse, user_history):
+                parse = None
+                with self._lock:
+                    self.metrics["follow_ups"] += 1
+            response = self._compile(parse, index) if parse else None
+        except Exception as e:
+            print(f"Question parser failed, falling back to the LLM: {e}")
+            response = None
+
+        result = "matched" if response else "fallthrough"
+        with self._lock:
+            self.metrics[result] += 1
+        QUESTION_PARSER_RESULTS.inc(result=result)
+        return response
+
+    def stats(self) -> dict:
+        with self._lock:
+            handled = self.metrics["matched"] + self.metrics["fallthrough"]
+            return {
+                "enabled": self.enabled,
+                "datasets_indexed": len(self._indexes),
+                **self.metrics,
+                "match_rate": self.metrics["matched"] / handled if handled else 0.0,
+            }
+
+
+question_parser = QuestionParser()
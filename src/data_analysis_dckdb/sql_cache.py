@@ -0,0 +1,225 @@
+"""
+SQL Generation Cache
+Reuses Gemini-generated DuckDB queries for repeated questions against the same dataset schema
+"""
+
+import copy
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import duckdb
+
+from src.config.settings import (
+    SQL_CACHE_ENABLED, SQL_CACHE_PATH, SQL_CACHE_MEMORY_ENTRIES, SQL_CACHE_DISK_ENTRIES, SQL_CACHE_TTL_SECONDS
+)
+from src.utils.metrics import registry, Counter
+
+SQL_CACHE_LOOKUPS = registry.register(Counter(
+    "sql_cache_lookups_total", "SQL generation cache lookups by outcome", ("result",)
+))
+
+# Added to the get_sql_query response by query_analysis after execution; never cached
+_RESULT_FIELDS = ("success", "question", "schema_fingerprint")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop punctuation that does not change the query"""
+    question = re.sub(r"[?!.,;:]+(\s|$)", r"\1", question.lower())
+    return " ".join(question.split())
+
+
+def schema_fingerprint(schema) -> str:
+    """Hash of the column names and types of a pyarrow schema"""
+    fields = [(field.name, str(field.type)) for field in schema]
+    return hashlib.sha256(json.dumps(fields).encode("utf-8")).hexdigest()[:16]
+
+
+def history_digest(user_history: Optional[dict]) -> str:
+    """
+    Hash of the parts of the session history the model adapts to.
+
+    Only earlier questions and the SQL generated for them are used, which is
+    all get_sql_query puts in the prompt (see compact_history).
+    """
+    turns = []
+    for key in sorted(user_history or {}):
+        question, answer = user_history[key]
+        sql = answer.get("sql_query", "") if isinstance(answer, dict) else ""
+        turns.append((normalize_question(str(question)), " ".join(sql.lower().split())))
+    if not turns:
+        return ""
+    return hashlib.sha256(json.dumps(turns).encode("utf-8")).hexdigest()[:16]
+
+
+def examples_digest(examples: Optional[List[Tuple[str, str]]]) -> str:
+    """Hash of the few-shot (question, sql) pairs put in the prompt"""
+    if not examples:
+        return ""
+    pairs = [(normalize_question(question), " ".join(sql.lower().split())) for question, sql in examples]
+    return hashlib.sha256(json.dumps(pairs).encode("utf-8")).hexdigest()[:16]
+
+
+def cache_key(question: str, schema, user_history: Optional[dict], examples: Optional[List[Tuple[str, str]]] = None,
+              prompt_version: int = 0) -> str:
+    """
+    Key covering every input of the get_sql_query prompt: the question, the
+    dataset schema, the history and few-shot examples it is shown, and the
+    prompt template version (bumped whenever the prompt text changes).
+    """
+    parts = [str(prompt_version), normalize_question(question), schema_fingerprint(schema),
+             history_digest(user_history), examples_digest(examples)]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class SqlCache:
+    """
+    Two-tier cache of get_sql_query responses.
+
+    Entries live in an in-memory LRU backed by a SQLite file, so they survive
+    restarts and are shared by workers on the same host. The least recently
+    used entries are evicted past the size limits of each tier and entries
+    older than the TTL are ignored. A cached query is re-validated before
+    reuse: its columns must exist in the dataset and DuckDB must be able to
+    plan it (EXPLAIN) against the current parquet file.
+    """
+
+    def __init__(self, path: str = SQL_CACHE_PATH, memory_entries: int = SQL_CACHE_MEMORY_ENTRIES,
+                 disk_entries: int = SQL_CACHE_DISK_ENTRIES, ttl_seconds: float = SQL_CACHE_TTL_SECONDS,
+                 enabled: bool = SQL_CACHE_ENABLED):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (response, created_at)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._duckdb = duckdb.connect(database=":memory:")
+        self._duckdb_lock = threading.Lock()
+        self.metrics = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stale": 0,
+                        "stores": 0, "memory_evictions": 0, "disk_evictions": 0}
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sql_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS sql_cache_last_used ON sql_cache (last_used)")
+            self._conn.commit()
+        return self._conn
+
+    def _remember(self, key: str, response: dict, created_at: float):
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.metrics["memory_evictions"] += 1
+
+    def _forget(self, key: str):
+        self._memory.pop(key, None)
+        db = self._db()
+        db.execute("DELETE FROM sql_cache WHERE key = ?", (key,))
+        db.commit()
+
+    def _count(self, result: str):
+        self.metrics[result] += 1
+        SQL_CACHE_LOOKUPS.inc(result=result)
+
+    def validate(self, response: dict, schema, parquet_path: str) -> bool:
+        """True if the cached query still plans against the current dataset"""
+        columns = {name.lower() for name in schema.names}
+        if any(str(col).lower() not in columns for col in response.get("col_list") or []):
+            return False
+        sql = response["sql_query"].replace("parquet_data", f"parquet_scan('{parquet_path}')")
+        try:
+            with self._duckdb_lock:
+                self._duckdb.execute(f"EXPLAIN {sql.rstrip().rstrip(';')}")
+            return True
+        except duckdb.Error as e:
+            print(f"Cached SQL no longer valid: {e}")
+            return False
+
+    def get(self, key: str, schema, parquet_path: str) -> Optional[dict]:
+        """Validated copy of the cached response for key, or None"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            tier = "memory_hits"
+            if entry is None:
+                row = self._db().execute(
+                    "SELECT response, created_at FROM sql_cache WHERE key = ?", (key,)
+                ).fetchone()
+                entry = (json.loads(row[0]), row[1]) if row else None
+                tier = "disk_hits"
+            if entry is None or now - entry[1] > self.ttl_seconds:
+                self._count("misses")
+                return None
+
+        response, created_at = entry
+        if not self.validate(response, schema, parquet_path):
+            with self._lock:
+                self._forget(key)
+                self._count("stale")
+            return None
+
+        with self._lock:
+            self._remember(key, response, created_at)
+            db = self._db()
+            db.execute("UPDATE sql_cache SET last_used = ? WHERE key = ?", (now, key))
+            db.commit()
+            self._count(tier)
+        return copy.deepcopy(response)
+
+    def put(self, key: str, response: dict):
+        """Cache a response whose query executed successfully"""
+        if not self.enabled or not response.get("sql_query"):
+            return
+
+        response = {field: copy.deepcopy(value) for field, value in response.items() if field not in _RESULT_FIELDS}
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO sql_cache (key, response, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(response, default=str), now, now),
+            )
+            (rows,) = db.execute("SELECT COUNT(*) FROM sql_cache").fetchone()
+            if rows > self.disk_entries:
+                db.execute(
+                    "DELETE FROM sql_cache WHERE key IN "
+                    "(SELECT key FROM sql_cache ORDER BY last_used LIMIT ?)",
+                    (rows - self.disk_entries,),
+                )
+                self.metrics["disk_evictions"] += rows - self.disk_entries
+            db.commit()
+            self.metrics["stores"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.metrics["memory_hits"] + self.metrics["disk_hits"]
+            lookups = hits + self.metrics["misses"] + self.metrics["stale"]
+            disk_rows = self._db().execute("SELECT COUNT(*) FROM sql_cache").fetchone()[0] if self.enabled else 0
+            return {
+                "enabled": self.enabled,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_rows,
+                **self.metrics,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+
+sql_cache = SqlCache()
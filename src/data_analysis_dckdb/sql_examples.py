@@ -0,0 +1,247 @@
+"""
+SQL Example Index
+Past question -> SQL pairs that executed successfully, retrieved by embedding similarity as few-shot examples
+"""
+
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from src.config.settings import (
+    SQL_EXAMPLES_ENABLED, SQL_EXAMPLES_TOP_K, SQL_EXAMPLES_MIN_SIMILARITY, SQL_EXAMPLES_MAX,
+    SQL_EXAMPLES_REFRESH_SECONDS
+)
+from src.data_analysis_dckdb.sql_cache import normalize_question, schema_fingerprint
+from src.db_connection.db_engine import Engine, Read_Write
+from src.profiles.embedder import embedding_service
+
+# Executed entries only: query_analysis stores "success" rows (and the dataset's schema fingerprint) after the
+# query ran. Entries recorded without a fingerprint cannot be scoped to a dataset and are skipped.
+_EXAMPLES_QUERY = '''select s."User_Id" as user_id, e.value->>'question' as question,
+                e.value->'answer'->>'sql_query' as sql_query,
+                e.value->'answer'->>'schema_fingerprint' as schema_fingerprint
+                from "Session_Management" s, jsonb_each(s."Session_Data") e
+                where jsonb_exists(e.value->'answer', 'success') and e.value->'answer'->>'sql_query' is not null
+                and e.value->'answer'->>'schema_fingerprint' is not null
+                order by s."Created_On" desc limit {limit};'''
+
+
+class SqlExample(NamedTuple):
+    user_id: str
+    schema: str  # schema_fingerprint of the dataset the query ran on
+    question: str
+    sql: str
+
+
+def _compact_sql(sql: str) -> str:
+    return " ".join(str(sql).split())
+
+
+def compact_history(user_history: Optional[dict]) -> List[Tuple[str, str]]:
+    """(question, sql) pairs from get_recent_history output, without the result rows"""
+    pairs = []
+    for key in sorted(user_history or {}):
+        question, answer = user_history[key]
+        if isinstance(answer, dict) and answer.get("sql_query"):
+            pairs.append((str(question), _compact_sql(answer["sql_query"])))
+    return pairs
+
+
+def format_examples(pairs: List[Tuple[str, str]]) -> str:
+    if not pairs:
+        return "None"
+    return "\n".join(f"Q: {question}\nSQL: {sql}" for question, sql in pairs)
+
+
+def _example(user_id, schema, question, sql) -> Optional[SqlExample]:
+    if not user_id or not schema or not question or not sql:
+        return None
+    return SqlExample(str(user_id), str(schema), str(question).strip(), _compact_sql(sql))
+
+
+class SqlExampleIndex:
+    """
+    Embedding index over every question -> SQL pair that executed successfully.
+
+    Pairs are read from Session_Management and added as new queries succeed.
+    Examples are only offered to the same user on a dataset with the same
+    schema fingerprint, so filter values from one user's data never reach
+    another user's prompt. All embedding of examples happens on a background
+    thread: stored pairs at start() and then every refresh interval (only new
+    pairs are embedded), and pairs passed to add() as soon as the thread wakes
+    up. Lookups use whatever is loaded so far and never wait for it. A pair
+    whose embedding fails is not marked as seen, so the next refresh, which
+    reads it back from Session_Management, retries it.
+    """
+
+    def __init__(self, top_k: int = SQL_EXAMPLES_TOP_K, min_similarity: float = SQL_EXAMPLES_MIN_SIMILARITY,
+                 max_examples: int = SQL_EXAMPLES_MAX, refresh_seconds: float = SQL_EXAMPLES_REFRESH_SECONDS,
+                 enabled: bool = SQL_EXAMPLES_ENABLED):
+        self.top_k = top_k
+        self.min_similarity = min_similarity
+        self.max_examples = max_examples
+        self.refresh_seconds = refresh_seconds
+        self.enabled = enabled
+        self.connection = Engine()
+        self.db_funct = Read_Write()
+        self._examples: List[SqlExample] = []
+        self._vectors = None  # float32[n, dim], unit length
+        self._keys: Set[Tuple[str, str, str, str]] = set()
+        self._groups: Dict[Tuple[str, str], List[int]] = {}  # (user_id, schema fingerprint) -> example rows
+        self._pending: List[SqlExample] = []  # added by requests, waiting for the background thread
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.loaded_at = None
+        self.metrics = {"lookups": 0, "with_examples": 0, "examples_returned": 0, "refreshes": 0,
+                        "refresh_failures": 0, "add_failures": 0}
+
+    @staticmethod
+    def _key(example: SqlExample) -> Tuple[str, str, str, str]:
+        return example.user_id, example.schema, normalize_question(example.question), example.sql.lower()
+
+    def _append(self, examples: List[SqlExample]):
+        """Embed and add examples not seen before; raises (recording nothing) if embedding fails"""
+        new = {}
+        with self._lock:
+            for example in examples:
+                key = self._key(example)
+                if key not in self._keys and key not in new:
+                    new[key] = example
+        if not new:
+            return
+        vectors = embedding_service.encode_documents([e.question for e in new.values()])
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        with self._lock:
+            added = []
+            for (key, example), vector in zip(new.items(), vectors):
+                if key in self._keys:
+                    continue  # added by another thread while this one was embedding
+                self._keys.add(key)
+                self._groups.setdefault((example.user_id, example.schema), []).append(len(self._examples))
+                self._examples.append(example)
+                added.append(vector)
+            if added:
+                self._vectors = np.vstack(added if self._vectors is None else [self._vectors, *added])
+
+    def _drain_pending(self):
+        """Embed the pairs queued by add()"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        try:
+            self._append(pending)
+        except Exception as e:
+            # Not marked as seen: the next refresh reads them back from Session_Management
+            with self._lock:
+                self.metrics["add_failures"] += len(pending)
+            print(f"Could not add SQL examples: {e}")
+
+    def refresh(self):
+        """Read executed pairs from Session_Management"""
+        connect, status = self.connection.connect_engine()
+        if status != 1:
+            self.metrics["refresh_failures"] += 1
+            print(f"SQL example refresh failed: {connect}")
+            return
+        try:
+            df_, status = self.db_funct.fetch_data(_EXAMPLES_QUERY.format(limit=int(self.max_examples)), connect)
+        finally:
+            self.connection.disconnect_engine(connect)
+        if status != 1:
+            self.metrics["refresh_failures"] += 1
+            return
+        examples = [_example(row.user_id, row.schema_fingerprint, row.question, row.sql_query)
+                    for row in df_.itertuples()]
+        self._append([e for e in examples if e is not None])
+        self.metrics["refreshes"] += 1
+        self.loaded_at = time.time()
+        print(f"SQL example index: {len(self._examples)} examples")
+
+    def start(self):
+        """Load stored pairs and keep refreshing them in a daemon thread (once per process)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._refresh_loop, name="sql-examples", daemon=True)
+        self._thread.start()
+
+    def _refresh_loop(self):
+        next_refresh = 0.0
+        while True:
+            if time.monotonic() >= next_refresh:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    self.metrics["refresh_failures"] += 1
+                    print(f"SQL example refresh failed: {e}")
+                next_refresh = time.monotonic() + self.refresh_seconds
+            self._wakeup.wait(max(0.0, next_refresh - time.monotonic()))
+            self._wakeup.clear()
+            self._drain_pending()
+
+    def similar(self, question: str, schema, user_id, exclude: List[Tuple[str, str]] = ()) -> List[Tuple[str, str]]:
+        """Up to top_k of the user's (question, sql) pairs on this schema that are nearest to question"""
+        if not self.enabled:
+            return []
+        self.start()
+        try:
+            with self._lock:
+                self.metrics["lookups"] += 1
+                rows = list(self._groups.get((str(user_id), schema_fingerprint(schema)), ()))
+            if not rows:
+                return []
+            query = embedding_service.encode(question)[0]
+            query = query / max(float(np.linalg.norm(query)), 1e-12)
+            with self._lock:
+                similarities = self._vectors[rows] @ query
+            skip = {sql.lower() for _, sql in exclude}
+            pairs = []
+            for i in np.argsort(-similarities):
+                if similarities[i] < self.min_similarity or len(pairs) >= self.top_k:
+                    break
+                example = self._examples[rows[i]]
+                if example.sql.lower() not in skip:
+                    skip.add(example.sql.lower())
+                    pairs.append((example.question, example.sql))
+        except Exception as e:
+            print(f"SQL example lookup failed: {e}")
+            return []
+        with self._lock:
+            self.metrics["with_examples"] += bool(pairs)
+            self.metrics["examples_returned"] += len(pairs)
+        return pairs
+
+    def add(self, question: str, response: dict, schema, user_id):
+        """Queue a pair whose query just executed successfully; it is embedded on the background thread"""
+        if not self.enabled:
+            return
+        example = _example(user_id, schema_fingerprint(schema), question, response.get("sql_query"))
+        if example is None:
+            return
+        with self._lock:
+            self._pending.append(example)
+            del self._pending[:-self.max_examples]
+        self.start()
+        self._wakeup.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.metrics["lookups"]
+            return {
+                "enabled": self.enabled,
+                "loaded": self.loaded_at is not None,
+                "examples": len(self._examples),
+                "scopes": len(self._groups),
+                "pending": len(self._pending),
+                **self.metrics,
+                "examples_per_lookup": self.metrics["examples_returned"] / lookups if lookups else 0.0,
+            }
+
+
+sql_examples = SqlExampleIndex()
@@ -0,0 +1,123 @@
+"""
+Context Packer
+Fits retrieved chunks into a per-profile token budget without near-duplicates
+"""
+
+import math
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+from src.config.settings import (
+    CLIENTS, CONTEXT_TOKEN_BUDGET, CONTEXT_CHARS_PER_TOKEN, MMR_LAMBDA, MMR_DUPLICATE_SIMILARITY
+)
+from src.profiles.loader import RetrievalResult
+
+CHUNK_OVERHEAD_TOKENS = 16  # "[Source i] (Relevance Score: ...)" header and separator lines
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count used for budgeting"""
+    return math.ceil(len(text) / CONTEXT_CHARS_PER_TOKEN) if text else 0
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype="float32")
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+class ContextPacker:
+    """
+    Chooses which retrieved chunks go into the prompt.
+
+    Chunks are ordered by maximal marginal relevance over their stored
+    embeddings, so a passage repeated in faq.txt and knowledge.txt is not sent
+    twice; chunks nearly identical to one already chosen are dropped. Chunks
+    are then taken in that order while they fit the profile's token budget,
+    and the first one is truncated rather than dropped if it alone is too long.
+    """
+
+    def __init__(self, budget: int = CONTEXT_TOKEN_BUDGET, mmr_lambda: float = MMR_LAMBDA,
+                 duplicate_similarity: float = MMR_DUPLICATE_SIMILARITY):
+        self.budget = budget
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_similarity = duplicate_similarity
+        self._lock = threading.Lock()
+        self.metrics = {"packs": 0, "chunks_in": 0, "duplicates_dropped": 0, "over_budget_dropped": 0,
+                        "truncated": 0, "tokens_packed": 0}
+
+    def budget_for(self, profile_id: str) -> int:
+        return CLIENTS.get(profile_id, {}).get("context_token_budget", self.budget)
+
+    def _mmr_order(self, query_vector: np.ndarray, vectors: np.ndarray) -> List[int]:
+        """Row order by maximal marginal relevance, without near-duplicate rows"""
+        vectors = _unit(vectors)
+        relevance = vectors @ _unit(query_vector).ravel()
+        pairwise = vectors @ vectors.T
+
+        remaining = list(range(len(vectors)))
+        chosen: List[int] = []
+        while remaining:
+            if chosen:
+                redundancy = pairwise[np.ix_(remaining, chosen)].max(axis=1)
+            else:
+                redundancy = np.zeros(len(remaining), dtype="float32")
+            scores = self.mmr_lambda * relevance[remaining] - (1.0 - self.mmr_lambda) * redundancy
+            best = int(np.argmax(scores))
+            row = remaining.pop(best)
+            if redundancy[best] >= self.duplicate_similarity:
+                with self._lock:
+                    self.metrics["duplicates_dropped"] += 1
+                continue
+            chosen.append(row)
+        return chosen
+
+    def pack(self, profile_id: str, vector_store, retrieval: RetrievalResult) -> RetrievalResult:
+        """The retrieval narrowed (and possibly truncated) to what goes into the prompt"""
+        if not retrieval.documents:
+            return retrieval
+
+        order = list(range(len(retrieval.documents)))
+        vectors: Optional[np.ndarray] = None
+        if retrieval.query_embedding is not None and len(order) > 1:
+            vectors = vector_store.chunk_vectors(retrieval.chunk_ids)
+        if vectors is not None:
+            order = self._mmr_order(retrieval.query_embedding, vectors)
+
+        budget = self.budget_for(profile_id)
+        used, chunk_ids, documents = 0, [], []
+        over_budget = truncated = 0
+        for row in order:
+            text, score = retrieval.documents[row]
+            cost = count_tokens(text) + CHUNK_OVERHEAD_TOKENS
+            if used + cost > budget:
+                if documents:
+                    over_budget += 1
+                    continue
+                text = text[:max(budget - CHUNK_OVERHEAD_TOKENS, 0) * CONTEXT_CHARS_PER_TOKEN]
+                cost = count_tokens(text) + CHUNK_OVERHEAD_TOKENS
+                truncated += 1
+            used += cost
+            chunk_ids.append(retrieval.chunk_ids[row])
+            documents.append((text, score))
+
+        with self._lock:
+            self.metrics["packs"] += 1
+            self.metrics["chunks_in"] += len(retrieval.documents)
+            self.metrics["over_budget_dropped"] += over_budget
+            self.metrics["truncated"] += truncated
+            self.metrics["tokens_packed"] += used
+        print(f"Packed context for {profile_id}: {len(documents)}/{len(retrieval.documents)} chunks, "
+              f"~{used}/{budget} tokens")
+        return RetrievalResult(retrieval.query_embedding, chunk_ids, documents)
+
+    def stats(self) -> dict:
+        with self._lock:
+            metrics = dict(self.metrics)
+        packs = metrics["packs"]
+        metrics["tokens_packed_avg"] = metrics.pop("tokens_packed") / packs if packs else 0.0
+        return metrics
+
+
+context_packer = ContextPacker()
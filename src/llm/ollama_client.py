@@ -0,0 +1,175 @@
+"""
+Ollama HTTP Client
+Pooled keep-alive connections to the Ollama API, sync and async
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from src.config.settings import (
+    OLLAMA_BASE_URL, OLLAMA_POOL_SIZE, OLLAMA_CONNECT_TIMEOUT, OLLAMA_READ_TIMEOUT, OLLAMA_KEEPALIVE_EXPIRY
+)
+
+
+class ConnectionStats:
+    """Request and connection counters; a completed request that did not open a connection reused one"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.connections_opened = 0
+        self.connect_seconds_total = 0.0
+        self.connect_seconds_max = 0.0
+
+    def record_request(self, failed: bool = False):
+        with self._lock:
+            self.requests += 1
+            self.failures += failed
+
+    def record_connect(self, seconds: float):
+        with self._lock:
+            self.connections_opened += 1
+            self.connect_seconds_total += seconds
+            self.connect_seconds_max = max(self.connect_seconds_max, seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            opened = self.connections_opened
+            completed = self.requests - self.failures
+            return {
+                "requests": self.requests,
+                "failures": self.failures,
+                "connections_opened": opened,
+                "reuse_rate": max(0.0, 1.0 - opened / completed) if completed else 0.0,
+                "connect_ms_avg": self.connect_seconds_total / opened * 1000 if opened else 0.0,
+                "connect_ms_max": self.connect_seconds_max * 1000,
+            }
+
+
+def _timed_pool_class(base, stats: ConnectionStats):
+    """Connection pool class whose new connections report how long connecting took"""
+
+    def _new_conn(self):
+        conn = base._new_conn(self)
+        connect = conn.connect
+
+        def timed_connect():
+            start = time.perf_counter()
+            connect()
+            stats.record_connect(time.perf_counter() - start)
+
+        conn.connect = timed_connect
+        return conn
+
+    return type(f"Timed{base.__name__}", (base,), {"_new_conn": _new_conn})
+
+
+class _PooledAdapter(HTTPAdapter):
+    def __init__(self, stats: ConnectionStats, pool_size: int):
+        self._stats = stats
+        super().__init__(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _timed_pool_class(HTTPConnectionPool, self._stats),
+            "https": _timed_pool_class(HTTPSConnectionPool, self._stats),
+        }
+
+
+class OllamaClient:
+    """
+    Shared HTTP client for the Ollama API.
+
+    Sync calls go through one requests.Session whose pool keeps up to pool_size
+    keep-alive connections (callers beyond that wait for a free connection
+    instead of opening more). Async calls use an httpx.AsyncClient, one per
+    event loop since its connections are bound to the loop that opened them.
+    Both report into the same ConnectionStats.
+    """
+
+    def __init__(self, base_url: str = OLLAMA_BASE_URL, pool_size: int = OLLAMA_POOL_SIZE,
+                 connect_timeout: float = OLLAMA_CONNECT_TIMEOUT, read_timeout: float = OLLAMA_READ_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.stats = ConnectionStats()
+        self.session = requests.Session()
+        adapter = _PooledAdapter(self.stats, pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def _timeout(self, read_timeout: Optional[float]) -> tuple:
+        return self.connect_timeout, read_timeout or self.read_timeout
+
+    def post(self, path: str, payload: dict, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        """POST to the Ollama API over a pooled connection; timeout bounds the read"""
+        try:
+            response = self.session.post(
+                f"{self.base_url}{path}", json=payload, timeout=self._timeout(timeout), **kwargs
+            )
+        except Exception:
+            self.stats.record_request(failed=True)
+            raise
+        self.stats.record_request(failed=response.status_code >= 500)
+        return response
+
+    def _async_client(self):
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(
+                    max_connections=self.pool_size, max_keepalive_connections=self.pool_size,
+                    keepalive_expiry=OLLAMA_KEEPALIVE_EXPIRY,
+                ),
+            )
+            self._async_clients[loop] = client
+        return client
+
+    async def apost(self, path: str, payload: dict, timeout: Optional[float] = None):
+        """Async POST to the Ollama API; returns an httpx.Response"""
+        import httpx
+
+        connect_started = {}
+
+        async def trace(event: str, info: dict):
+            if event == "connection.connect_tcp.started":
+                connect_started["at"] = time.perf_counter()
+            elif event == "connection.connect_tcp.complete" and "at" in connect_started:
+                self.stats.record_connect(time.perf_counter() - connect_started["at"])
+
+        connect_timeout, read_timeout = self._timeout(timeout)
+        try:
+            response = await self._async_client().post(
+                path, json=payload,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                extensions={"trace": trace},
+            )
+        except Exception:
+            self.stats.record_request(failed=True)
+            raise
+        self.stats.record_request(failed=response.status_code >= 500)
+        return response
+
+    async def aclose(self):
+        """Close the async client of the running event loop"""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def close(self):
+        self.session.close()
@@ -1,4 +1,13 @@
-from src.config.settings import ENABLE_NO_CONTEXT_FALLBACK, LLM_TEMPERATURE, OLLAMA_BASE_URL, LLM_MODEL
+from src.config.settings import (
+    ENABLE_NO_CONTEXT_FALLBACK, LLM_TEMPERATURE, OLLAMA_BASE_URL, LLM_MODEL, LLM_KEEP_ALIVE,
+    STREAM_NOT_FOUND_PREFIX_CHARS
+)
+from src.llm.context_packer import count_tokens
+from src.llm.ollama_client import OllamaClient
+from src.utils.metrics import observe_stage, stage_timer, client_label, LLM_PROMPT_TOKENS
+import json
+import threading
+import time
 import requests
 
 SYSTEM_CONTRACT = """You are a knowledge-aware assistant for a specific knowledge profile ({profile_id}).
@@ -51,7 +60,11 @@ class LLMProcessor:
     def __init__(self, base_url: str = OLLAMA_BASE_URL):
         self.base_url = base_url
         self.model = LLM_MODEL
-        self.api_endpoint = f"{base_url}/api/generate"
+        self.api_endpoint = f"{base_url}/api/chat"
+        self.client = OllamaClient(base_url)
+        self._system_messages = {}
+        self._timings_lock = threading.Lock()
+        self.timings = {"calls": 0, "prompt_tokens": 0, "prompt_eval_ms": 0.0, "eval_ms": 0.0}
         # self._verify_ollama_connection()
 
     # def process_query(self, query, retrieved_documents, profile_id):
@@ -97,105 +110,160 @@ class LLMProcessor:
 
         return any(pattern in response_lower for pattern in not_found_patterns)
 
+    def _no_context_messages(self, query: str) -> list:
+        return [
+            {"role": "system", "content": WEB_SEARCH_CONTRACT},
+            {"role": "user", "content": f"""Question: {query}
+
+Note: No context was provided for this question.
+Respond with the standard "Would you like me to perform a web search for this instead?" message."""},
+        ]
+
     def _handle_no_context(self, query: str) -> str:
         """
         Fallback handler when no context is found.
         This should rarely execute in production.
         """
-        prompt = f"""{WEB_SEARCH_CONTRACT}
-
-            Question: {query}
-
-            Note: No context was provided for this question.
-            Respond with the standard "Would you like me to perform a web search for this instead?" message."""
-
-        return self._call_ollama(prompt, timeout=30)
+        return self._call_ollama(self._no_context_messages(query), timeout=30)
 
     def _build_context_string(self, documents):
         """Build formatted context string from retrieved documents"""
         context_parts = ["=== KNOWLEDGE BASE CONTEXT ===", ""]
 
         for i, (doc_text, score) in enumerate(documents, 1):
-            print(i, (doc_text, score))
             context_parts.extend([
                 f"[Source {i}] (Relevance Score: {score:.1%})",
                 "-" * 40,
                 doc_text.strip(),
                 ""
             ])
-        print("hello in build context")
         context_parts.extend(["=" * 40, "END OF KNOWLEDGE BASE", ""])
-        print(context_parts)
-        print("\n".join(context_parts))
         return "\n".join(context_parts)
 
-    def _build_prompt(self, query: str, context: str, profile_id: str,
-                      conversation_context=None):
-        """Build the final prompt with system contract enforced and optional conversation context for follow-ups"""
+    def _system_message(self, profile_id: str) -> dict:
+        """
+        The profile's system contract, built once and reused byte for byte.
+
+        It is the first message of every chat request, so Ollama sees the same
+        prompt prefix each time and can reuse its cached evaluation instead of
+        re-reading the contract on every query.
+        """
+        message = self._system_messages.get(profile_id)
+        if message is None:
+            # Use the centralized SYSTEM_CONTRACT with profile_id substitution
+            message = {"role": "system", "content": SYSTEM_CONTRACT.format(profile_id=profile_id)}
+            self._system_messages[profile_id] = message
+        return message
+
+    def _build_messages(self, query: str, context: str, profile_id: str,
+                        conversation_context=None) -> list:
+        """Chat messages: the static system contract first, everything per-query after it"""
 
         # Inject conversation context if available (for follow-up questions)
         context_injection = ""
         if conversation_context:
             context_injection = f"\n\nCONVERSATION CONTEXT FOR FOLLOW-UP:\n{conversation_context}\n"
-        print("this is conversation context")
-        # Use the centralized SYSTEM_CONTRACT with profile_id substitution
-        system_rules = SYSTEM_CONTRACT.format(profile_id=profile_id)
-        print("this is system rules")
-        return f"""<system_contract>
-                {system_rules}
-                </system_contract>
+        return [
+            self._system_message(profile_id),
+            {"role": "user", "content": f"""CONTEXT FROM KNOWLEDGE BASE:
+{context}{context_injection}
+QUESTION: {query}
+
+ANSWER (using ONLY the context above, following the system contract):"""},
+        ]
 
-                CONTEXT FROM KNOWLEDGE BASE:
-                {context}{context_injection}
-                QUESTION: {query}
+    def _chat_payload(self, messages: list, stream: bool = False) -> dict:
+        return {
+            "model": self.model,
+            "messages": messages,
+            "stream": stream,
+            "keep_alive": LLM_KEEP_ALIVE,
+            "options": {"temperature": LLM_TEMPERATURE},
+        }
+
+    def _record_timings(self, body: dict, profile_id: str = None):
+        """Accumulate Ollama's prompt/generation timings from a final response"""
+        if "prompt_eval_duration" not in body and "eval_duration" not in body:
+            return
+        observe_stage("llm_prompt_eval", profile_id, body.get("prompt_eval_duration", 0) / 1e9)
+        observe_stage("llm_generation", profile_id, body.get("eval_duration", 0) / 1e9)
+        with self._timings_lock:
+            self.timings["calls"] += 1
+            self.timings["prompt_tokens"] += body.get("prompt_eval_count", 0)
+            self.timings["prompt_eval_ms"] += body.get("prompt_eval_duration", 0) / 1e6
+            self.timings["eval_ms"] += body.get("eval_duration", 0) / 1e6
+
+    def _parse_chat_response(self, status_code: int, body, profile_id: str = None) -> str:
+        """Answer text from an /api/chat response; body is a callable returning the JSON or the text"""
+        if status_code == 200:
+            data = body()
+            self._record_timings(data, profile_id)
+            answer = data.get("message", {}).get("content", "").strip()
+            return answer if answer else "This question is not within the scope of the selected client. Would you like me to perform a web search for this instead?"
+        return self._call_failed("status", f"{status_code}: {body(text=True)}")
+
+    def _call_failed(self, kind: str, detail=None) -> str:
+        """
+        Log a failed Ollama call once and return the "ERROR: ..." answer for it.
 
-                ANSWER (using ONLY the context above, following the system contract):"""
+        kind is "status" (non-200 reply), "timeout", "connect" or "error"; the
+        sync, async and streaming paths share these messages.
+        """
+        if kind == "status":
+            print(f"Ollama returned status {detail}")
+            return "ERROR: LLM service returned an error. Please try again."
+        if kind == "timeout":
+            print(f"Ollama request timed out ({detail}+ seconds)")
+            return "ERROR: Response took too long. Please try a shorter question or simpler topic. (Local CPU models can be slow for complex queries)"
+        if kind == "connect":
+            print(f"Cannot connect to Ollama at {self.api_endpoint}")
+            return "ERROR: LLM service is not running. Ensure Ollama is running: ollama serve"
+        print(f"Error calling Ollama: {str(detail)}")
+        return f"ERROR: LLM processing failed: {str(detail)}"
 
-    def _call_ollama(self, prompt: str, timeout: int = 500) -> str:
+    def _call_ollama(self, messages: list, timeout: int = 500, profile_id: str = None) -> str:
         """
         Common method to call Ollama API with error handling.
 
         Args:
-            prompt: The prompt to send to the LLM
+            messages: The chat messages to send to the LLM
             timeout: Request timeout in seconds
+            profile_id: Profile the call is for, used to label latency metrics
 
         Returns:
             LLM response string or error message
         """
         try:
-            response = requests.post(
-                self.api_endpoint,
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "temperature": LLM_TEMPERATURE,
-                },
-                timeout=timeout
+            with stage_timer("llm_call", profile_id):
+                response = self.client.post("/api/chat", self._chat_payload(messages), timeout=timeout)
+            return self._parse_chat_response(
+                response.status_code, lambda text=False: response.text if text else response.json(), profile_id
             )
-            print("This is try section of call_ollama", response.status_code)
-            if response.status_code == 200:
-                print("response code is 200")
-                answer = response.json().get("response", "").strip()
-                print(answer)
-                return answer if answer else "This question is not within the scope of the selected client. Would you like me to perform a web search for this instead?"
-            else:
-                # logger.error(f"Ollama returned status {response.status_code}: {response.text}")
-                print(f"Ollama returned status {response.status_code}: {response.text}")
-                return "ERROR: LLM service returned an error. Please try again."
 
         except requests.exceptions.Timeout:
-            # logger.error(f"Ollama request timed out ({timeout}+ seconds)")
-            print(f"Ollama request timed out ({timeout}+ seconds)")
-            return "ERROR: Response took too long. Please try a shorter question or simpler topic. (Local CPU models can be slow for complex queries)"
+            return self._call_failed("timeout", timeout)
         except requests.exceptions.ConnectionError:
-            # logger.error(f"Cannot connect to Ollama at {self.api_endpoint}")
-            print(f"Cannot connect to Ollama at {self.api_endpoint}")
-            return "ERROR: LLM service is not running. Ensure Ollama is running: ollama serve"
+            return self._call_failed("connect")
+        except Exception as e:
+            return self._call_failed("error", e)
+
+    async def _call_ollama_async(self, messages: list, timeout: int = 500, profile_id: str = None) -> str:
+        """Async counterpart of _call_ollama; same answers and error strings"""
+        import httpx
+
+        try:
+            with stage_timer("llm_call", profile_id):
+                response = await self.client.apost("/api/chat", self._chat_payload(messages), timeout=timeout)
+            return self._parse_chat_response(
+                response.status_code, lambda text=False: response.text if text else response.json(), profile_id
+            )
+
+        except httpx.TimeoutException:
+            return self._call_failed("timeout", timeout)
+        except httpx.ConnectError:
+            return self._call_failed("connect")
         except Exception as e:
-            # logger.error(f"Error calling Ollama: {str(e)}")
-            print(f"Error calling Ollama: {str(e)}")
-            return f"ERROR: LLM processing failed: {str(e)}"
+            return self._call_failed("error", e)
 
     def process_query(
             self,
@@ -230,19 +298,47 @@ class LLMProcessor:
             else:
                 return "This question is not within the scope of the selected client. Would you like me to perform a web search for this instead?"
 
+        messages = self._messages_for(query, retrieved_documents, profile_id, conversation_context)
+
+        # Call LLM using the common method
+        answer = self._call_ollama(messages, timeout=500, profile_id=profile_id)
+
+        return self._standardize_answer(answer)
+
+    async def process_query_async(
+            self,
+            query: str,
+            retrieved_documents: str,
+            profile_id: str,
+            conversation_context=None
+    ) -> str:
+        """
+        Awaitable process_query for async request handlers.
+
+        Same guardrails and answers; the Ollama call goes through the pooled
+        async client, so no worker thread is held while the model generates.
+        """
+        if not retrieved_documents:
+            if ENABLE_NO_CONTEXT_FALLBACK:
+                return await self._call_ollama_async(self._no_context_messages(query), timeout=30)
+            return "This question is not within the scope of the selected client. Would you like me to perform a web search for this instead?"
+
+        messages = self._messages_for(query, retrieved_documents, profile_id, conversation_context)
+        answer = await self._call_ollama_async(messages, timeout=500, profile_id=profile_id)
+        return self._standardize_answer(answer)
+
+    def _messages_for(self, query, retrieved_documents, profile_id, conversation_context=None) -> list:
         # GUARDRAIL 2: Build context string with document attribution
-        print("Build context string with document attribution")
-        context_text = self._build_context_string(retrieved_documents)
-        print("this is context text")
+        with stage_timer("context_build", profile_id):
+            context_text = self._build_context_string(retrieved_documents)
 
         # GUARDRAIL 3: "Build the prompt with explicit isolation markers and conversation context
-        print("Build the prompt with explicit isolation markers and conversation context")
-        full_prompt = self._build_prompt(query, context_text, profile_id, conversation_context)
-        print("This is full prompt /n=================")
-
-        # Call LLM using the common method
-        answer = self._call_ollama(full_prompt, timeout=500)
+        with stage_timer("prompt_build", profile_id):
+            messages = self._build_messages(query, context_text, profile_id, conversation_context)
+        LLM_PROMPT_TOKENS.observe(sum(count_tokens(m["content"]) for m in messages), client_id=client_label(profile_id))
+        return messages
 
+    def _standardize_answer(self, answer: str) -> str:
         # GUARDRAIL 4: Detect if LLM says it can't find the information
         # Replace LLM-generated "not found" messages with our standardized message
         if self._is_not_found_response(answer):
@@ -250,6 +346,104 @@ class LLMProcessor:
 
         return answer
 
+    def stream_query(self, query: str, retrieved_documents, profile_id: str, conversation_context=None,
+                     timeout: int = 500):
+        """
+        Streaming process_query: yields (event, text) pairs as Ollama generates.
+
+        Events are "token" (text to append), "correction" (replace everything
+        shown so far with this answer) and "error" (an "ERROR: ..." message).
+        The not-found guardrail runs early: text is held back until the first
+        line or STREAM_NOT_FOUND_PREFIX_CHARS characters, and if that prefix
+        already reads as "not found" generation is stopped and the standard
+        message is sent. Because the model can still back out later, the full
+        answer is checked again at the end and a correction is sent if needed.
+        """
+        out_of_scope = "This question is not within the scope of the selected client. Would you like me to perform a web search for this instead?"
+        if not retrieved_documents:
+            if ENABLE_NO_CONTEXT_FALLBACK:
+                yield "token", self._handle_no_context(query)
+            else:
+                yield "token", out_of_scope
+            return
+
+        payload = self._chat_payload(
+            self._messages_for(query, retrieved_documents, profile_id, conversation_context), stream=True
+        )
+        held, answer, checked = "", "", False
+        started = time.perf_counter()
+        try:
+            with self.client.post("/api/chat", payload, timeout=timeout, stream=True) as response:
+                if response.status_code != 200:
+                    yield "error", self._call_failed("status", f"{response.status_code}: {response.text}")
+                    return
+
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    text = chunk.get("message", {}).get("content", "")
+                    answer += text
+                    if checked:
+                        if text:
+                            yield "token", text
+                    else:
+                        held += text
+                        if "\n" in held.strip() or len(held) >= STREAM_NOT_FOUND_PREFIX_CHARS or chunk.get("done"):
+                            checked = True
+                            if self._is_not_found_response(held):
+                                # Closing the response stops the generation in Ollama
+                                yield "token", out_of_scope
+                                return
+                            yield "token", held
+                    if chunk.get("done"):
+                        self._record_timings(chunk, profile_id)
+                        observe_stage("llm_call", profile_id, time.perf_counter() - started)
+                        break
+
+        except requests.exceptions.Timeout:
+            yield "error", self._call_failed("timeout", timeout)
+            return
+        except requests.exceptions.ConnectionError:
+            yield "error", self._call_failed("connect")
+            return
+        except Exception as e:
+            yield "error", self._call_failed("error", e)
+            return
+
+        if not checked and held:
+            yield "token", held
+        if not answer.strip() or self._is_not_found_response(answer):
+            yield "correction", out_of_scope
+
+    def warm_up(self, timeout: int = 300):
+        """
+        Load the model into Ollama ahead of the first query.
+
+        An empty prompt makes Ollama load the model and return without generating;
+        keep_alive keeps it resident afterwards. Raises if Ollama is unreachable.
+        """
+        response = self.client.post(
+            "/api/generate",
+            {"model": self.model, "prompt": "", "stream": False, "keep_alive": LLM_KEEP_ALIVE},
+            timeout=timeout
+        )
+        response.raise_for_status()
+
+    def stats(self) -> dict:
+        with self._timings_lock:
+            timings = dict(self.timings)
+        calls = timings["calls"]
+        return {
+            "model": self.model,
+            "pool_size": self.client.pool_size,
+            "connections": self.client.stats.snapshot(),
+            "calls": calls,
+            "prompt_tokens_avg": timings["prompt_tokens"] / calls if calls else 0.0,
+            "prompt_eval_ms_avg": timings["prompt_eval_ms"] / calls if calls else 0.0,
+            "eval_ms_avg": timings["eval_ms"] / calls if calls else 0.0,
+        }
+
     def process_web_query(self, query):
         return f"Web answer: {query}"
 
@@ -0,0 +1,167 @@
+"""
+LLM Scheduler
+Bounded, prioritized admission of Ollama calls with fast-fail backpressure
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from src.config.settings import LLM_CONCURRENCY, LLM_QUEUE_MAX, LLM_QUEUE_TIMEOUT_SECONDS
+from src.utils.errors import QueueFullError
+from src.utils.metrics import registry, LLM_QUEUE_WAIT_SECONDS, LLM_QUEUE_DEPTH, LLM_RUNNING, LLM_QUEUE_REJECTED
+
+INTERACTIVE = 0
+BATCH = 10
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+
+class LLMScheduler:
+    """
+    Admits at most `concurrency` LLM calls at a time.
+
+    Callers beyond that wait in a queue ordered by priority (lower first, so
+    interactive requests overtake batch ones) and then arrival. When max_queue
+    callers are already waiting, a new caller displaces the newest waiter of
+    lower priority, if there is one, so a large batch cannot lock interactive
+    users out; otherwise the new caller is rejected. Rejected, displaced and
+    timed-out callers get QueueFullError with a Retry-After estimate from the
+    recent average call duration, instead of piling up until the Ollama
+    timeout.
+    """
+
+    def __init__(self, concurrency: int = LLM_CONCURRENCY, max_queue: int = LLM_QUEUE_MAX,
+                 queue_timeout: float = LLM_QUEUE_TIMEOUT_SECONDS):
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = itertools.count()
+        self._displaced = set()
+        self._running = 0
+        self._service_seconds = 10.0  # moving average of call duration, seeded for a CPU model
+        self.metrics = {"admitted": 0, "rejected": 0, "displaced": 0, "timed_out": 0, "wait_seconds_total": 0.0,
+                        "wait_seconds_max": 0.0, "max_depth": 0}
+
+    def _retry_after(self) -> int:
+        """Seconds until the queue has likely drained by one slot per waiting caller"""
+        return max(1, math.ceil(self._service_seconds * (len(self._waiting) + 1) / self.concurrency))
+
+    def _queue_full(self, priority: int) -> bool:
+        """Whether a caller of this priority finds no room, even by displacing a lower-priority waiter"""
+        return len(self._waiting) >= self.max_queue and (not self._waiting or max(self._waiting)[0] <= priority)
+
+    def _reject_full(self):
+        self.metrics["rejected"] += 1
+        LLM_QUEUE_REJECTED.inc(reason="full")
+        raise QueueFullError("LLM queue is full, please retry later", self._retry_after())
+
+    def ensure_capacity(self, priority: int = INTERACTIVE):
+        """Raise QueueFullError now if a call submitted now would be rejected"""
+        with self._cond:
+            if self._running >= self.concurrency and self._queue_full(priority):
+                self._reject_full()
+
+    def acquire(self, priority: int = INTERACTIVE) -> float:
+        """Wait for a slot; returns the admission time to pass to release()"""
+        start = time.monotonic()
+        with self._cond:
+            if self._running < self.concurrency and not self._waiting:
+                return self._admit(start, priority)
+
+            if self._queue_full(priority):
+                self._reject_full()
+            if len(self._waiting) >= self.max_queue:
+                # Make room by dropping the newest waiter of the lowest priority
+                victim = max(self._waiting)
+                self._waiting.remove(victim)
+                heapq.heapify(self._waiting)
+                self._displaced.add(victim)
+                self.metrics["displaced"] += 1
+                LLM_QUEUE_REJECTED.inc(reason="displaced")
+                self._cond.notify_all()
+
+            entry = (priority, next(self._seq))
+            heapq.heappush(self._waiting, entry)
+            self.metrics["max_depth"] = max(self.metrics["max_depth"], len(self._waiting))
+            deadline = start + self.queue_timeout
+            while True:
+                if entry in self._displaced:
+                    self._displaced.discard(entry)
+                    raise QueueFullError("LLM queue is full of higher-priority calls, please retry later",
+                                         self._retry_after())
+                if self._running < self.concurrency and self._waiting[0] == entry:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self.metrics["timed_out"] += 1
+                    LLM_QUEUE_REJECTED.inc(reason="timeout")
+                    self._cond.notify_all()
+                    raise QueueFullError("Timed out waiting for the LLM, please retry later", self._retry_after())
+                self._cond.wait(remaining)
+
+            heapq.heappop(self._waiting)
+            admitted = self._admit(start, priority)
+            # With more than one slot free the next waiter may proceed as well
+            self._cond.notify_all()
+            return admitted
+
+    def _admit(self, start: float, priority: int) -> float:
+        now = time.monotonic()
+        waited = now - start
+        LLM_QUEUE_WAIT_SECONDS.observe(waited, priority=PRIORITY_NAMES.get(priority, str(priority)))
+        self._running += 1
+        self.metrics["admitted"] += 1
+        self.metrics["wait_seconds_total"] += waited
+        self.metrics["wait_seconds_max"] = max(self.metrics["wait_seconds_max"], waited)
+        return now
+
+    def release(self, admitted_at: float):
+        with self._cond:
+            self._running -= 1
+            self._service_seconds = 0.8 * self._service_seconds + 0.2 * (time.monotonic() - admitted_at)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: int = INTERACTIVE):
+        admitted_at = self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(admitted_at)
+
+    def stats(self) -> dict:
+        with self._cond:
+            admitted = self.metrics["admitted"]
+            return {
+                "concurrency": self.concurrency,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queue_depth": len(self._waiting),
+                "max_depth": self.metrics["max_depth"],
+                "admitted": admitted,
+                "rejected": self.metrics["rejected"],
+                "displaced": self.metrics["displaced"],
+                "timed_out": self.metrics["timed_out"],
+                "wait_ms_avg": self.metrics["wait_seconds_total"] / admitted * 1000 if admitted else 0.0,
+                "wait_ms_max": self.metrics["wait_seconds_max"] * 1000,
+                "service_seconds_avg": self._service_seconds,
+            }
+
+
+llm_scheduler = LLMScheduler()
+
+
+def _collect_queue_gauges():
+    stats = llm_scheduler.stats()
+    LLM_QUEUE_DEPTH.set(stats["queue_depth"])
+    LLM_RUNNING.set(stats["running"])
+
+
+registry.on_collect(_collect_queue_gauges)
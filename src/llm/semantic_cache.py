@@ -0,0 +1,159 @@
+"""
+Semantic Answer Cache
+Reuses LLM answers for near-identical queries that retrieve the same context
+"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from src.config.settings import (
+    SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_MAX_DISTANCE, SEMANTIC_CACHE_TTL_SECONDS, SEMANTIC_CACHE_MAX_ENTRIES
+)
+
+
+class _Entry(NamedTuple):
+    key: tuple
+    embedding: np.ndarray
+    answer: str
+    created_at: float
+
+
+class _ProfileCache:
+    def __init__(self, version: int):
+        self.version = version
+        self.entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self.buckets: Dict[tuple, List[int]] = {}
+
+    def remove(self, entry_id: int):
+        entry = self.entries.pop(entry_id)
+        bucket = self.buckets[entry.key]
+        bucket.remove(entry_id)
+        if not bucket:
+            del self.buckets[entry.key]
+
+
+class SemanticCache:
+    """
+    Per-profile answer cache.
+
+    An entry is reused only when the new query retrieved exactly the same chunks
+    (with the same conversation context) and its embedding is within
+    max_distance cosine distance of the cached query. Entries expire after the
+    TTL, the least recently used ones are evicted past max_entries, and a
+    profile's entries are dropped when its index version advances. Calls made
+    with an older version (requests still running on the store a hot reload
+    replaced) are ignored rather than resetting the newer entries.
+    """
+
+    def __init__(self, max_distance: float = SEMANTIC_CACHE_MAX_DISTANCE,
+                 ttl_seconds: float = SEMANTIC_CACHE_TTL_SECONDS,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+                 enabled: bool = SEMANTIC_CACHE_ENABLED):
+        self.max_distance = max_distance
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._profiles: Dict[str, _ProfileCache] = {}
+        self._latest_versions: Dict[str, int] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_calls = 0
+
+    @staticmethod
+    def _key(chunk_ids: Iterable[int], conversation_context: Optional[str]) -> tuple:
+        return tuple(sorted(chunk_ids)), conversation_context or ""
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        embedding = np.asarray(embedding, dtype="float32").ravel()
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def _profile(self, profile_id: str, version: int) -> Optional[_ProfileCache]:
+        """The profile's cache for this index version, or None if a newer version was already seen"""
+        if version < self._latest_versions.get(profile_id, version):
+            self.stale_calls += 1
+            return None
+        self._latest_versions[profile_id] = version
+        cache = self._profiles.get(profile_id)
+        if cache is None or cache.version != version:
+            cache = self._profiles[profile_id] = _ProfileCache(version)
+        return cache
+
+    def lookup(self, profile_id: str, version: int, query_embedding: np.ndarray,
+               chunk_ids: List[int], conversation_context: Optional[str] = None) -> Optional[str]:
+        """Cached answer for an equivalent query, or None"""
+        if not self.enabled or query_embedding is None or not chunk_ids:
+            return None
+
+        key = self._key(chunk_ids, conversation_context)
+        query = self._normalize(query_embedding)
+        now = time.monotonic()
+        with self._lock:
+            cache = self._profile(profile_id, version)
+            if cache is None:
+                return None
+            best_id, best_distance = None, self.max_distance
+            for entry_id in list(cache.buckets.get(key, ())):
+                entry = cache.entries[entry_id]
+                if now - entry.created_at > self.ttl_seconds:
+                    cache.remove(entry_id)
+                    continue
+                distance = 1.0 - float(np.dot(query, entry.embedding))
+                if distance <= best_distance:
+                    best_id, best_distance = entry_id, distance
+
+            if best_id is None:
+                self.misses += 1
+                return None
+            cache.entries.move_to_end(best_id)
+            self.hits += 1
+            return cache.entries[best_id].answer
+
+    def store(self, profile_id: str, version: int, query_embedding: np.ndarray,
+              chunk_ids: List[int], answer: str, conversation_context: Optional[str] = None):
+        if not self.enabled or query_embedding is None or not chunk_ids:
+            return
+
+        key = self._key(chunk_ids, conversation_context)
+        entry_id = next(self._ids)
+        with self._lock:
+            cache = self._profile(profile_id, version)
+            if cache is None:
+                return
+            cache.entries[entry_id] = _Entry(key, self._normalize(query_embedding), answer, time.monotonic())
+            cache.buckets.setdefault(key, []).append(entry_id)
+            while len(cache.entries) > self.max_entries:
+                cache.remove(next(iter(cache.entries)))
+                self.evictions += 1
+
+    def invalidate(self, profile_id: Optional[str] = None):
+        """Drop cached answers for one profile (e.g. after its index is rebuilt) or for all"""
+        with self._lock:
+            if profile_id is None:
+                self._profiles.clear()
+            else:
+                self._profiles.pop(profile_id, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": {profile_id: len(cache.entries) for profile_id, cache in self._profiles.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "stale_calls": self.stale_calls,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+semantic_cache = SemanticCache()
@@ -1,7 +1,14 @@
 from flask import jsonify
+from src.utils.errors import QueueFullError
 
 def register_error_handlers(app):
 
+    @app.errorhandler(QueueFullError)
+    def handle_queue_full(error):
+        response = jsonify({"status": "error", "message": str(error), "retry_after": error.retry_after})
+        response.headers["Retry-After"] = str(error.retry_after)
+        return response, 503
+
     @app.errorhandler(ValueError)
     def handle_value_error(error):
         return jsonify({"status": "error", "message": str(error)}), 400
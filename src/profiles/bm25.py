@@ -0,0 +1,147 @@
+"""
+BM25 Index
+Array-backed inverted index for lexical retrieval alongside FAISS
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from src.config.settings import BM25_K1, BM25_B
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it its of on or "
+    "our the their there this to was we what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens.
+
+    Compound tokens such as product codes ("ag-10", "v2.1") are kept whole and
+    also split into their parts, so both exact and partial mentions match.
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in re.split(r"[-_./]", token) if part and part not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 over CSR postings.
+
+    BM25 term weights depend only on the document, so they are precomputed per
+    posting at build time; scoring a query is a gather over the query terms'
+    posting slices followed by one np.bincount.
+    """
+
+    def __init__(self, vocab: np.ndarray, term_offsets: np.ndarray, post_docs: np.ndarray,
+                 post_weights: np.ndarray, doc_ids: np.ndarray):
+        self.vocab = vocab  # sorted terms
+        self.term_offsets = term_offsets  # int64[V + 1] into the postings arrays
+        self.post_docs = post_docs  # int32 row of each posting
+        self.post_weights = post_weights  # float32 BM25 weight of each posting
+        self.doc_ids = doc_ids  # int64 chunk id of each row
+
+    @classmethod
+    def build(cls, doc_ids: List[int], texts: List[str], k1: float = BM25_K1, b: float = BM25_B) -> "BM25Index":
+        doc_terms: List[Dict[str, int]] = []
+        doc_lengths = np.zeros(len(texts), dtype="float32")
+        for row, text in enumerate(texts):
+            counts: Dict[str, int] = {}
+            tokens = tokenize(text)
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            doc_terms.append(counts)
+            doc_lengths[row] = len(tokens)
+
+        vocab = np.array(sorted({t for counts in doc_terms for t in counts}), dtype=str)
+        term_index = {term: i for i, term in enumerate(vocab.tolist())}
+
+        terms, docs, tfs = [], [], []
+        for row, counts in enumerate(doc_terms):
+            for term, tf in counts.items():
+                terms.append(term_index[term])
+                docs.append(row)
+                tfs.append(tf)
+        terms = np.array(terms, dtype="int64")
+        docs = np.array(docs, dtype="int32")
+        tfs = np.array(tfs, dtype="float32")
+
+        order = np.argsort(terms, kind="stable")
+        terms, docs, tfs = terms[order], docs[order], tfs[order]
+        doc_freq = np.bincount(terms, minlength=len(vocab)).astype("float32")
+        term_offsets = np.zeros(len(vocab) + 1, dtype="int64")
+        term_offsets[1:] = np.cumsum(doc_freq)
+
+        n_docs = max(len(texts), 1)
+        avg_length = float(doc_lengths.mean()) if len(texts) else 1.0
+        idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+        norm = k1 * (1.0 - b + b * doc_lengths[docs] / max(avg_length, 1e-9))
+        weights = idf[terms] * tfs * (k1 + 1.0) / (tfs + norm)
+
+        return cls(vocab, term_offsets, docs, weights.astype("float32"), np.array(doc_ids, dtype="int64"))
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            np.savez(
+                f, vocab=self.vocab, term_offsets=self.term_offsets, post_docs=self.post_docs,
+                post_weights=self.post_weights, doc_ids=self.doc_ids,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["vocab"], data["term_offsets"], data["post_docs"], data["post_weights"], data["doc_ids"]
+            )
+
+    def _term_ids(self, query: str) -> np.ndarray:
+        tokens = np.array(tokenize(query), dtype=str)
+        if not len(tokens) or not len(self.vocab):
+            return np.zeros(0, dtype="int64")
+        positions = np.searchsorted(self.vocab, tokens)
+        positions = np.minimum(positions, len(self.vocab) - 1)
+        return positions[self.vocab[positions] == tokens]
+
+    def search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        """Top-k (chunk_id, bm25_score) pairs with a positive score"""
+        term_ids = self._term_ids(query)
+        if not len(term_ids):
+            return []
+
+        starts, ends = self.term_offsets[term_ids], self.term_offsets[term_ids + 1]
+        postings = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+        scores = np.bincount(
+            self.post_docs[postings], weights=self.post_weights[postings], minlength=len(self.doc_ids)
+        )
+
+        top_k = min(top_k, int(np.count_nonzero(scores)))
+        if top_k <= 0:
+            return []
+        rows = np.argpartition(-scores, top_k - 1)[:top_k]
+        rows = rows[np.argsort(-scores[rows])]
+        return [(int(self.doc_ids[r]), float(scores[r])) for r in rows]
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(a.nbytes for a in (self.vocab, self.term_offsets, self.post_docs,
+                                          self.post_weights, self.doc_ids)))
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int) -> List[Tuple[int, float]]:
+    """Fuse ranked id lists: score(d) = sum over lists of 1 / (k + rank)"""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
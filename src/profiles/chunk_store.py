@@ -0,0 +1,94 @@
+"""
+Chunk Store
+Memory-mapped, offset-indexed arena of chunk texts addressed by FAISS chunk id
+"""
+
+import mmap
+import struct
+from typing import Dict, Iterator
+
+import numpy as np
+
+MAGIC = b"PLCHUNK1"
+HEADER = struct.Struct("<8sQ")  # magic, chunk count
+
+
+class ChunkStore:
+    """
+    Read-only view over a chunk file.
+
+    Layout: header | ids int64[n] (sorted) | offsets uint64[n + 1] | utf-8 text arena.
+    The file is mapped read-only, so every worker process shares the same
+    physical pages through the page cache and lookups slice the mapping in place.
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a chunk store file: {self.path}")
+
+        ids_start = HEADER.size
+        offsets_start = ids_start + 8 * count
+        self._data_start = offsets_start + 8 * (count + 1)
+        self.ids = np.frombuffer(self._mmap, dtype="<i8", count=count, offset=ids_start)
+        self.offsets = np.frombuffer(self._mmap, dtype="<u8", count=count + 1, offset=offsets_start)
+        self._view = memoryview(self._mmap)
+
+    @staticmethod
+    def write(path: str, chunks: Dict[int, str]):
+        """Serialize {chunk_id: text} into the chunk store layout"""
+        ids = np.array(sorted(chunks), dtype="<i8")
+        encoded = [chunks[int(i)].encode("utf-8") for i in ids]
+        offsets = np.zeros(len(ids) + 1, dtype="<u8")
+        if encoded:
+            offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(ids)))
+            f.write(ids.tobytes())
+            f.write(offsets.tobytes())
+            for blob in encoded:
+                f.write(blob)
+
+    def _position(self, chunk_id: int) -> int:
+        pos = int(np.searchsorted(self.ids, chunk_id))
+        if pos >= len(self.ids) or self.ids[pos] != chunk_id:
+            raise KeyError(chunk_id)
+        return pos
+
+    def get_view(self, chunk_id: int) -> memoryview:
+        """Zero-copy view of the chunk's utf-8 bytes inside the mapping"""
+        pos = self._position(chunk_id)
+        start = self._data_start + int(self.offsets[pos])
+        end = self._data_start + int(self.offsets[pos + 1])
+        return self._view[start:end]
+
+    def __getitem__(self, chunk_id: int) -> str:
+        return str(self.get_view(chunk_id), "utf-8")
+
+    def get(self, chunk_id: int, default=None):
+        try:
+            return self[chunk_id]
+        except KeyError:
+            return default
+
+    def __contains__(self, chunk_id: int) -> bool:
+        try:
+            self._position(chunk_id)
+            return True
+        except KeyError:
+            return False
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return (int(i) for i in self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._mmap)
@@ -0,0 +1,170 @@
+"""
+Embedding Service
+Process-wide sentence transformer shared by every profile vector store
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from src.config.settings import EMBEDDING_BACKEND, EMBEDDING_BACKENDS, EMBEDDING_QUERY_CACHE_SIZE
+
+
+def _rss_bytes() -> int:
+    """Resident set size of this process (Linux), 0 where unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class EmbeddingService:
+    """Loads the embedding model once per process and caches query embeddings"""
+
+    def __init__(self, backend: str = EMBEDDING_BACKEND, cache_size: int = EMBEDDING_QUERY_CACHE_SIZE):
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Invalid embedding backend: {backend}. Must be one of {list(EMBEDDING_BACKENDS)}")
+        self.backend = backend
+        self.backend_config = EMBEDDING_BACKENDS[backend]
+        self.model_name = self.backend_config["model"]
+        self.cache_size = cache_size
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.load_time_seconds = None
+        self.memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def model(self) -> SentenceTransformer:
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    self._load()
+        return self._model
+
+    @property
+    def model_id(self) -> str:
+        """Identity of the produced vectors, used to key the builder's embedding cache"""
+        return self.model_name if self.backend == "torch" else f"{self.model_name}@{self.backend}"
+
+    def _load(self):
+        """Load the sentence transformer model for the backend and record its cost"""
+        print(f"Loading embedding model: {self.model_name} ({self.backend})")
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+
+        kwargs = {"device": "cpu"}
+        if "onnx_file" in self.backend_config:
+            kwargs.update(backend="onnx", model_kwargs={"file_name": self.backend_config["onnx_file"]})
+        if "truncate_dim" in self.backend_config:
+            kwargs["truncate_dim"] = self.backend_config["truncate_dim"]
+        model = SentenceTransformer(self.model_name, **kwargs)
+
+        self.load_time_seconds = time.perf_counter() - start
+        # ONNX Runtime weights live outside torch, so fall back to the RSS growth
+        self.memory_bytes = max(self._model_bytes(model), _rss_bytes() - rss_before)
+        self._model = model
+        print(
+            f"Embedding model loaded in {self.load_time_seconds:.2f}s "
+            f"({self.memory_bytes / (1024 * 1024):.1f} MB)"
+        )
+
+    @staticmethod
+    def _model_bytes(model) -> int:
+        """Size of the torch parameters and buffers held in memory"""
+        tensors = list(model.parameters()) + list(model.buffers())
+        return int(sum(t.numel() * t.element_size() for t in tensors))
+
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    def encode(self, texts: Union[str, List[str]]) -> np.ndarray:
+        """
+        Encode texts, serving repeated ones from the LRU cache.
+
+        Cache misses are encoded together in a single model call.
+
+        Returns:
+            float32 array of shape (len(texts), dimension)
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+
+        vectors = [None] * len(texts)
+        missing = {}
+        with self._cache_lock:
+            for i, text in enumerate(texts):
+                cached = self._cache.get(text)
+                if cached is not None:
+                    self._cache.move_to_end(text)
+                    vectors[i] = cached
+                    self.hits += 1
+                else:
+                    missing.setdefault(text, []).append(i)
+                    self.misses += 1
+
+        if missing:
+            pending = list(missing)
+            encoded = np.asarray(self.model.encode(pending), dtype="float32")
+            with self._cache_lock:
+                for text, vector in zip(pending, encoded):
+                    vector.setflags(write=False)
+                    for i in missing[text]:
+                        vectors[i] = vector
+                    if self.cache_size > 0:
+                        self._cache[text] = vector
+                        self._cache.move_to_end(text)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return np.vstack(vectors)
+
+    def encode_documents(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """Encode corpus chunks in batches without touching the query cache"""
+        if not texts:
+            return np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype="float32")
+        return np.asarray(self.model.encode(texts, batch_size=batch_size), dtype="float32")
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "backend": self.backend,
+            "loaded": self.is_loaded(),
+            "load_time_seconds": self.load_time_seconds,
+            "memory_bytes": self.memory_bytes,
+            "cache_size": len(self._cache),
+            "cache_capacity": self.cache_size,
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_services: Dict[str, EmbeddingService] = {}
+_services_lock = threading.Lock()
+
+
+def get_embedding_service(backend: Optional[str] = None) -> EmbeddingService:
+    """Process-wide embedding service for a backend (one model load per backend per process)"""
+    backend = backend or EMBEDDING_BACKEND
+    with _services_lock:
+        if backend not in _services:
+            _services[backend] = EmbeddingService(backend)
+        return _services[backend]
+
+
+embedding_service = get_embedding_service()
@@ -0,0 +1,105 @@
+"""
+FAQ Parsing and Question Index
+Question/answer pairs from a profile's faq.txt, and the embedding index used to answer them directly
+"""
+
+import re
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from src.config.settings import CLIENTS
+
+FAQ_FILENAME = "faq.txt"
+
+_PAIR_PATTERN = re.compile(r"^Q:\s*(?P<question>.+?)\s*\n\s*A:\s*(?P<answer>.+?)\s*$", re.S)
+# "Q1. question" on one line, the answer on the following lines (optionally prefixed "A1." / "A:")
+_NUMBERED_PAIR_PATTERN = re.compile(
+    r"^Q\d+[.):]\s*(?P<question>[^\n]+?)\s*\n\s*(?:A\d*[.):]\s*)?(?P<answer>.+?)\s*$", re.S
+)
+
+
+class FaqPair(NamedTuple):
+    question: str
+    answer: str
+
+
+def parse_faq(text: str) -> List[FaqPair]:
+    """
+    Parse blank-line separated FAQ blocks.
+
+    Two layouts are understood: "Q: ... / A: ..." and numbered "Q1. question"
+    followed by the answer. Answers may span several lines; blocks that are
+    not a Q/A pair (titles, notes) are skipped.
+    """
+    pairs = []
+    for block in re.split(r"\n\s*\n", text.replace("\r\n", "\n")):
+        block = block.strip()
+        match = _PAIR_PATTERN.match(block) or _NUMBERED_PAIR_PATTERN.match(block)
+        if match:
+            answer = " ".join(line.strip() for line in match.group("answer").splitlines() if line.strip())
+            pairs.append(FaqPair(match.group("question").strip(), answer))
+    return pairs
+
+
+def load_faq(profile_id: str) -> List[FaqPair]:
+    """The profile's FAQ pairs, or an empty list if it has no faq.txt"""
+    path = Path(CLIENTS[profile_id]["data_dir"]) / FAQ_FILENAME
+    if not path.exists():
+        return []
+    text = path.read_text(encoding="utf-8")
+    pairs = parse_faq(text)
+    if not pairs and text.strip():
+        print(f"WARNING: {path} is not empty but no Q/A pairs were parsed from it; "
+              f"FAQ direct answers and the FAQ golden set will be empty for profile '{profile_id}'.")
+    return pairs
+
+
+class FaqMatch(NamedTuple):
+    question: str
+    answer: str
+    similarity: float
+
+
+class FaqIndex:
+    """Unit-normalized embeddings of a profile's FAQ questions, searched by cosine similarity"""
+
+    def __init__(self, questions: np.ndarray, answers: np.ndarray, vectors: np.ndarray):
+        self.questions = questions
+        self.answers = answers
+        self.vectors = vectors  # float32[n, dim], unit length
+
+    @classmethod
+    def build(cls, pairs: List[FaqPair], vectors: np.ndarray) -> "FaqIndex":
+        vectors = np.asarray(vectors, dtype="float32")
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return cls(
+            np.array([p.question for p in pairs], dtype=str),
+            np.array([p.answer for p in pairs], dtype=str),
+            np.ascontiguousarray(vectors),
+        )
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            np.savez(f, questions=self.questions, answers=self.answers, vectors=self.vectors)
+
+    @classmethod
+    def load(cls, path: str) -> "FaqIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["questions"], data["answers"], data["vectors"])
+
+    def match(self, query_embedding: np.ndarray, threshold: float) -> Optional[FaqMatch]:
+        """Closest FAQ question if its similarity is at least threshold"""
+        if not len(self.vectors) or query_embedding is None:
+            return None
+        query = np.asarray(query_embedding, dtype="float32").ravel()
+        similarities = self.vectors @ (query / max(float(np.linalg.norm(query)), 1e-12))
+        best = int(np.argmax(similarities))
+        if similarities[best] < threshold:
+            return None
+        return FaqMatch(str(self.questions[best]), str(self.answers[best]), float(similarities[best]))
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.questions.nbytes + self.answers.nbytes + self.vectors.nbytes)
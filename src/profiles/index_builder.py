@@ -0,0 +1,276 @@
+"""
+Index Builder
+Incrementally builds the FAISS index, chunk store and BM25 index for a profile from its text files
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import faiss
+import numpy as np
+
+from src.config.settings import (
+    PROFILES, EMBEDDING_DIMENSION, CHUNK_MAX_CHARS, EMBEDDING_CACHE_PATH
+)
+from src.profiles.bm25 import BM25Index
+from src.profiles.chunk_store import ChunkStore
+from src.profiles.embedder import get_embedding_service
+from src.profiles.faq import FAQ_FILENAME, FaqIndex, FaqPair, load_faq
+from src.profiles.index_factory import INCREMENTAL_TYPES, build_index, effective_spec
+
+MANIFEST_FORMAT = 1
+
+
+def fingerprint(text: str) -> str:
+    """Content hash identifying a chunk"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(content_hash: str) -> int:
+    """Stable positive int64 FAISS id derived from the content hash"""
+    return int(content_hash[:16], 16) & 0x7FFFFFFFFFFFFFFF
+
+
+def split_paragraph(paragraph: str, max_chars: int = CHUNK_MAX_CHARS) -> List[str]:
+    """Split an oversized paragraph on sentence boundaries"""
+    if len(paragraph) <= max_chars:
+        return [paragraph]
+
+    pieces, current = [], ""
+    for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}".strip()
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_text(text: str, max_chars: int = CHUNK_MAX_CHARS) -> List[str]:
+    """
+    Split a document into paragraph chunks.
+
+    Each blank-line separated paragraph (a Q/A pair in faq.txt) is its own chunk,
+    so editing one paragraph only changes that chunk's fingerprint.
+    """
+    chunks = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if paragraph:
+            chunks.extend(split_paragraph(paragraph, max_chars))
+    return chunks
+
+
+class EmbeddingCache:
+    """On-disk embedding cache keyed by encoder (model + backend) and chunk content hash"""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, hash))"
+        )
+        self._conn.commit()
+
+    def get_many(self, model_id: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model_id, *batch],
+                )
+                for content_hash, blob in rows:
+                    found[content_hash] = np.frombuffer(blob, dtype="float32")
+        return found
+
+    def put_many(self, model_id: str, items: Dict[str, np.ndarray]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                [(model_id, h, np.asarray(v, dtype="float32").tobytes()) for h, v in items.items()],
+            )
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+def atomic_write(path: str, write_func):
+    """Write via a temp file in the same directory, then rename over the target"""
+    path = str(path)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        write_func(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class IndexBuilder:
+    """Builds a profile's vector store, re-embedding only new or changed chunks"""
+
+    def __init__(self, profile_id: str, cache: EmbeddingCache = None):
+        if profile_id not in PROFILES:
+            raise ValueError(f"Invalid profile_id: {profile_id}. Must be one of {list(PROFILES.keys())}")
+
+        self.profile_id = profile_id
+        self.profile_config = PROFILES[profile_id]
+        self.cache = cache or EmbeddingCache()
+        self.encoder = get_embedding_service(self.profile_config.get("embedding_backend"))
+
+    def collect_chunks(self) -> Dict[str, Tuple[str, str]]:
+        """Read every .txt file in the profile data dir -> {hash: (text, source file)}"""
+        data_dir = Path(self.profile_config["data_dir"])
+        if not data_dir.is_dir():
+            raise FileNotFoundError(f"Data directory not found for profile '{self.profile_id}' at {data_dir}.")
+
+        chunks = {}
+        for file_path in sorted(data_dir.glob("*.txt")):
+            text = file_path.read_text(encoding="utf-8")
+            for chunk in chunk_text(text):
+                chunks.setdefault(fingerprint(chunk), (chunk, file_path.name))
+        return chunks
+
+    def _read_manifest(self) -> dict:
+        manifest_path = self.profile_config["manifest_path"]
+        if not os.path.exists(manifest_path):
+            return {}
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _load_manifest(self) -> dict:
+        """Previous manifest, if the on-disk index can be updated incrementally"""
+        manifest = self._read_manifest()
+        if not os.path.exists(self.profile_config["vector_store_path"]):
+            return {}
+        if (manifest.get("format") != MANIFEST_FORMAT
+                or manifest.get("model") != self.encoder.model_name
+                or manifest.get("encoder") != self.encoder.backend
+                or manifest.get("dimension") != EMBEDDING_DIMENSION):
+            return {}
+        return manifest
+
+    def _embed(self, hashes: List[str], chunks: Dict[str, Tuple[str, str]]) -> Tuple[np.ndarray, int]:
+        """Embeddings for the given chunks, encoding only cache misses"""
+        vectors = self.cache.get_many(self.encoder.model_id, hashes)
+        missing = [h for h in hashes if h not in vectors]
+        if missing:
+            encoded = self.encoder.encode_documents([chunks[h][0] for h in missing])
+            fresh = dict(zip(missing, encoded))
+            self.cache.put_many(self.encoder.model_id, fresh)
+            vectors.update(fresh)
+        matrix = np.vstack([vectors[h] for h in hashes]) if hashes else np.zeros((0, EMBEDDING_DIMENSION), "float32")
+        return np.ascontiguousarray(matrix, dtype="float32"), len(missing)
+
+    def build(self, force: bool = False) -> dict:
+        """
+        Bring the profile's index up to date with its data directory.
+
+        Returns:
+            Summary dict with added / removed / unchanged / embedded counts and elapsed time
+        """
+        start = time.perf_counter()
+        chunks = self.collect_chunks()
+        manifest = {} if force else self._load_manifest()
+        previous = manifest.get("chunks", {})
+
+        added = [h for h in chunks if h not in previous]
+        removed = [h for h in previous if h not in chunks]
+        summary = {
+            "profile_id": self.profile_id,
+            "added": len(added),
+            "removed": len(removed),
+            "unchanged": len(chunks) - len(added),
+            "embedded": 0,
+            "total": len(chunks),
+        }
+
+        faq_path = self.profile_config.get("faq_index_path")
+        faq_pairs = load_faq(self.profile_id)
+        faq_current = not faq_path or (os.path.exists(faq_path) and manifest.get("faq_pairs") == len(faq_pairs))
+        if manifest and not added and not removed and faq_current:
+            summary["elapsed_ms"] = (time.perf_counter() - start) * 1000
+            summary["version"] = manifest["version"]
+            return summary
+
+        spec = effective_spec(self.profile_config.get("index"), len(chunks))
+        incremental = bool(manifest) and manifest.get("index") == spec and spec["type"] in INCREMENTAL_TYPES
+
+        if incremental:
+            index = faiss.read_index(self.profile_config["vector_store_path"])
+            if removed:
+                index.remove_ids(np.array([previous[h]["id"] for h in removed], dtype="int64"))
+            vectors, summary["embedded"] = self._embed(added, chunks)
+            if added:
+                index.add_with_ids(vectors, np.array([chunk_id(h) for h in added], dtype="int64"))
+        else:
+            # Untrained or non-removable index types are rebuilt from cached embeddings
+            hashes = list(chunks)
+            vectors, summary["embedded"] = self._embed(hashes, chunks)
+            index = build_index(spec, vectors, np.array([chunk_id(h) for h in hashes], dtype="int64"))
+
+        chunk_texts = {chunk_id(h): text for h, (text, _) in chunks.items()}
+        faq_index, faq_embedded = self._build_faq_index(faq_pairs)
+        summary["embedded"] += faq_embedded
+        summary["faq_pairs"] = len(faq_index.questions)
+        new_manifest = {
+            "format": MANIFEST_FORMAT,
+            "profile_id": self.profile_id,
+            "version": self._read_manifest().get("version", 0) + 1,
+            "built_at": datetime.now().isoformat(timespec="seconds"),
+            "model": self.encoder.model_name,
+            "encoder": self.encoder.backend,
+            "model_id": self.encoder.model_id,
+            "dimension": EMBEDDING_DIMENSION,
+            "index": spec,
+            "chunks": {h: {"id": chunk_id(h), "source": source} for h, (_, source) in chunks.items()},
+            "faq_pairs": summary["faq_pairs"],
+        }
+        self._write(index, chunk_texts, new_manifest, faq_index)
+
+        summary["version"] = new_manifest["version"]
+        summary["index_type"] = spec["type"]
+        summary["elapsed_ms"] = (time.perf_counter() - start) * 1000
+        return summary
+
+    def _build_faq_index(self, pairs: List[FaqPair]) -> Tuple[FaqIndex, int]:
+        """Question-embedding index over faq.txt, for answering near-verbatim FAQ questions directly"""
+        questions = {fingerprint(pair.question): (pair.question, FAQ_FILENAME) for pair in pairs}
+        vectors, embedded = self._embed([fingerprint(pair.question) for pair in pairs], questions)
+        return FaqIndex.build(pairs, vectors), embedded
+
+    def _write(self, index, chunk_texts: dict, manifest: dict, faq_index: FaqIndex):
+        """Atomically replace index, chunk store, BM25 and FAQ indexes and manifest (manifest last, as the commit marker)"""
+        bm25 = BM25Index.build(list(chunk_texts), list(chunk_texts.values()))
+        for key in ("vector_store_path", "chunk_store_path", "bm25_path", "manifest_path", "faq_index_path"):
+            if self.profile_config.get(key):
+                Path(self.profile_config[key]).parent.mkdir(parents=True, exist_ok=True)
+
+        def write_manifest(path):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+
+        atomic_write(self.profile_config["vector_store_path"], lambda path: faiss.write_index(index, path))
+        atomic_write(self.profile_config["chunk_store_path"], lambda path: ChunkStore.write(path, chunk_texts))
+        atomic_write(self.profile_config["bm25_path"], bm25.save)
+        if self.profile_config.get("faq_index_path"):
+            atomic_write(self.profile_config["faq_index_path"], faq_index.save)
+        atomic_write(self.profile_config["manifest_path"], write_manifest)
@@ -0,0 +1,102 @@
+"""
+Index Factory
+Creates the FAISS index type declared for a profile in CLIENTS["<id>"]["index"]
+"""
+
+from typing import Optional
+
+import faiss
+import numpy as np
+
+from src.config.settings import EMBEDDING_DIMENSION
+
+DEFAULT_INDEX_SPEC = {"type": "flat"}
+
+# Parameters used when a spec leaves them out
+INDEX_DEFAULTS = {
+    "flat": {},
+    "ivf": {"nlist": 256, "nprobe": 16},
+    "hnsw": {"M": 32, "efConstruction": 80, "efSearch": 64},
+    "pq": {"nlist": 256, "m": 48, "nbits": 8, "nprobe": 16},
+}
+
+# Index types whose remove_ids / add_with_ids keep the index valid without retraining
+INCREMENTAL_TYPES = {"flat", "ivf", "pq"}
+
+
+def resolve_spec(spec: Optional[dict]) -> dict:
+    """Fill in defaults and validate an index spec"""
+    spec = dict(spec or DEFAULT_INDEX_SPEC)
+    index_type = spec.get("type", "flat").lower()
+    if index_type not in INDEX_DEFAULTS:
+        raise ValueError(f"Invalid index type: {index_type}. Must be one of {list(INDEX_DEFAULTS)}")
+    return {"type": index_type, **INDEX_DEFAULTS[index_type], **{k: v for k, v in spec.items() if k != "type"}}
+
+
+def min_training_points(spec: dict) -> int:
+    """Vectors needed to train the index (FAISS wants ~39 per centroid); 0 when untrained"""
+    if spec["type"] == "ivf":
+        return 39 * spec["nlist"]
+    if spec["type"] == "pq":
+        return 39 * max(spec["nlist"], 2 ** spec["nbits"])
+    return 0
+
+
+def effective_spec(spec: dict, num_vectors: int) -> dict:
+    """Fall back to an exact flat index while the corpus is too small to train the requested one"""
+    spec = resolve_spec(spec)
+    if num_vectors < min_training_points(spec):
+        return resolve_spec(DEFAULT_INDEX_SPEC)
+    return spec
+
+
+def create_index(spec: dict, dimension: int = EMBEDDING_DIMENSION):
+    """Empty index (L2 metric) for the spec; every type accepts add_with_ids"""
+    spec = resolve_spec(spec)
+    index_type = spec["type"]
+
+    if index_type == "flat":
+        return faiss.IndexIDMap2(faiss.IndexFlatL2(dimension))
+
+    if index_type == "hnsw":
+        hnsw = faiss.IndexHNSWFlat(dimension, spec["M"])
+        hnsw.hnsw.efConstruction = spec["efConstruction"]
+        return faiss.IndexIDMap2(hnsw)
+
+    quantizer = faiss.IndexFlatL2(dimension)
+    if index_type == "ivf":
+        index = faiss.IndexIVFFlat(quantizer, dimension, spec["nlist"], faiss.METRIC_L2)
+    else:
+        index = faiss.IndexIVFPQ(quantizer, dimension, spec["nlist"], spec["m"], spec["nbits"])
+    index.own_fields = True
+    quantizer.this.disown()
+    # Hashtable direct map keeps remove_ids and reconstruct working with arbitrary chunk ids
+    index.set_direct_map_type(faiss.DirectMap.Hashtable)
+    return index
+
+
+def build_index(spec: dict, vectors: np.ndarray, ids: np.ndarray):
+    """Create, train if needed, and fill an index for the given vectors"""
+    index = create_index(spec, vectors.shape[1] if vectors.ndim == 2 and vectors.shape[1] else EMBEDDING_DIMENSION)
+    if not index.is_trained:
+        index.train(vectors)
+    if len(ids):
+        index.add_with_ids(vectors, ids)
+    configure_search(index, spec)
+    return index
+
+
+def configure_search(index, spec: dict):
+    """Apply query-time parameters (nprobe / efSearch) to a loaded index"""
+    spec = resolve_spec(spec)
+    params = faiss.ParameterSpace()
+    if spec["type"] in ("ivf", "pq"):
+        params.set_index_parameter(index, "nprobe", min(spec["nprobe"], spec["nlist"]))
+    elif spec["type"] == "hnsw":
+        params.set_index_parameter(index, "efSearch", spec["efSearch"])
+
+
+def index_memory_bytes(index) -> int:
+    """Serialized size of the index, a close proxy for its resident footprint"""
+    return int(faiss.serialize_index(index).nbytes)
+
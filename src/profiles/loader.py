@@ -4,14 +4,57 @@ Loads and manages FAISS vector stores for each profile
 """
 
 import os
+import json
 import pickle
 import numpy as np
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, NamedTuple
 import faiss
-from sentence_transformers import SentenceTransformer
 
-from src.config.settings import PROFILES, EMBEDDING_MODEL, TOP_K_DOCUMENTS, RELEVANCE_THRESHOLD
+from src.config.settings import (
+    PROFILES, TOP_K_DOCUMENTS, RELEVANCE_THRESHOLD, VECTOR_STORE_MMAP, HYBRID_RETRIEVAL, HYBRID_CANDIDATES, RRF_K,
+    FAQ_DIRECT_ANSWER_ENABLED, FAQ_MATCH_THRESHOLD
+)
+from src.profiles.bm25 import BM25Index, reciprocal_rank_fusion
+from src.profiles.chunk_store import ChunkStore
+from src.profiles.faq import FaqIndex, FaqMatch
+from src.profiles.embedder import get_embedding_service
+from src.profiles.index_factory import DEFAULT_INDEX_SPEC, configure_search
+from src.utils.metrics import stage_timer
+
+# FAISS flags that map an index type's vector storage instead of copying it:
+# IO_FLAG_MMAP only maps IVF inverted lists, flat and HNSW codes need IO_FLAG_MMAP_IFC
+MMAP_FLAGS = {
+    "flat": faiss.IO_FLAG_MMAP_IFC,
+    "hnsw": faiss.IO_FLAG_MMAP_IFC,
+    "ivf": faiss.IO_FLAG_MMAP,
+    "pq": faiss.IO_FLAG_MMAP,
+}
+MAPPED_INDEX_BYTES_PER_VECTOR = 48  # Id map and reverse id lookup stay on the heap when the codes are mapped
+
+
+def disk_signature(profile_config: dict) -> tuple:
+    """
+    Modification stamp identifying the build on disk.
+
+    The builder replaces index, chunk store, BM25 and FAQ files first and the
+    manifest last, as the commit marker, so only the manifest is stamped: a
+    new index next to the old manifest is a build still being written, and
+    reloading then would pair new vector ids with the old chunk store.
+    Legacy stores without a manifest fall back to the index stamp.
+    """
+    for key in ("manifest_path", "vector_store_path"):
+        path = profile_config.get(key)
+        if path and os.path.exists(path):
+            return key, os.stat(path).st_mtime_ns
+    return None, None
+
+
+class RetrievalResult(NamedTuple):
+    """Documents retrieved for one query plus what produced them"""
+    query_embedding: np.ndarray
+    chunk_ids: List[int]
+    documents: List[Tuple[str, float]]
 
 
 class VectorStoreLoader:
@@ -26,21 +69,23 @@ class VectorStoreLoader:
         self.embedding_model = None
         self.index = None
         self.metadata = None
+        self.bm25 = None
+        self.faq = None
+        self.manifest = {}
+        self.memory_bytes = 0
+        self.mapped_bytes = 0
+        self.index_mapped = False
+        self.disk_signature = None
         self._load_embedder()
         self._load_vector_store()
 
     def _load_embedder(self):
-        """Load the sentence transformer model"""
-        print(f"Loading embedding model: {EMBEDDING_MODEL}")
-        self.embedding_model = SentenceTransformer(EMBEDDING_MODEL)
-        # print("load the sentence transformer model",EMBEDDING_MODEL)
-        #
-
+        """Attach the process-wide embedding service for the profile's encoder backend"""
+        self.embedding_model = get_embedding_service(self.profile_config.get("embedding_backend"))
 
     def _load_vector_store(self):
-        """Load FAISS index and metadata for the profile"""
+        """Load FAISS index and chunk texts for the profile"""
         vector_store_path = self.profile_config["vector_store_path"]
-        metadata_path = self.profile_config["metadata_path"]
 
         if not os.path.exists(vector_store_path):
             raise FileNotFoundError(
@@ -48,17 +93,132 @@ class VectorStoreLoader:
                 "Run 'python -m scripts.build_indexes' first."
             )
 
-        if not os.path.exists(metadata_path):
+        print(f"Loading vector store for profile: {self.profile_id}")
+        self.disk_signature = disk_signature(self.profile_config)
+        self.manifest = self._load_manifest()
+        if self.is_stale():
+            built_with = self.manifest.get("model_id") or (
+                f"{self.manifest['model']} ({self.manifest.get('encoder', 'unknown encoder')})")
+            print(
+                f"WARNING: index for profile '{self.profile_id}' was built with {built_with} but queries use "
+                f"{self.embedding_model.model_id}; rebuild it with 'python -m scripts.build_indexes {self.profile_id}'."
+            )
+        index_spec = self.manifest.get("index", DEFAULT_INDEX_SPEC)
+        self.index, self.index_mapped = self._read_index(vector_store_path, index_spec.get("type", "flat"))
+        configure_search(self.index, index_spec)
+        self.metadata = self._load_metadata()
+        self.bm25 = self._load_bm25()
+        self.faq = self._load_faq_index()
+        self.memory_bytes, self.mapped_bytes = self._estimate_memory_bytes()
+
+        print(f"Vector store loaded. Contains {self.index.ntotal} documents.")
+
+    def _load_manifest(self) -> dict:
+        """Build manifest written by scripts.build_indexes (empty for legacy stores)"""
+        manifest_path = self.profile_config.get("manifest_path")
+        if not manifest_path or not os.path.exists(manifest_path):
+            return {}
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def is_stale(self) -> bool:
+        """
+        Whether the index was built with a different encoder than queries use.
+
+        Backends of one model (torch, onnx-int8) produce different vectors, so
+        the backend is compared as well as the model name.
+        """
+        if not self.manifest.get("model"):
+            return False  # legacy store, nothing recorded
+        return (self.manifest["model"] != self.embedding_model.model_name
+                or self.manifest.get("encoder") != self.embedding_model.backend)
+
+    @staticmethod
+    def _read_index(path: str, index_type: str = "flat") -> Tuple[object, bool]:
+        """
+        Open the index memory-mapped and read-only so workers share its pages.
+
+        Returns:
+            (index, whether its vector storage is mapped rather than copied to the heap)
+        """
+        if VECTOR_STORE_MMAP and index_type in MMAP_FLAGS:
+            try:
+                return faiss.read_index(str(path), MMAP_FLAGS[index_type] | faiss.IO_FLAG_READ_ONLY), True
+            except RuntimeError as e:
+                print(f"Memory-mapped read not supported for {path}, loading into memory: {e}")
+        return faiss.read_index(str(path)), False
+
+    def _load_metadata(self):
+        """Chunk store built by scripts.build_indexes, or the legacy pickled list"""
+        chunk_store_path = self.profile_config.get("chunk_store_path")
+        if chunk_store_path and os.path.exists(chunk_store_path):
+            return ChunkStore(chunk_store_path)
+
+        metadata_path = self.profile_config.get("metadata_path")
+        if not metadata_path or not os.path.exists(metadata_path):
             raise FileNotFoundError(
-                f"Metadata not found for profile '{self.profile_id}' at {metadata_path}."
+                f"Chunk store not found for profile '{self.profile_id}' at {chunk_store_path}."
             )
 
-        print(f"Loading vector store for profile: {self.profile_id}")
-        self.index = faiss.read_index(str(vector_store_path))
         with open(metadata_path, "rb") as f:
-            self.metadata = pickle.load(f)
+            return pickle.load(f)
 
-        print(f"Vector store loaded. Contains {self.index.ntotal} documents.")
+    def _estimate_memory_bytes(self) -> Tuple[int, int]:
+        """
+        Approximate footprint as (private heap bytes, mapped file bytes).
+
+        Mapped index codes and chunk texts live in the page cache, shared by
+        every worker and reclaimable by the kernel, so only the heap part
+        counts against the profile memory budget.
+        """
+        index_size = os.path.getsize(self.profile_config["vector_store_path"])
+        if self.index_mapped:
+            total = self.index.ntotal * MAPPED_INDEX_BYTES_PER_VECTOR
+            mapped = index_size
+        else:
+            total, mapped = index_size, 0
+        if isinstance(self.metadata, ChunkStore):
+            mapped += self.metadata.nbytes
+        elif self.metadata is not None:
+            texts = self.metadata.values() if isinstance(self.metadata, dict) else self.metadata
+            total += sum(len(text.encode("utf-8")) for text in texts)
+        if self.bm25 is not None:
+            total += self.bm25.nbytes
+        if self.faq is not None:
+            total += self.faq.nbytes
+        return total, mapped
+
+    def _load_bm25(self) -> Optional[BM25Index]:
+        """Lexical index built alongside the FAISS index, if hybrid retrieval is enabled"""
+        bm25_path = self.profile_config.get("bm25_path")
+        if not HYBRID_RETRIEVAL or not bm25_path or not os.path.exists(bm25_path):
+            return None
+        return BM25Index.load(bm25_path)
+
+    def _load_faq_index(self) -> Optional[FaqIndex]:
+        """FAQ question index built alongside the FAISS index, if direct FAQ answers are enabled"""
+        faq_path = self.profile_config.get("faq_index_path")
+        if not FAQ_DIRECT_ANSWER_ENABLED or not faq_path or not os.path.exists(faq_path):
+            return None
+        return FaqIndex.load(faq_path)
+
+    def match_faq(self, query: str, query_embedding: Optional[np.ndarray] = None) -> Optional[FaqMatch]:
+        """
+        Curated FAQ answer for a near-verbatim FAQ question, or None.
+
+        Pass query_embedding when it is already computed; otherwise the query is
+        encoded here (the encoder's cache makes the following search reuse it).
+        """
+        if self.faq is None:
+            return None
+        if query_embedding is None:
+            query_embedding = self.embedding_model.encode([query])[0]
+        return self.faq.match(query_embedding, FAQ_MATCH_THRESHOLD)
+
+    @property
+    def version(self) -> int:
+        """Manifest version of the loaded index (0 for legacy stores)"""
+        return self.manifest.get("version", 0)
 
     def retrieve(self, query: str, top_k: int = TOP_K_DOCUMENTS) -> List[Tuple[str, float]]:
         """
@@ -67,29 +227,96 @@ class VectorStoreLoader:
         Returns:
             List of (document_text, similarity_score) tuples, ordered by relevance
         """
-        if self.index is None or self.metadata is None:
+        return self.search(query, top_k).documents
+
+    def search(self, query: str, top_k: int = TOP_K_DOCUMENTS) -> RetrievalResult:
+        """Retrieve top-k documents along with the query embedding and chunk ids"""
+        return self.search_batch([query], top_k)[0]
+
+    def retrieve_batch(self, queries: List[str], top_k: int = TOP_K_DOCUMENTS) -> List[List[Tuple[str, float]]]:
+        """
+        Retrieve top-k documents for many queries with one batched encode and one FAISS search.
+
+        Returns:
+            One list of (document_text, similarity_score) tuples per query, in input order
+        """
+        return [result.documents for result in self.search_batch(queries, top_k)]
+
+    def search_batch(self, queries: List[str], top_k: int = TOP_K_DOCUMENTS) -> List[RetrievalResult]:
+        """One RetrievalResult per query, in input order"""
+        if not queries:
             return []
+        if self.index is None or self.metadata is None:
+            return [RetrievalResult(None, [], []) for _ in queries]
 
-        # Encode query
-        query_embedding = self.embedding_model.encode([query])
+        # Encode queries
+        with stage_timer("query_encode", self.profile_id):
+            query_embeddings = self.embedding_model.encode(list(queries))
 
-        # Search
-        distances, indices = self.index.search(query_embedding, top_k)
+        # Search (wider candidate pool when it will be fused with BM25)
+        candidates = max(top_k, HYBRID_CANDIDATES) if self.bm25 is not None else top_k
+        with stage_timer("faiss_search", self.profile_id):
+            distances, indices = self.index.search(query_embeddings, candidates)
 
-        # Format results
         results = []
-        for distance, idx in zip(distances[0], indices[0]):
-            if idx == -1:  # FAISS returns -1 for invalid results
-                continue
+        with stage_timer("rank", self.profile_id):
+            for query, query_vector, row_distances, row_indices in zip(queries, query_embeddings, distances, indices):
+                hits = self._rank(query, query_vector, row_distances, row_indices, top_k)
+                results.append(RetrievalResult(
+                    query_embedding=query_vector,
+                    chunk_ids=[chunk_id for chunk_id, _ in hits],
+                    documents=[(self.metadata[chunk_id], similarity) for chunk_id, similarity in hits],
+                ))
+        return results
 
-            # Convert L2 distance to similarity score (0-1)
-            similarity = 1.0 / (1.0 + float(distance))
+    def _rank(self, query: str, query_vector: np.ndarray, distances, indices, top_k: int) -> List[Tuple[int, float]]:
+        """
+        Rank chunks for one query.
 
-            if similarity >= RELEVANCE_THRESHOLD:
-                doc_text = self.metadata[int(idx)]
-                results.append((doc_text, float(similarity)))
+        Hits below RELEVANCE_THRESHOLD are dropped; when a BM25 index is
+        loaded, its ranking is fused in with reciprocal-rank fusion so exact
+        lexical matches (product codes, names) surface even if MiniLM ranks them
+        low. Lexical hits must clear the same threshold on their reconstructed
+        vector similarity, so an off-topic question sharing one word with the
+        corpus still gets no context.
 
-        return results
+        Returns:
+            List of (chunk_id, similarity_score) tuples, ordered by relevance
+        """
+        # Convert L2 distance to similarity score (0-1); FAISS returns -1 for invalid results
+        vector_hits = {int(idx): 1.0 / (1.0 + float(distance))
+                       for distance, idx in zip(distances, indices) if idx != -1}
+        vector_ranking = [idx for idx, similarity in vector_hits.items() if similarity >= RELEVANCE_THRESHOLD]
+
+        if self.bm25 is None:
+            return [(idx, vector_hits[idx]) for idx in vector_ranking[:top_k]]
+
+        lexical_ranking = []
+        for chunk_id, _ in self.bm25.search(query, HYBRID_CANDIDATES):
+            if chunk_id not in vector_hits:
+                vector_hits[chunk_id] = self._similarity(query_vector, chunk_id)
+            if vector_hits[chunk_id] >= RELEVANCE_THRESHOLD:
+                lexical_ranking.append(chunk_id)
+
+        fused = reciprocal_rank_fusion([vector_ranking, lexical_ranking], RRF_K)[:top_k]
+        return [(chunk_id, vector_hits[chunk_id]) for chunk_id, _ in fused]
+
+    def _similarity(self, query_vector: np.ndarray, chunk_id: int) -> float:
+        """Vector similarity of a chunk that only the lexical ranking returned (0 if it cannot be reconstructed)"""
+        try:
+            distance = float(np.sum((self.index.reconstruct(chunk_id) - query_vector) ** 2))
+        except RuntimeError:
+            return 0.0
+        return 1.0 / (1.0 + distance)
+
+    def chunk_vectors(self, chunk_ids: List[int]) -> Optional[np.ndarray]:
+        """Stored embeddings of the given chunks, or None if the index cannot reconstruct them"""
+        if self.index is None or not chunk_ids:
+            return None
+        try:
+            return np.vstack([self.index.reconstruct(int(chunk_id)) for chunk_id in chunk_ids])
+        except RuntimeError:
+            return None
 
     def has_documents(self) -> bool:
         """Check if the vector store has any documents"""
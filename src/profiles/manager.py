@@ -2,18 +2,51 @@
 Profile Manager
 Central registry for all profile vector stores
 """
-from src.config.settings import CLIENTS
+import threading
+import time
+from collections import OrderedDict
+from src.config.settings import (
+    CLIENTS, PROFILE_STORE_MEMORY_BUDGET_MB, HOT_RELOAD_ENABLED, HOT_RELOAD_CHECK_INTERVAL
+)
 from typing import Dict
-from src.profiles.loader import VectorStoreLoader
+from src.profiles.loader import VectorStoreLoader, disk_signature
+from src.llm.semantic_cache import semantic_cache
 # from config import VALID_PROFILES
 #
 
 
 class ProfileManager:
-    """Manages all profile vector stores with lazy loading"""
-
-    def __init__(self):
-        self._stores: Dict[str, VectorStoreLoader] = {}
+    """
+    Manages all profile vector stores with lazy loading.
+
+    Loading is single-flight per profile: concurrent first requests for the same
+    client wait on one load instead of each building a VectorStoreLoader. Loaded
+    stores are kept in LRU order and the least recently used ones are evicted
+    once their combined footprint exceeds the memory budget.
+
+    Resident stores are checked for a rebuilt index on disk at most every
+    HOT_RELOAD_CHECK_INTERVAL seconds; a changed one is loaded in the background
+    and swapped in atomically. Requests already holding the old store finish
+    on it, new requests get the new one.
+    """
+
+    def __init__(self, memory_budget_mb: int = PROFILE_STORE_MEMORY_BUDGET_MB):
+        self._stores: "OrderedDict[str, VectorStoreLoader]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.memory_budget_bytes = memory_budget_mb * 1024 * 1024
+        self._checked_at: Dict[str, float] = {}
+        self._reloading = set()
+        self.metrics = {
+            "hits": 0, "loads": 0, "load_failures": 0, "evictions": 0, "reloads": 0, "reload_failures": 0
+        }
+
+    def _cached(self, profile_id: str):
+        """Resident store marked as most recently used (caller holds self._lock)"""
+        store = self._stores.get(profile_id)
+        if store is not None:
+            self._stores.move_to_end(profile_id)
+        return store
 
     def get_store(self, profile_id: str) -> VectorStoreLoader:
         if profile_id not in CLIENTS:
@@ -22,11 +55,98 @@ class ProfileManager:
                 f"Valid profiles are: {sorted(CLIENTS)}"
             )
 
-        if profile_id not in self._stores:
-            print(f"Loading vector store for profile: {profile_id}")
-            self._stores[profile_id] = VectorStoreLoader(profile_id)
+        with self._lock:
+            store = self._cached(profile_id)
+            if store is not None:
+                self.metrics["hits"] += 1
+        if store is not None:
+            self._check_for_rebuild(profile_id, store)
+            return store
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(profile_id, threading.Lock())
 
-        return self._stores[profile_id]
+        with load_lock:
+            with self._lock:
+                store = self._cached(profile_id)
+            if store is not None:
+                return store
+
+            print(f"Loading vector store for profile: {profile_id}")
+            try:
+                store = VectorStoreLoader(profile_id)
+            except Exception:
+                with self._lock:
+                    self.metrics["load_failures"] += 1
+                raise
+
+            with self._lock:
+                self._stores[profile_id] = store
+                self.metrics["loads"] += 1
+                self._evict_over_budget()
+
+        return store
+
+    def _check_for_rebuild(self, profile_id: str, store: VectorStoreLoader):
+        """Start a background reload if the profile's index changed on disk"""
+        if not HOT_RELOAD_ENABLED:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if profile_id in self._reloading or now - self._checked_at.get(profile_id, 0.0) < HOT_RELOAD_CHECK_INTERVAL:
+                return
+            self._checked_at[profile_id] = now
+
+        if disk_signature(store.profile_config) == store.disk_signature:
+            return
+
+        with self._lock:
+            if profile_id in self._reloading:
+                return
+            self._reloading.add(profile_id)
+        threading.Thread(target=self._reload, args=(profile_id,), name=f"reload-{profile_id}", daemon=True).start()
+
+    def _reload(self, profile_id: str):
+        """Load the rebuilt store off the request path and swap it in"""
+        try:
+            print(f"Reloading rebuilt vector store for profile: {profile_id}")
+            store = VectorStoreLoader(profile_id)
+        except Exception as e:
+            print(f"Reload of profile '{profile_id}' failed, keeping the current store: {e}")
+            with self._lock:
+                self.metrics["reload_failures"] += 1
+                self._reloading.discard(profile_id)
+            return
+
+        with self._lock:
+            if profile_id in self._stores:
+                self._stores[profile_id] = store
+                self._evict_over_budget()
+            self.metrics["reloads"] += 1
+            self._reloading.discard(profile_id)
+        semantic_cache.invalidate(profile_id)
+
+    def _evict_over_budget(self):
+        """Drop least recently used stores until under budget, always keeping the newest (caller holds self._lock)"""
+        if self.memory_budget_bytes <= 0:
+            return
+        while len(self._stores) > 1 and self._resident_bytes() > self.memory_budget_bytes:
+            profile_id, _ = self._stores.popitem(last=False)
+            self.metrics["evictions"] += 1
+            print(f"Evicted vector store for profile: {profile_id}")
+
+    def _resident_bytes(self) -> int:
+        return sum(store.memory_bytes for store in self._stores.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.metrics,
+                "resident_profiles": list(self._stores),
+                "resident_bytes": self._resident_bytes(),
+                "mapped_bytes": sum(store.mapped_bytes for store in self._stores.values()),
+                "memory_budget_bytes": self.memory_budget_bytes,
+            }
 
     def load_profile(self, profile_id: str) -> VectorStoreLoader:
         return self.get_store(profile_id)
@@ -1,33 +1,270 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.config.settings import BATCH_LLM_CONCURRENCY, QUERY_COALESCING_ENABLED
+from src.profiles.loader import RetrievalResult
 from src.profiles.manager import profile_manager
+from src.llm.context_packer import context_packer
 from src.llm.processor import llm_processor
-from src.utils.response import success_response
+from src.llm.scheduler import llm_scheduler, INTERACTIVE, BATCH
+from src.llm.semantic_cache import semantic_cache
+from src.utils.errors import QueueFullError
+from src.utils.response import success_response, sse_event
+from src.utils.single_flight import SingleFlight
+from src.utils.metrics import stage_timer, RAG_REQUESTS, client_label
+
+query_flights = SingleFlight()
+
 
 class QueryService:
 
     @staticmethod
     def process(payload: dict) -> dict:
+        """
+        Answer one question.
+
+        Identical requests (same client, question up to case and whitespace,
+        and conversation context) that arrive while one is already being
+        answered wait for it and share its answer instead of running their
+        own retrieval and LLM call.
+        """
+        if not QUERY_COALESCING_ENABLED:
+            return QueryService._process(payload)
+
+        query = payload["query"]
+        key = (payload["client_id"], " ".join(query.lower().split()), payload.get("conversation_context") or "")
+        response = query_flights.do(key, lambda: QueryService._process(payload))
+        return dict(response, query=query)
+
+    @staticmethod
+    def _process(payload: dict) -> dict:
         client_id = payload["client_id"]
         query = payload["query"]
 
-        vector_store = profile_manager.load_profile(client_id)
+        with stage_timer("store_load", client_id):
+            vector_store = profile_manager.load_profile(client_id)
         print("vector store",vector_store)
-        documents = vector_store.retrieve(query)
+
+        faq_match = vector_store.match_faq(query)
+        if faq_match is not None:
+            RAG_REQUESTS.inc(endpoint="query", client_id=client_label(client_id), answer_source="faq")
+            return success_response(
+                client_id=client_id,
+                query=query,
+                answer=faq_match.answer,
+                answer_source="faq",
+                faq_question=faq_match.question,
+                faq_similarity=faq_match.similarity,
+                context_retrieved=0
+            )
+
+        retrieval = vector_store.search(query)
+        with stage_timer("context_pack", client_id):
+            retrieval = context_packer.pack(client_id, vector_store, retrieval)
         print("Doc")
 
+        answer, answer_source = QueryService._answer(
+            client_id, vector_store, query, retrieval, payload.get("conversation_context")
+        )
+
+        RAG_REQUESTS.inc(endpoint="query", client_id=client_label(client_id), answer_source=answer_source)
+        return success_response(
+            client_id=client_id,
+            query=query,
+            answer=answer,
+            answer_source=answer_source,
+            context_retrieved=len(retrieval.documents)
+        )
+
+    @staticmethod
+    def stream(payload: dict):
+        """
+        Same as process, but yields Server-Sent Events while the answer is generated.
+
+        Emits "token" events with text to append, an optional "correction" that
+        replaces the text shown so far, an "error" if the LLM call failed, and a
+        final "done" event carrying the full answer and time-to-first-token.
+        Retrieval runs before the first event, so its errors surface as a
+        normal error response rather than mid-stream, and so does a full LLM
+        queue (checked up front; the slot itself is taken when streaming starts).
+        """
+        started = time.perf_counter()
+        client_id = payload["client_id"]
+        query = payload["query"]
+
+        with stage_timer("store_load", client_id):
+            vector_store = profile_manager.load_profile(client_id)
+        conversation_context = payload.get("conversation_context")
+
+        faq_match = vector_store.match_faq(query)
+        if faq_match is not None:
+            return QueryService._stream_events(
+                client_id, vector_store, query, RetrievalResult(None, [], []), conversation_context,
+                faq_match.answer, started, cached_source="faq"
+            )
+
+        retrieval = vector_store.search(query)
+        with stage_timer("context_pack", client_id):
+            retrieval = context_packer.pack(client_id, vector_store, retrieval)
+        cached = semantic_cache.lookup(
+            client_id, vector_store.version, retrieval.query_embedding, retrieval.chunk_ids, conversation_context
+        )
+        if cached is None:
+            llm_scheduler.ensure_capacity()
+        return QueryService._stream_events(
+            client_id, vector_store, query, retrieval, conversation_context, cached, started
+        )
+
+    @staticmethod
+    def _scheduled_stream(query, retrieval, client_id, conversation_context):
+        try:
+            admitted_at = llm_scheduler.acquire(INTERACTIVE)
+        except QueueFullError as e:
+            yield "error", f"ERROR: {e}"
+            return
+        try:
+            yield from llm_processor.stream_query(query, retrieval.documents, client_id, conversation_context)
+        finally:
+            llm_scheduler.release(admitted_at)
+
+    @staticmethod
+    def _stream_events(client_id, vector_store, query, retrieval, conversation_context, cached, started,
+                       cached_source="semantic_cache"):
+        if cached is not None:
+            events, answer_source = iter([("token", cached)]), cached_source
+        else:
+            events, answer_source = QueryService._scheduled_stream(
+                query, retrieval, client_id, conversation_context
+            ), "llm"
+
+        answer, error, first_token_ms = "", None, None
+        for event, text in events:
+            if event == "token":
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000
+                answer += text
+                yield sse_event("token", text=text)
+            elif event == "correction":
+                answer = text
+                yield sse_event("correction", answer=text)
+            else:
+                error = text
+                yield sse_event("error", message=text)
+
+        answer = answer.strip()
+        if error is None and answer_source == "llm":
+            semantic_cache.store(
+                client_id, vector_store.version, retrieval.query_embedding, retrieval.chunk_ids,
+                answer, conversation_context
+            )
+        total_ms = (time.perf_counter() - started) * 1000
+        RAG_REQUESTS.inc(endpoint="query_stream", client_id=client_label(client_id), answer_source=answer_source)
+        print(f"Streamed query for {client_id}: ttft={first_token_ms or 0:.0f}ms total={total_ms:.0f}ms")
+        yield sse_event(
+            "done",
+            status="error" if error else "success",
+            client_id=client_id,
+            query=query,
+            answer=error or answer,
+            answer_source=answer_source,
+            context_retrieved=len(retrieval.documents),
+            time_to_first_token_ms=first_token_ms,
+            total_ms=total_ms,
+        )
+
+    @staticmethod
+    def _answer(client_id, vector_store, query, retrieval, conversation_context, priority=INTERACTIVE):
+        """Answer from the semantic cache when possible, otherwise through the scheduled LLM"""
+        cached = semantic_cache.lookup(
+            client_id, vector_store.version, retrieval.query_embedding, retrieval.chunk_ids, conversation_context
+        )
+        if cached is not None:
+            return cached, "semantic_cache"
+
         # query: str,
         # retrieved_documents: List[Tuple[str, float]],
         # profile_id: str,
         # conversation_context: Optional[str] = None
-        answer = llm_processor.process_query(
-            query=query,
-            retrieved_documents=documents,
-            profile_id=client_id,
-            conversation_context=payload["conversation_context"]
-        )
+        with llm_scheduler.slot(priority):
+            answer = llm_processor.process_query(
+                query=query,
+                retrieved_documents=retrieval.documents,
+                profile_id=client_id,
+                conversation_context=conversation_context
+            )
+
+        if not answer.startswith("ERROR:"):
+            semantic_cache.store(
+                client_id, vector_store.version, retrieval.query_embedding, retrieval.chunk_ids,
+                answer, conversation_context
+            )
+        return answer, "llm"
 
+    @staticmethod
+    def _batch_items(payload: dict) -> list:
+        """Normalize batch entries (plain strings or {query, conversation_context} dicts)"""
+        default_context = payload.get("conversation_context")
+        items = []
+        for entry in payload["queries"]:
+            if isinstance(entry, dict):
+                items.append((str(entry.get("query") or "").strip(),
+                              entry.get("conversation_context", default_context)))
+            else:
+                items.append((str(entry or "").strip(), default_context))
+        return items
+
+    @staticmethod
+    def process_batch(payload: dict) -> dict:
+        """
+        Answer many questions for one client.
+
+        All questions are embedded in one batched call and searched with one
+        FAISS matrix search; LLM calls then fan out with bounded concurrency.
+        Results keep the input order and carry their own status, so one failed
+        item does not fail the batch.
+        """
+        client_id = payload["client_id"]
+        items = QueryService._batch_items(payload)
+
+        with stage_timer("store_load", client_id):
+            vector_store = profile_manager.load_profile(client_id)
+        valid = [i for i, (query, _) in enumerate(items) if query]
+        retrieved = vector_store.search_batch([items[i][0] for i in valid])
+        retrieval_by_index = dict(zip(valid, retrieved))
+
+        def answer_item(index: int) -> dict:
+            query, conversation_context = items[index]
+            if index not in retrieval_by_index:
+                return {"index": index, "status": "error", "query": query, "message": "Query cannot be empty"}
+
+            try:
+                faq_match = vector_store.match_faq(query, retrieval_by_index[index].query_embedding)
+                if faq_match is not None:
+                    RAG_REQUESTS.inc(endpoint="query_batch", client_id=client_label(client_id), answer_source="faq")
+                    return {"index": index, "status": "success", "query": query, "answer": faq_match.answer,
+                            "answer_source": "faq", "context_retrieved": 0}
+
+                retrieval = context_packer.pack(client_id, vector_store, retrieval_by_index[index])
+                answer, answer_source = QueryService._answer(
+                    client_id, vector_store, query, retrieval, conversation_context, priority=BATCH
+                )
+            except Exception as e:
+                return {"index": index, "status": "error", "query": query, "message": str(e)}
+
+            RAG_REQUESTS.inc(endpoint="query_batch", client_id=client_label(client_id), answer_source=answer_source)
+            if answer.startswith("ERROR:"):
+                return {"index": index, "status": "error", "query": query, "message": answer}
+            return {"index": index, "status": "success", "query": query, "answer": answer,
+                    "answer_source": answer_source, "context_retrieved": len(retrieval.documents)}
+
+        with ThreadPoolExecutor(max_workers=max(1, BATCH_LLM_CONCURRENCY)) as executor:
+            results = list(executor.map(answer_item, range(len(items))))
+
+        failed = sum(1 for r in results if r["status"] == "error")
         return success_response(
             client_id=client_id,
-            query=query,
-            answer=answer,
-            context_retrieved=len(documents)
+            results=results,
+            total=len(results),
+            succeeded=len(results) - failed,
+            failed=failed
         )
@@ -0,0 +1,102 @@
+import threading
+import time
+
+from src.config.settings import CLIENTS, EMBEDDING_BACKEND, ENABLE_STARTUP_WARMUP, WARMUP_REQUIRED_PROFILES
+from src.profiles.embedder import get_embedding_service
+from src.profiles.manager import profile_manager
+from src.llm.processor import llm_processor
+
+WARMUP_QUERY = "warm-up"
+
+
+class WarmupService:
+    """
+    Preloads every encoder backend the clients use, every profile store and the
+    Ollama model in the background so the first user request does not pay the
+    cold-start cost.
+
+    Readiness waits for the encoders, the LLM and the profiles listed in
+    required_profiles. Any other profile that fails to load (e.g. its index
+    was never built) marks the app degraded instead of keeping it unready;
+    that profile loads lazily, and fails, on its own requests.
+    """
+
+    def __init__(self, enabled: bool = ENABLE_STARTUP_WARMUP, required_profiles=None):
+        self.enabled = enabled
+        self.required_profiles = set(WARMUP_REQUIRED_PROFILES if required_profiles is None else required_profiles)
+        self.started_at = None
+        self.finished_at = None
+        self.components = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @staticmethod
+    def _backends() -> list:
+        """Default encoder backend plus any client-specific ones, in first-use order"""
+        backends = [EMBEDDING_BACKEND]
+        for config in CLIENTS.values():
+            backend = config.get("embedding_backend") or EMBEDDING_BACKEND
+            if backend not in backends:
+                backends.append(backend)
+        return backends
+
+    def start(self):
+        """Run the warm-up once in a daemon thread"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.started_at = time.time()
+            self.components = {f"embedding_model:{backend}": {"status": "pending"} for backend in self._backends()}
+            self.components.update({f"profile:{profile_id}": {"status": "pending"} for profile_id in CLIENTS})
+            self.components["llm"] = {"status": "pending"}
+            self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+            self._thread.start()
+
+    def run(self):
+        for backend in self._backends():
+            self._step(f"embedding_model:{backend}", lambda b=backend: get_embedding_service(b).encode([WARMUP_QUERY]))
+        for profile_id in CLIENTS:
+            self._step(f"profile:{profile_id}", lambda pid=profile_id: profile_manager.get_store(pid).search(WARMUP_QUERY))
+        self._step("llm", llm_processor.warm_up)
+        self.finished_at = time.time()
+        print(f"Warm-up finished in {self.finished_at - self.started_at:.2f}s, ready={self.is_ready()}, "
+              f"degraded={self.degraded_components()}")
+
+    def _step(self, name: str, func):
+        self.components[name] = {"status": "warming"}
+        start = time.perf_counter()
+        try:
+            func()
+            self.components[name] = {"status": "ready", "seconds": round(time.perf_counter() - start, 3)}
+        except Exception as e:
+            print(f"Warm-up of {name} failed: {e}")
+            self.components[name] = {
+                "status": "failed", "seconds": round(time.perf_counter() - start, 3), "error": str(e)
+            }
+
+    def _is_required(self, name: str) -> bool:
+        return not name.startswith("profile:") or name[len("profile:"):] in self.required_profiles
+
+    def degraded_components(self) -> list:
+        """Optional components that failed to warm up"""
+        return sorted(name for name, c in dict(self.components).items()
+                      if c["status"] == "failed" and not self._is_required(name))
+
+    def is_ready(self) -> bool:
+        """Without warm-up everything loads lazily, so the app is ready as soon as it is live"""
+        if not self.enabled:
+            return True
+        return self.finished_at is not None and all(
+            c["status"] == "ready" for name, c in dict(self.components).items() if self._is_required(name))
+
+    def report(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "finished": self.finished_at is not None,
+            "total_seconds": round(self.finished_at - self.started_at, 3) if self.finished_at else None,
+            "degraded": self.degraded_components(),
+            "components": dict(self.components),
+        }
+
+
+warmup_service = WarmupService()
@@ -6,6 +6,10 @@ from datetime import datetime
 from pathlib import Path
 from src.tatva_util.tatvaAi_utils import Tatva_Utils
 from src.db_connection.db_engine import Engine,Read_Write
+from src.data_analysis_dckdb.conversational_bi import AnalyticalFilter
+from src.data_analysis_dckdb.sql_cache import sql_cache, schema_fingerprint
+from src.data_analysis_dckdb.question_parser import question_parser
+from src.data_analysis_dckdb.sql_examples import sql_examples, compact_history
 from src.config.config import Config
 config = Config()
 
@@ -24,6 +28,7 @@ class TatvaAIMain():
         self.db_funct = Read_Write()
         self.connection = Engine()
         self.build_query = Tatva_Utils()
+        self.sql_builder = AnalyticalFilter()
 
     def get_parquet_path(self, base_dir, userid , sessionid ,fl):
         # parquet_path = os.path.join(base_dir, f"{client_id}_sales.paraquet")
@@ -98,13 +103,18 @@ class TatvaAIMain():
         try:
             parquet_file = pq.ParquetFile(parquet_path)
             print(parquet_file)
-            columns = parquet_file.schema.names
+            schema = parquet_file.schema_arrow
         except Exception as e:
             return {"error": f"Unable to read parquet file: {str(e)}"}
 
         try:
             session_history = self.get_recent_history(session_id, userid)
-            query_response = self.build_query.get_sql_query(question, columns, session_history)
+            query_response, source = question_parser.parse(question, schema, parquet_path, session_history), 'rules'
+            if query_response is None:
+                examples = sql_examples.similar(question, schema, userid, exclude=compact_history(session_history))
+                query_response, sql_key, source = self.sql_builder.get_sql_query_cached(
+                    question, schema, parquet_path, session_history, examples=examples)
+            print('sql source', source)
             query = query_response['sql_query']
             query_ = query.replace("parquet_data", f"parquet_scan('{parquet_path}')")
             print(query_)
@@ -113,9 +123,13 @@ class TatvaAIMain():
                 result = self.conn.execute(query_).fetchdf()
             except Exception as e:
                 return {'status': f'kindly check datatype of {col_list}.there might be issue.'}
+            if source == 'llm':
+                sql_cache.put(sql_key, query_response)
+            sql_examples.add(question, query_response, schema, userid)
             result_dict = result.to_dict(orient='records')
             query_response['success'] = result_dict
             query_response['question'] = question
+            query_response['schema_fingerprint'] = schema_fingerprint(schema)
             timestamp = datetime.now().strftime("%d%m%y%H%M%S")
 
             connect, status = self.connection.connect_engine()
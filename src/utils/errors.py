@@ -0,0 +1,12 @@
+"""
+Errors
+Exceptions shared by the Ollama and Gemini call paths and mapped to HTTP responses
+"""
+
+
+class QueueFullError(Exception):
+    """A call cannot be admitted now (queue full or quota exhausted); retry_after is a hint in seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
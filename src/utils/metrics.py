@@ -0,0 +1,170 @@
+"""
+Metrics
+Minimal in-process registry exposed in the Prometheus text format
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.config.settings import CLIENTS
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+TOKEN_BUCKETS = (128, 256, 512, 1024, 1536, 2048, 3072, 4096, 6144, 8192)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: tuple, le: Optional[str] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple, list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        lines = self.header()
+        for key, values in series.items():
+            for bound, count in zip(self.buckets, values):
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, str(bound))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, '+Inf')} {values[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {values[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {values[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them; collectors refresh gauges from live stats at scrape time"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def on_collect(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+RAG_STAGE_SECONDS = registry.register(Histogram(
+    "rag_stage_seconds", "Time spent in each stage of the RAG pipeline", ("stage", "client_id")
+))
+RAG_REQUESTS = registry.register(Counter(
+    "rag_requests_total", "Knowledge-base queries handled", ("endpoint", "client_id", "answer_source")
+))
+LLM_PROMPT_TOKENS = registry.register(Histogram(
+    "llm_prompt_tokens", "Estimated tokens in each RAG prompt sent to Ollama", ("client_id",), buckets=TOKEN_BUCKETS
+))
+LLM_QUEUE_WAIT_SECONDS = registry.register(Histogram(
+    "llm_queue_wait_seconds", "Time LLM calls waited for a scheduler slot", ("priority",)
+))
+LLM_QUEUE_DEPTH = registry.register(Gauge("llm_queue_depth", "LLM calls waiting for a slot"))
+LLM_RUNNING = registry.register(Gauge("llm_running", "LLM calls currently running"))
+LLM_QUEUE_REJECTED = registry.register(Counter(
+    "llm_queue_rejected_total", "LLM calls rejected: queue full, displaced by higher priority or timed out", ("reason",)
+))
+
+
+def client_label(client_id: Optional[str]) -> str:
+    """client_id label value; unknown ids share one label so bad input cannot grow the series"""
+    return client_id if client_id in CLIENTS else "unknown"
+
+
+def stage_timer(stage: str, client_id: Optional[str]):
+    """Context manager recording the duration of one pipeline stage"""
+    return RAG_STAGE_SECONDS.time(stage=stage, client_id=client_label(client_id))
+
+
+def observe_stage(stage: str, client_id: Optional[str], seconds: float):
+    RAG_STAGE_SECONDS.observe(seconds, stage=stage, client_id=client_label(client_id))
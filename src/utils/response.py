@@ -1,2 +1,10 @@
+import json
+
+
 def success_response(**data):
     return {"status": "success", **data}
+
+
+def sse_event(event: str, **data) -> str:
+    """One Server-Sent Events frame with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
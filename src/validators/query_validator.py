@@ -1,4 +1,4 @@
-from src.config.settings import CLIENTS
+from src.config.settings import CLIENTS, BATCH_MAX_QUERIES
 
 class QueryValidator:
 
@@ -13,3 +13,19 @@ class QueryValidator:
         if not payload.get("query", "").strip():
             raise ValueError("Query cannot be empty")
         print("query is not empty")
+
+
+    @staticmethod
+    def validate_batch(payload: dict):
+        if not payload:
+            raise ValueError("Payload missing")
+
+        if payload.get("client_id") not in CLIENTS:
+            raise ValueError("Invalid client_id")
+
+        queries = payload.get("queries")
+        if not isinstance(queries, list) or not queries:
+            raise ValueError("queries must be a non-empty list")
+
+        if len(queries) > BATCH_MAX_QUERIES:
+            raise ValueError(f"A batch may contain at most {BATCH_MAX_QUERIES} queries")
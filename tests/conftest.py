@@ -0,0 +1,106 @@
+"""
+Shared fixtures.
+
+Run from the repository root with `python -m pytest tests`. Nothing here
+loads a real embedding model or talks to Ollama, Gemini or Postgres:
+profiles are built in a temp directory with a deterministic fake encoder.
+"""
+
+import hashlib
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.config.settings import CLIENTS, EMBEDDING_DIMENSION  # noqa: E402
+
+
+class FakeEncoder:
+    """Stands in for EmbeddingService: one stable pseudo-random unit vector per text"""
+
+    def __init__(self, model_name: str = "fake-model", backend: str = "torch"):
+        self.model_name = model_name
+        self.backend = backend
+        self.calls = []  # texts passed to each encode_documents call
+
+    @property
+    def model_id(self) -> str:
+        return self.model_name if self.backend == "torch" else f"{self.model_name}@{self.backend}"
+
+    @staticmethod
+    def vector(text: str) -> np.ndarray:
+        seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+        vector = np.random.default_rng(seed).standard_normal(EMBEDDING_DIMENSION).astype("float32")
+        return vector / np.linalg.norm(vector)
+
+    def encode(self, texts):
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        return np.vstack([self.vector(t) for t in texts]).astype("float32")
+
+    def encode_documents(self, texts, batch_size: int = 64):
+        self.calls.append(list(texts))
+        return self.encode(texts)
+
+
+@pytest.fixture
+def encoder(monkeypatch):
+    fake = FakeEncoder()
+    monkeypatch.setattr("src.profiles.index_builder.get_embedding_service", lambda backend=None: fake)
+    monkeypatch.setattr("src.profiles.loader.get_embedding_service", lambda backend=None: fake)
+    return fake
+
+
+def profile_config(root: Path, profile_id: str) -> dict:
+    stores = root / "vector_stores"
+    return {
+        "name": profile_id.title(),
+        "data_dir": str(root / "data" / profile_id),
+        "vector_store_path": str(stores / f"{profile_id}_index.faiss"),
+        "metadata_path": str(stores / f"{profile_id}_metadata.pkl"),
+        "chunk_store_path": str(stores / f"{profile_id}_chunks.bin"),
+        "bm25_path": str(stores / f"{profile_id}_bm25.npz"),
+        "manifest_path": str(stores / f"{profile_id}_manifest.json"),
+        "faq_index_path": str(stores / f"{profile_id}_faq.npz"),
+        "index": {"type": "flat"},
+    }
+
+
+@pytest.fixture
+def make_profile(tmp_path, monkeypatch):
+    """Register a temp profile in CLIENTS; files maps name -> text written to its data dir"""
+
+    def make(profile_id: str = "acme", files: dict = None) -> dict:
+        config = profile_config(tmp_path, profile_id)
+        monkeypatch.setitem(CLIENTS, profile_id, config)
+        if files is not None:
+            data_dir = Path(config["data_dir"])
+            data_dir.mkdir(parents=True, exist_ok=True)
+            for name, text in files.items():
+                (data_dir / name).write_text(text, encoding="utf-8")
+        return config
+
+    return make
+
+
+@pytest.fixture
+def embedding_cache(tmp_path):
+    from src.profiles.index_builder import EmbeddingCache
+
+    cache = EmbeddingCache(str(tmp_path / "embedding_cache.sqlite"))
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def fake_ollama():
+    """scripts.fake_ollama served on a free local port; yields its base URL"""
+    from scripts.fake_ollama import start_fake_ollama
+
+    server = start_fake_ollama(0)
+    host, port = server.server_address
+    yield f"http://{host}:{port}"
+    server.shutdown()
+    server.server_close()
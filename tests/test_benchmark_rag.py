@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from scripts import benchmark_rag
+from src.llm.ollama_client import OllamaClient
+from src.profiles.index_builder import IndexBuilder
+
+NUMBERED_FAQ = "ACME FAQ\n\nQ1. What does Acme sell?\nAcme sells anvils.\n\nQ2. Where is Acme?\nIn the desert.\n"
+
+
+def test_numbered_faq_gives_golden_questions(encoder, make_profile, embedding_cache, fake_ollama, monkeypatch):
+    make_profile("acme", {"faq.txt": NUMBERED_FAQ})
+    IndexBuilder("acme", cache=embedding_cache).build()
+    monkeypatch.setattr(benchmark_rag.llm_processor, "client", OllamaClient(fake_ollama))
+
+    result = benchmark_rag.benchmark_profile("acme", k=3, concurrency=1)
+
+    assert result["questions"] == 2
+    assert result["recall@3"] == 1.0
+    assert result["llm_errors"] == 0
+
+
+def test_client_without_golden_questions_is_reported(make_profile, capsys):
+    make_profile("acme", {"faq.txt": "Notes only, no questions."})
+
+    result = benchmark_rag.benchmark_profile("acme", k=3, concurrency=1)
+
+    assert "no golden questions" in result["error"]
+    assert "no Q/A pairs were parsed" in capsys.readouterr().out
+
+
+def test_benchmark_fails_when_a_client_is_skipped(monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(benchmark_rag, "benchmark_profile", lambda profile_id, k, concurrency: {"error": "no golden"})
+    monkeypatch.setattr("sys.argv", ["benchmark_rag", "optima", "--json", str(tmp_path / "run.json")])
+    monkeypatch.setattr(benchmark_rag.llm_processor, "client", benchmark_rag.llm_processor.client)
+
+    with pytest.raises(SystemExit) as exit_info:
+        benchmark_rag.main()
+
+    assert exit_info.value.code == 1
+    assert "WARNING: no recall, latency or throughput numbers for optima" in capsys.readouterr().out
+    assert json.loads((tmp_path / "run.json").read_text())["skipped"] == {"optima": "no golden"}
@@ -0,0 +1,58 @@
+import numpy as np
+
+from src.profiles.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+
+DOCS = {
+    11: "The AG-10 pump is rated for 40 litres per minute.",
+    22: "Our pumps ship from the Pune warehouse.",
+    33: "Warranty claims for the AG-20 pump need the invoice.",
+    44: "Opening hours are 9 to 5 on weekdays.",
+}
+
+
+def build():
+    return BM25Index.build(list(DOCS), list(DOCS.values()))
+
+
+def test_tokenize_keeps_codes_whole_and_split():
+    assert tokenize("The AG-10 pump, v2.1!") == ["ag-10", "ag", "10", "pump", "v2.1", "v2", "1"]
+
+
+def test_exact_code_ranks_first():
+    results = build().search("ag-10 pump", top_k=3)
+    assert results[0][0] == 11
+    assert [chunk_id for chunk_id, _ in results] == [11, 33]  # no stemming: "pumps" does not match "pump"
+    assert all(score > 0 for _, score in results)
+
+
+def test_no_match_and_stopword_only_queries():
+    index = build()
+    assert index.search("zebra", top_k=5) == []
+    assert index.search("the of and", top_k=5) == []
+
+
+def test_top_k_limits_and_orders_by_score():
+    results = build().search("pump warehouse invoice", top_k=2)
+    assert len(results) == 2
+    assert results[0][1] >= results[1][1]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = build()
+    path = str(tmp_path / "bm25.npz")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert loaded.search("warranty invoice", 2) == index.search("warranty invoice", 2)
+    assert loaded.nbytes == index.nbytes
+
+
+def test_empty_index():
+    index = BM25Index.build([], [])
+    assert index.search("pump", 3) == []
+    assert index.doc_ids.dtype == np.int64
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]], k=60)
+    assert [doc_id for doc_id, _ in fused] == [1, 3, 2, 4]
+    assert fused[0][1] == 1 / 61 + 1 / 62
@@ -0,0 +1,41 @@
+import pytest
+
+from src.profiles.chunk_store import ChunkStore
+
+CHUNKS = {42: "Shipping takes three days.", 7: "Acme sells anvils — and rockets.", 2 ** 62: "", 1000: "ünïcödé"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = str(tmp_path / "chunks.bin")
+    ChunkStore.write(path, CHUNKS)
+    return ChunkStore(path)
+
+
+def test_round_trip_by_chunk_id(store):
+    for chunk_id, text in CHUNKS.items():
+        assert store[chunk_id] == text
+        assert bytes(store.get_view(chunk_id)) == text.encode("utf-8")
+    assert len(store) == len(CHUNKS)
+    assert list(store) == sorted(CHUNKS)
+
+
+def test_unknown_ids(store):
+    assert 8 not in store and 42 in store
+    assert store.get(8, "missing") == "missing"
+    with pytest.raises(KeyError):
+        store[2 ** 63 - 1]
+
+
+def test_empty_store(tmp_path):
+    path = str(tmp_path / "empty.bin")
+    ChunkStore.write(path, {})
+    store = ChunkStore(path)
+    assert len(store) == 0 and 1 not in store
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "index.faiss"
+    path.write_bytes(b"not a chunk store at all")
+    with pytest.raises(ValueError):
+        ChunkStore(str(path))
@@ -0,0 +1,82 @@
+import numpy as np
+
+from src.config.settings import CONTEXT_CHARS_PER_TOKEN
+from src.llm.context_packer import CHUNK_OVERHEAD_TOKENS, ContextPacker, count_tokens
+from src.profiles.loader import RetrievalResult
+
+
+class FakeStore:
+    def __init__(self, vectors):
+        self.vectors = {chunk_id: np.asarray(v, dtype="float32") for chunk_id, v in vectors.items()}
+
+    def chunk_vectors(self, chunk_ids):
+        return np.stack([self.vectors[chunk_id] for chunk_id in chunk_ids])
+
+
+def _retrieval(query, texts):
+    chunk_ids = list(range(len(texts)))
+    documents = [(text, 1.0 - 0.1 * i) for i, text in enumerate(texts)]
+    return RetrievalResult(np.asarray(query, dtype="float32"), chunk_ids, documents)
+
+
+def test_count_tokens():
+    assert count_tokens("") == 0
+    assert count_tokens("a" * CONTEXT_CHARS_PER_TOKEN) == 1
+    assert count_tokens("a" * (CONTEXT_CHARS_PER_TOKEN + 1)) == 2
+
+
+def test_near_duplicates_are_dropped():
+    packer = ContextPacker(budget=10_000)
+    store = FakeStore({0: [1, 0, 0], 1: [1, 0.01, 0], 2: [0, 1, 0]})
+    packed = packer.pack("p", store, _retrieval([1, 0, 0], ["pump spec", "pump spec copy", "warranty"]))
+
+    assert packed.chunk_ids == [0, 2]
+    assert [text for text, _ in packed.documents] == ["pump spec", "warranty"]
+    assert packer.stats()["duplicates_dropped"] == 1
+
+
+def test_mmr_prefers_novel_chunk_over_redundant_one():
+    packer = ContextPacker(budget=10_000, mmr_lambda=0.3, duplicate_similarity=1.1)
+    store = FakeStore({0: [1, 0, 0], 1: [0.9, 0.3, 0], 2: [0.6, 0, 0.8]})
+    packed = packer.pack("p", store, _retrieval([1, 0, 0], ["a", "b", "c"]))
+
+    assert packed.chunk_ids == [0, 2, 1]
+
+
+def test_budget_drops_chunks_that_do_not_fit():
+    text = "x" * (10 * CONTEXT_CHARS_PER_TOKEN)
+    packer = ContextPacker(budget=2 * (10 + CHUNK_OVERHEAD_TOKENS))
+    packed = packer.pack("p", None, RetrievalResult(None, [0, 1, 2], [(text, 0.9), (text, 0.8), (text, 0.7)]))
+
+    assert packed.chunk_ids == [0, 1]
+    assert packer.stats()["over_budget_dropped"] == 1
+    assert packer.stats()["tokens_packed_avg"] == 2 * (10 + CHUNK_OVERHEAD_TOKENS)
+
+
+def test_first_chunk_is_truncated_rather_than_dropped():
+    packer = ContextPacker(budget=CHUNK_OVERHEAD_TOKENS + 5)
+    long_text = "y" * (100 * CONTEXT_CHARS_PER_TOKEN)
+    packed = packer.pack("p", None, RetrievalResult(None, [7, 8], [(long_text, 0.9), ("short", 0.8)]))
+
+    assert packed.chunk_ids == [7]
+    assert len(packed.documents[0][0]) == 5 * CONTEXT_CHARS_PER_TOKEN
+    assert packer.stats()["truncated"] == 1
+
+
+def test_profile_budget_overrides_default(make_profile, monkeypatch):
+    from src.config.settings import CLIENTS
+
+    make_profile("budgeted", {"knowledge.txt": "x"})
+    monkeypatch.setitem(CLIENTS["budgeted"], "context_token_budget", 123)
+    packer = ContextPacker(budget=10)
+
+    assert packer.budget_for("budgeted") == 123
+    assert packer.budget_for("unknown") == 10
+
+
+def test_empty_retrieval_is_returned_unchanged():
+    packer = ContextPacker()
+    retrieval = RetrievalResult(None, [], [])
+
+    assert packer.pack("p", None, retrieval) is retrieval
+    assert packer.stats()["packs"] == 0
@@ -0,0 +1,144 @@
+import numpy as np
+
+from src.profiles.faq import FaqIndex, FaqPair, load_faq, parse_faq
+from src.profiles.index_builder import IndexBuilder
+from src.profiles.loader import VectorStoreLoader
+from src.services import query_service
+from src.services.query_service import QueryService
+
+QA_FAQ = """Q: What does Acme sell?
+A: Acme sells anvils
+and rockets.
+
+Q: Where is Acme based?
+A: In the desert.
+"""
+
+NUMBERED_FAQ = """ACME – FAQ
+==========
+
+Questions are atomic and independent.
+
+--------------------------------------------------
+
+Q1. What does Acme sell?
+Acme sells anvils.
+
+Q2) Where is Acme based?
+A2. In the desert.
+
+Q10: Do anvils float?
+No.
+They sink.
+
+END OF FAQ
+"""
+
+
+def test_parses_q_a_blocks_with_multiline_answers():
+    assert parse_faq(QA_FAQ) == [
+        FaqPair("What does Acme sell?", "Acme sells anvils and rockets."),
+        FaqPair("Where is Acme based?", "In the desert."),
+    ]
+
+
+def test_parses_numbered_blocks_and_skips_headers():
+    assert parse_faq(NUMBERED_FAQ) == [
+        FaqPair("What does Acme sell?", "Acme sells anvils."),
+        FaqPair("Where is Acme based?", "In the desert."),
+        FaqPair("Do anvils float?", "No. They sink."),
+    ]
+
+
+def test_windows_line_endings():
+    assert len(parse_faq(QA_FAQ.replace("\n", "\r\n"))) == 2
+
+
+def test_every_shipped_faq_parses():
+    from src.config.settings import CLIENTS
+
+    for profile_id in CLIENTS:
+        assert load_faq(profile_id), profile_id
+
+
+def test_unparseable_faq_warns(make_profile, capsys):
+    make_profile("acme", {"faq.txt": "Some notes\nwithout any questions."})
+
+    assert load_faq("acme") == []
+    assert "no Q/A pairs were parsed" in capsys.readouterr().out
+
+
+def test_missing_or_empty_faq_is_silent(make_profile, capsys):
+    make_profile("acme", {"faq.txt": "\n"})
+    make_profile("other", {"knowledge.txt": "x"})
+
+    assert load_faq("acme") == [] and load_faq("other") == []
+    assert capsys.readouterr().out == ""
+
+
+def test_index_matches_only_above_threshold(tmp_path):
+    pairs = [FaqPair("a?", "A"), FaqPair("b?", "B")]
+    index = FaqIndex.build(pairs, np.array([[2.0, 0, 0], [0, 1.0, 0]]))
+    path = str(tmp_path / "faq.npz")
+    index.save(path)
+    index = FaqIndex.load(path)
+
+    match = index.match(np.array([1.0, 0.1, 0]), threshold=0.9)
+
+    assert (match.question, match.answer) == ("a?", "A")
+    assert round(match.similarity, 3) == 0.995
+    assert index.match(np.array([1.0, 1.0, 0]), threshold=0.9) is None
+    assert FaqIndex.build([], np.zeros((0, 3))).match(np.ones(3), 0.5) is None
+
+
+def build(make_profile, embedding_cache, faq=NUMBERED_FAQ):
+    make_profile("acme", {"faq.txt": faq, "knowledge.txt": "Acme was founded in 1949."})
+    return IndexBuilder("acme", cache=embedding_cache).build()
+
+
+def test_builder_indexes_numbered_faq(encoder, make_profile, embedding_cache):
+    summary = build(make_profile, embedding_cache)
+    store = VectorStoreLoader("acme")
+
+    assert summary["faq_pairs"] == 3
+    assert store.match_faq("Do anvils float?").answer == "No. They sink."
+    assert store.match_faq("Who founded Acme?") is None
+
+
+def test_builder_rebuilds_faq_index_when_pair_count_changes(encoder, make_profile, embedding_cache, monkeypatch):
+    from src.profiles import index_builder
+
+    with monkeypatch.context() as m:
+        m.setattr(index_builder, "load_faq", lambda profile_id: [])  # as the old parser saw numbered FAQs
+        assert build(make_profile, embedding_cache)["faq_pairs"] == 0
+
+    summary = IndexBuilder("acme", cache=embedding_cache).build()
+
+    assert summary["faq_pairs"] == 3  # same files, but the parser now finds the pairs
+
+
+def test_query_answers_from_faq_without_the_llm(encoder, make_profile, embedding_cache, monkeypatch):
+    build(make_profile, embedding_cache)
+    store = VectorStoreLoader("acme")
+    monkeypatch.setattr(query_service.profile_manager, "load_profile", lambda client_id: store)
+    monkeypatch.setattr(QueryService, "_answer", staticmethod(lambda *args, **kwargs: 1 / 0))
+
+    response = QueryService.process({"client_id": "acme", "query": "What does Acme sell?"})
+
+    assert response["answer"] == "Acme sells anvils."
+    assert response["answer_source"] == "faq"
+    assert response["faq_question"] == "What does Acme sell?"
+    assert response["context_retrieved"] == 0
+
+
+def test_batch_answers_from_faq(encoder, make_profile, embedding_cache, monkeypatch):
+    build(make_profile, embedding_cache)
+    store = VectorStoreLoader("acme")
+    monkeypatch.setattr(query_service.profile_manager, "load_profile", lambda client_id: store)
+    monkeypatch.setattr(QueryService, "_answer", staticmethod(lambda *args, **kwargs: ("from llm", "llm")))
+
+    response = QueryService.process_batch({"client_id": "acme", "queries": ["Do anvils float?", "Who founded Acme?"]})
+
+    assert [(r["answer_source"], r["answer"]) for r in response["results"]] == [
+        ("faq", "No. They sink."), ("llm", "from llm")
+    ]
@@ -0,0 +1,116 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from google.genai import errors
+
+from src.data_analysis_dckdb.gemini_scheduler import GeminiScheduler, TokenBucket, estimate_tokens
+from src.utils.errors import QueueFullError
+
+
+class FakePool:
+    """Two keys; each key's calls run the next scripted outcome (an exception or a usage count)"""
+
+    def __init__(self, outcomes):
+        self.slots = [SimpleNamespace(index=i, label=f"key{i}", in_flight=0) for i in range(len(outcomes))]
+        self.outcomes = outcomes
+        self.calls = []
+
+    @contextmanager
+    def client(self, slot):
+        self.calls.append(slot.index)
+        outcome = self.outcomes[slot.index].pop(0)
+
+        def stream(**kwargs):
+            if isinstance(outcome, Exception):
+                raise outcome
+            usage = SimpleNamespace(total_token_count=outcome)
+            yield SimpleNamespace(text="select 1", usage_metadata=usage)
+
+        yield SimpleNamespace(models=SimpleNamespace(generate_content_stream=stream))
+
+
+def scheduler_for(pool, **kwargs):
+    options = dict(rpm=10, tpm=100_000, rpd=100, max_retries=2, backoff_base=0.0, backoff_max=0.0,
+                   queue_timeout=0.05)
+    options.update(kwargs)
+    return GeminiScheduler(pool=pool, **options)
+
+
+def api_error(code, retry_after=None):
+    headers = {"retry-after": str(retry_after)} if retry_after else {}
+    return errors.APIError(code, {"error": {"code": code, "message": "failed", "status": "X"}},
+                           response=httpx.Response(code, headers=headers))
+
+
+def usage(scheduler, index):
+    return scheduler.utilization()[f"key{index}"]
+
+
+def test_token_bucket_refills_over_the_window():
+    bucket = TokenBucket(10, window_seconds=10)
+    bucket.take(10, now=bucket.updated)
+    assert bucket.wait_time(5, now=bucket.updated) == pytest.approx(5)
+    assert bucket.headroom(now=bucket.updated + 5) == pytest.approx(0.5)
+    assert TokenBucket(0, 10).wait_time(1_000, now=0) == 0  # capacity 0 is unlimited
+
+
+def test_successful_call_charges_reported_usage():
+    scheduler = scheduler_for(FakePool([[1_000]]))
+    assert scheduler.generate("model", [], None, prompt_text="x" * 400) == "select 1"
+    assert usage(scheduler, 0)["tokens"] == pytest.approx(0.01, abs=1e-3)
+    assert usage(scheduler, 0)["requests"] == pytest.approx(0.1, abs=1e-3)
+
+
+def test_server_error_is_retried_on_another_key_and_refunded():
+    pool = FakePool([[api_error(503)], [1_000]])
+    scheduler = scheduler_for(pool)
+
+    assert scheduler.generate("model", [], None, prompt_text="prompt") == "select 1"
+
+    assert pool.calls == [0, 1]
+    failed = usage(scheduler, 0)
+    assert failed["tokens"] == pytest.approx(0, abs=1e-3)
+    assert failed["requests"] == pytest.approx(0, abs=1e-3)
+    assert failed["daily_requests"] == pytest.approx(0, abs=1e-3)
+    assert scheduler.stats()["retries"] == 1 and failed["server_errors"] == 1
+
+
+def test_throttled_key_gets_tokens_back_but_cools_down():
+    pool = FakePool([[api_error(429, retry_after=30)], [1_000]])
+    scheduler = scheduler_for(pool)
+
+    scheduler.generate("model", [], None, prompt_text="prompt")
+
+    throttled = usage(scheduler, 0)
+    assert throttled["tokens"] == pytest.approx(0, abs=1e-3)
+    assert throttled["requests"] == pytest.approx(1.0, abs=1e-2)
+    assert throttled["cooldown_seconds"] == pytest.approx(30, abs=1) and throttled["throttled"] == 1
+
+
+def test_non_retryable_error_is_raised_and_refunded():
+    scheduler = scheduler_for(FakePool([[api_error(400)]]))
+    with pytest.raises(errors.APIError):
+        scheduler.generate("model", [], None, prompt_text="prompt")
+    assert usage(scheduler, 0)["tokens"] == pytest.approx(0, abs=1e-3)
+
+
+def test_burst_of_failures_does_not_exhaust_token_quota():
+    reserved = estimate_tokens("prompt")
+    pool = FakePool([[api_error(503)] * 3, [api_error(503)] * 3])
+    scheduler = scheduler_for(pool, tpm=reserved * 2, max_retries=5)
+
+    with pytest.raises(errors.APIError):
+        scheduler.generate("model", [], None, prompt_text="prompt")
+
+    assert len(pool.calls) == 6  # every attempt found token quota
+    assert all(key["tokens"] == pytest.approx(0, abs=1e-3) for key in scheduler.utilization().values())
+
+
+def test_exhausted_keys_raise_queue_full():
+    scheduler = scheduler_for(FakePool([[1_000]]), rpm=1)
+    scheduler.generate("model", [], None)
+    with pytest.raises(QueueFullError) as error:
+        scheduler.generate("model", [], None)
+    assert error.value.retry_after >= 1 and scheduler.stats()["timed_out"] == 1
@@ -0,0 +1,113 @@
+import json
+import sys
+from pathlib import Path
+
+import faiss
+import pytest
+
+from scripts import build_indexes
+from src.config.settings import CLIENTS
+from src.profiles.chunk_store import ChunkStore
+from src.profiles.index_builder import EmbeddingCache, IndexBuilder, chunk_id, chunk_text, fingerprint
+
+KNOWLEDGE = "Acme sells anvils.\n\nShipping takes three days.\n\nReturns are accepted for 30 days."
+FAQ = "Q: Do you ship abroad?\nA: Yes, to 40 countries.\n\nQ: How do I pay?\nA: By card or transfer."
+
+
+def read_manifest(config):
+    with open(config["manifest_path"], encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_chunk_text_splits_paragraphs_and_long_ones_on_sentences():
+    assert chunk_text("one\n\n  \n\ntwo\n") == ["one", "two"]
+    long_paragraph = "First sentence here. Second sentence here. Third one."
+    assert chunk_text(long_paragraph, max_chars=25) == ["First sentence here.", "Second sentence here.", "Third one."]
+
+
+def test_first_build_embeds_everything(encoder, make_profile, embedding_cache):
+    config = make_profile("acme", {"knowledge.txt": KNOWLEDGE, "faq.txt": FAQ})
+
+    summary = IndexBuilder("acme", cache=embedding_cache).build()
+
+    assert summary["version"] == 1
+    assert summary["added"] == summary["total"] == 5
+    assert summary["faq_pairs"] == 2
+    index = faiss.read_index(config["vector_store_path"])
+    assert index.ntotal == 5
+    store = ChunkStore(config["chunk_store_path"])
+    assert store[chunk_id(fingerprint("Shipping takes three days."))] == "Shipping takes three days."
+    manifest = read_manifest(config)
+    assert manifest["model"] == encoder.model_name and manifest["encoder"] == encoder.backend
+
+
+def test_rebuild_only_embeds_changed_chunks(encoder, make_profile, embedding_cache):
+    config = make_profile("acme", {"knowledge.txt": KNOWLEDGE})
+    IndexBuilder("acme", cache=embedding_cache).build()
+    encoder.calls.clear()
+
+    Path(config["data_dir"], "knowledge.txt").write_text(
+        KNOWLEDGE.replace("three days", "two days"), encoding="utf-8")
+    summary = IndexBuilder("acme", cache=embedding_cache).build()
+
+    assert (summary["added"], summary["removed"], summary["unchanged"]) == (1, 1, 2)
+    assert encoder.calls == [["Shipping takes two days."]]
+    assert summary["version"] == 2
+    index = faiss.read_index(config["vector_store_path"])
+    assert index.ntotal == 3
+    store = ChunkStore(config["chunk_store_path"])
+    assert chunk_id(fingerprint("Shipping takes three days.")) not in store
+    assert store[chunk_id(fingerprint("Shipping takes two days."))] == "Shipping takes two days."
+
+
+def test_unchanged_data_is_a_no_op(encoder, make_profile, embedding_cache):
+    make_profile("acme", {"knowledge.txt": KNOWLEDGE})
+    IndexBuilder("acme", cache=embedding_cache).build()
+    encoder.calls.clear()
+
+    summary = IndexBuilder("acme", cache=embedding_cache).build()
+
+    assert summary["version"] == 1 and summary["added"] == summary["removed"] == 0
+    assert encoder.calls == []
+
+
+def test_forced_rebuild_reuses_cached_embeddings(encoder, make_profile, embedding_cache):
+    make_profile("acme", {"knowledge.txt": KNOWLEDGE})
+    IndexBuilder("acme", cache=embedding_cache).build()
+    encoder.calls.clear()
+
+    summary = IndexBuilder("acme", cache=embedding_cache).build(force=True)
+
+    assert summary["version"] == 2 and summary["embedded"] == 0
+    assert encoder.calls == []
+
+
+def test_missing_data_dir_raises(encoder, make_profile, embedding_cache):
+    make_profile("ghost")
+    with pytest.raises(FileNotFoundError):
+        IndexBuilder("ghost", cache=embedding_cache).build()
+
+
+def test_default_run_builds_remaining_profiles_and_exits_non_zero(encoder, make_profile, monkeypatch, tmp_path,
+                                                                  capsys):
+    for profile_id in list(CLIENTS):
+        monkeypatch.delitem(CLIENTS, profile_id)
+    make_profile("broken")  # no data dir
+    good = make_profile("good", {"knowledge.txt": KNOWLEDGE})
+    monkeypatch.setattr(build_indexes, "EmbeddingCache", lambda: EmbeddingCache(str(tmp_path / "cache.sqlite")))
+    monkeypatch.setattr(sys, "argv", ["build_indexes"])
+
+    with pytest.raises(SystemExit) as exit_info:
+        build_indexes.main()
+
+    assert exit_info.value.code == 1
+    assert read_manifest(good)["version"] == 1
+    output = capsys.readouterr().out
+    assert "broken: FAILED - FileNotFoundError" in output
+    assert "1 of 2 profiles failed: broken" in output
+
+
+@pytest.mark.parametrize("profile_id", sorted(CLIENTS))
+def test_configured_profiles_point_at_existing_data(profile_id):
+    repo_root = Path(__file__).resolve().parent.parent
+    assert (repo_root / CLIENTS[profile_id]["data_dir"]).is_dir()
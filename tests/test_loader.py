@@ -0,0 +1,169 @@
+import os
+
+import faiss
+import numpy as np
+import pytest
+
+from src.profiles import loader, manager
+from src.profiles.index_factory import build_index, resolve_spec
+from src.profiles.index_builder import IndexBuilder
+from src.profiles.loader import VectorStoreLoader, disk_signature
+from tests.conftest import FakeEncoder
+
+KNOWLEDGE = "Acme sells anvils.\n\nShipping takes three days.\n\nReturns are accepted for 30 days."
+
+
+def build(make_profile, embedding_cache, profile_id="acme"):
+    config = make_profile(profile_id, {"knowledge.txt": KNOWLEDGE})
+    IndexBuilder(profile_id, cache=embedding_cache).build()
+    return config
+
+
+def test_index_built_with_same_encoder_is_not_stale(encoder, make_profile, embedding_cache):
+    build(make_profile, embedding_cache)
+    assert not VectorStoreLoader("acme").is_stale()
+
+
+def test_index_built_with_other_backend_of_same_model_is_stale(encoder, make_profile, embedding_cache, monkeypatch,
+                                                               capsys):
+    build(make_profile, embedding_cache)
+    onnx = FakeEncoder(model_name=encoder.model_name, backend="onnx-int8")
+    monkeypatch.setattr(loader, "get_embedding_service", lambda backend=None: onnx)
+
+    store = VectorStoreLoader("acme")
+
+    assert store.is_stale()
+    assert "fake-model@onnx-int8" in capsys.readouterr().out
+
+
+def test_search_returns_chunk_text(encoder, make_profile, embedding_cache):
+    build(make_profile, embedding_cache)
+    store = VectorStoreLoader("acme")
+
+    result = store.search("Shipping takes three days.", top_k=1)
+
+    assert result.documents[0][0] == "Shipping takes three days."
+
+
+def test_off_topic_query_sharing_a_word_with_the_corpus_gets_no_context(encoder, make_profile, embedding_cache,
+                                                                        monkeypatch):
+    build(make_profile, embedding_cache)
+    store = VectorStoreLoader("acme")
+    # A query vector pointing away from every chunk, so no chunk clears RELEVANCE_THRESHOLD
+    away = -encoder.encode(KNOWLEDGE.split("\n\n")).sum(axis=0)
+    monkeypatch.setattr(encoder, "encode", lambda texts: np.vstack([away / np.linalg.norm(away)] * len(texts)))
+
+    result = store.search("Who won the anvils world cup?", top_k=3)
+
+    assert store.bm25.search("Who won the anvils world cup?", 5)  # "anvils" is a lexical hit
+    assert result.documents == []
+
+
+def test_lexical_hit_above_threshold_is_fused_in(encoder, make_profile, embedding_cache, monkeypatch):
+    build(make_profile, embedding_cache)
+    store = VectorStoreLoader("acme")
+    monkeypatch.setattr(loader, "RELEVANCE_THRESHOLD", 0.0)
+
+    result = store.search("anvils", top_k=3)
+
+    assert "Acme sells anvils." in [text for text, _ in result.documents]
+
+
+def _write_index(tmp_path, spec, count=200):
+    vectors = np.random.default_rng(0).standard_normal((count, 384)).astype("float32")
+    path = str(tmp_path / f"{spec['type']}.faiss")
+    faiss.write_index(build_index(resolve_spec(spec), vectors, np.arange(count, dtype="int64")), path)
+    return path
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_flat_and_hnsw_codes_are_mapped_not_copied(tmp_path, index_type):
+    path = _write_index(tmp_path, {"type": index_type})
+
+    index, mapped = VectorStoreLoader._read_index(path, index_type)
+    inner = faiss.downcast_index(index.index)
+    storage = faiss.downcast_index(inner.storage) if index_type == "hnsw" else inner
+
+    assert mapped
+    assert not storage.codes.is_owned
+    assert index.search(np.zeros((1, 384), dtype="float32"), 1)[1][0][0] >= 0
+
+
+def test_ivf_lists_are_mapped_not_copied(tmp_path):
+    path = _write_index(tmp_path, {"type": "ivf", "nlist": 2})
+
+    index, mapped = VectorStoreLoader._read_index(path, "ivf")
+
+    assert mapped
+    assert isinstance(faiss.downcast_InvertedLists(index.invlists), faiss.OnDiskInvertedLists)
+
+
+def test_mapped_index_is_not_counted_against_the_memory_budget(encoder, make_profile, embedding_cache):
+    config = build(make_profile, embedding_cache)
+    store = VectorStoreLoader("acme")
+    index_size = os.path.getsize(config["vector_store_path"])
+
+    assert store.index_mapped
+    assert store.mapped_bytes == index_size + os.path.getsize(config["chunk_store_path"])
+    assert store.memory_bytes < index_size
+
+
+def test_index_is_read_into_memory_when_mmap_is_disabled(encoder, make_profile, embedding_cache, monkeypatch):
+    config = build(make_profile, embedding_cache)
+    monkeypatch.setattr(loader, "VECTOR_STORE_MMAP", False)
+    store = VectorStoreLoader("acme")
+
+    assert not store.index_mapped
+    assert faiss.downcast_index(store.index.index).codes.is_owned
+    assert store.memory_bytes >= os.path.getsize(config["vector_store_path"])
+
+
+def bump_mtime(path, seconds=10):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 1_000_000_000))
+
+
+def test_signature_ignores_index_written_before_the_manifest(encoder, make_profile, embedding_cache):
+    config = build(make_profile, embedding_cache)
+    store = VectorStoreLoader("acme")
+
+    # A rebuild in progress: new index on disk, manifest not yet replaced
+    bump_mtime(config["vector_store_path"])
+    assert disk_signature(config) == store.disk_signature
+
+    bump_mtime(config["manifest_path"])
+    assert disk_signature(config) != store.disk_signature
+
+
+def test_signature_of_legacy_store_follows_the_index(encoder, make_profile, embedding_cache):
+    config = build(make_profile, embedding_cache)
+    os.remove(config["manifest_path"])
+    before = disk_signature(config)
+
+    bump_mtime(config["vector_store_path"])
+
+    assert disk_signature(config) != before
+
+
+def test_manager_does_not_reload_a_half_written_rebuild(encoder, make_profile, embedding_cache, monkeypatch):
+    config = build(make_profile, embedding_cache)
+    monkeypatch.setattr(manager, "HOT_RELOAD_ENABLED", True)
+    monkeypatch.setattr(manager, "HOT_RELOAD_CHECK_INTERVAL", 0)
+    started = []
+    monkeypatch.setattr(manager.threading, "Thread", lambda **kwargs: started.append(kwargs) or _NoThread())
+    profiles = manager.ProfileManager(memory_budget_mb=0)
+    store = profiles.get_store("acme")
+
+    bump_mtime(config["vector_store_path"])
+    profiles.get_store("acme")
+    assert started == []
+
+    bump_mtime(config["manifest_path"])
+    profiles.get_store("acme")
+    assert [kwargs["args"] for kwargs in started] == [("acme",)]
+    assert profiles.get_store("acme") is store  # swapped in only once the reload finishes
+
+
+class _NoThread:
+    def start(self):
+        pass
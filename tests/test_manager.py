@@ -0,0 +1,166 @@
+import threading
+
+import pytest
+
+from src.profiles import manager
+from src.profiles.manager import ProfileManager
+
+MB = 1024 * 1024
+
+
+class FakeStore:
+    """Stands in for VectorStoreLoader; loads block until the test releases them"""
+
+    sizes = {}
+    mapped = {}
+    signature = None
+    release = None
+    loads = []
+
+    def __init__(self, profile_id):
+        FakeStore.loads.append(profile_id)
+        if FakeStore.release is not None:
+            FakeStore.release.wait(5)
+        self.profile_id = profile_id
+        self.profile_config = {}
+        self.disk_signature = FakeStore.signature
+        self.memory_bytes = FakeStore.sizes.get(profile_id, MB)
+        self.mapped_bytes = FakeStore.mapped.get(profile_id, 0)
+
+
+@pytest.fixture
+def fake_stores(monkeypatch):
+    monkeypatch.setattr(manager, "VectorStoreLoader", FakeStore)
+    monkeypatch.setattr(manager, "CLIENTS", {profile_id: {} for profile_id in ("a", "b", "c", "d")})
+    monkeypatch.setattr(manager, "HOT_RELOAD_ENABLED", False)
+    FakeStore.sizes, FakeStore.mapped, FakeStore.signature, FakeStore.release, FakeStore.loads = {}, {}, None, None, []
+    return FakeStore
+
+
+def test_concurrent_first_requests_share_one_load(fake_stores):
+    profiles = ProfileManager(memory_budget_mb=0)
+    fake_stores.release = threading.Event()
+    stores = []
+    threads = [threading.Thread(target=lambda: stores.append(profiles.get_store("a"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for _ in range(200):
+        if fake_stores.loads:
+            break
+        threading.Event().wait(0.01)
+    fake_stores.release.set()
+    for t in threads:
+        t.join(5)
+
+    assert fake_stores.loads == ["a"]
+    assert len(stores) == 8 and all(store is stores[0] for store in stores)
+    assert profiles.stats()["loads"] == 1
+
+
+def test_failed_load_is_not_cached(fake_stores, monkeypatch):
+    profiles = ProfileManager(memory_budget_mb=0)
+
+    def broken(profile_id):
+        raise FileNotFoundError(profile_id)
+
+    monkeypatch.setattr(manager, "VectorStoreLoader", broken)
+    with pytest.raises(FileNotFoundError):
+        profiles.get_store("a")
+    monkeypatch.setattr(manager, "VectorStoreLoader", FakeStore)
+
+    assert profiles.get_store("a").profile_id == "a"
+    assert profiles.stats()["load_failures"] == 1
+
+
+def test_least_recently_used_store_is_evicted_over_budget(fake_stores):
+    profiles = ProfileManager(memory_budget_mb=3)
+    profiles.get_store("a")
+    profiles.get_store("b")
+    profiles.get_store("c")
+    profiles.get_store("a")  # "b" is now least recently used
+
+    profiles.get_store("d")
+
+    stats = profiles.stats()
+    assert stats["resident_profiles"] == ["c", "a", "d"]
+    assert stats["evictions"] == 1
+    assert stats["resident_bytes"] == 3 * MB
+
+
+def test_eviction_continues_until_under_budget_but_keeps_the_newest(fake_stores):
+    fake_stores.sizes = {"c": 5 * MB}
+    profiles = ProfileManager(memory_budget_mb=3)
+    profiles.get_store("a")
+    profiles.get_store("b")
+
+    profiles.get_store("c")
+
+    assert profiles.stats()["resident_profiles"] == ["c"]
+    assert profiles.stats()["evictions"] == 2
+
+
+def test_mapped_bytes_do_not_count_against_the_budget(fake_stores):
+    fake_stores.mapped = {profile_id: 100 * MB for profile_id in ("a", "b", "c")}
+    profiles = ProfileManager(memory_budget_mb=3)
+    for profile_id in ("a", "b", "c"):
+        profiles.get_store(profile_id)
+
+    assert profiles.stats()["resident_profiles"] == ["a", "b", "c"]
+    assert profiles.stats()["mapped_bytes"] == 300 * MB
+
+
+def test_unknown_profile_is_rejected(fake_stores):
+    with pytest.raises(ValueError):
+        ProfileManager().get_store("nope")
+
+
+class _InlineThread:
+    """Runs the reload on start() so the swap is observable without sleeping"""
+
+    def __init__(self, target, args=(), **kwargs):
+        self.target, self.args = target, args
+
+    def start(self):
+        self.target(*self.args)
+
+
+@pytest.fixture
+def hot_reload(fake_stores, monkeypatch):
+    monkeypatch.setattr(manager, "HOT_RELOAD_ENABLED", True)
+    monkeypatch.setattr(manager, "HOT_RELOAD_CHECK_INTERVAL", 0)
+    monkeypatch.setattr(manager.threading, "Thread", _InlineThread)
+    invalidated = []
+    monkeypatch.setattr(manager.semantic_cache, "invalidate", invalidated.append)
+    return invalidated
+
+
+def test_rebuilt_store_is_swapped_in(fake_stores, hot_reload, monkeypatch):
+    profiles = ProfileManager(memory_budget_mb=0)
+    old = profiles.get_store("a")
+    monkeypatch.setattr(manager, "disk_signature", lambda config: ("manifest_path", 2))
+    fake_stores.signature = ("manifest_path", 2)
+
+    assert profiles.get_store("a") is old  # the request that noticed the rebuild finishes on the old store
+    new = profiles.get_store("a")
+
+    assert new is not old
+    assert profiles.stats()["reloads"] == 1
+    assert hot_reload == ["a"]
+    assert profiles.get_store("a") is new  # signature now matches, no further reloads
+    assert fake_stores.loads == ["a", "a"]
+
+
+def test_failed_reload_keeps_the_current_store(fake_stores, hot_reload, monkeypatch):
+    profiles = ProfileManager(memory_budget_mb=0)
+    old = profiles.get_store("a")
+    monkeypatch.setattr(manager, "disk_signature", lambda config: ("manifest_path", 2))
+
+    def broken(profile_id):
+        raise RuntimeError("truncated index")
+
+    monkeypatch.setattr(manager, "VectorStoreLoader", broken)
+    profiles.get_store("a")
+
+    assert profiles.get_store("a") is old
+    assert profiles.stats()["reload_failures"] >= 1
+    assert hot_reload == []
@@ -0,0 +1,103 @@
+import asyncio
+
+from src.llm.processor import LLMProcessor
+from src.utils.metrics import LLM_PROMPT_TOKENS
+
+DOCUMENTS = [("Acme sells anvils.", 0.9), ("Shipping takes three days.", 0.8)]
+
+
+def test_prompt_is_built_without_printing_it(capsys):
+    processor = LLMProcessor("http://127.0.0.1:9")
+
+    messages = processor._messages_for("Do you sell anvils?", DOCUMENTS, "acme")
+
+    assert capsys.readouterr().out == ""
+    assert "[Source 2] (Relevance Score: 80.0%)" in messages[1]["content"]
+    assert messages[1]["content"].rstrip().endswith("following the system contract):")
+
+
+def test_system_message_is_reused_byte_for_byte():
+    processor = LLMProcessor("http://127.0.0.1:9")
+
+    first = processor._messages_for("a?", DOCUMENTS, "acme")[0]
+    second = processor._messages_for("b?", DOCUMENTS[:1], "acme", conversation_context="earlier")[0]
+
+    assert first is second
+    assert "'acme' profile ONLY" in first["content"]
+
+
+def test_prompt_size_goes_to_the_metrics_registry():
+    processor = LLMProcessor("http://127.0.0.1:9")
+    before = "\n".join(LLM_PROMPT_TOKENS.expose())
+
+    processor._messages_for("Do you sell anvils?", DOCUMENTS, "acme")
+
+    after = "\n".join(LLM_PROMPT_TOKENS.expose())
+    assert after != before
+    assert 'llm_prompt_tokens_count{client_id="unknown"}' in after  # "acme" is not a configured client
+
+
+OUT_OF_SCOPE = ("This question is not within the scope of the selected client. "
+                "Would you like me to perform a web search for this instead?")
+NOT_FOUND_DOCUMENTS = [("The provided context does not contain information about this.", 0.5)]
+
+
+def test_sync_calls_reuse_one_connection(fake_ollama):
+    processor = LLMProcessor(fake_ollama)
+
+    answers = [processor.process_query("Do you sell anvils?", DOCUMENTS, "acme") for _ in range(3)]
+
+    assert answers == ["- Acme sells anvils."] * 3
+    connections = processor.stats()["connections"]
+    assert connections["requests"] == 3
+    assert connections["connections_opened"] == 1
+    assert connections["reuse_rate"] == 1 - 1 / 3
+    assert connections["connect_ms_avg"] > 0
+    assert processor.stats()["calls"] == 3  # Ollama timings recorded for each answer
+
+
+def test_async_calls_reuse_one_connection_per_event_loop(fake_ollama):
+    processor = LLMProcessor(fake_ollama)
+
+    async def ask_twice():
+        answers = [await processor.process_query_async("Do you sell anvils?", DOCUMENTS, "acme") for _ in range(2)]
+        await processor.client.aclose()
+        return answers
+
+    assert asyncio.run(ask_twice()) == ["- Acme sells anvils."] * 2
+    assert processor.client.stats.snapshot()["connections_opened"] == 1
+
+    asyncio.run(ask_twice())  # a new event loop gets its own client and connection
+    assert processor.client.stats.snapshot()["connections_opened"] == 2
+    assert processor.client.stats.snapshot()["requests"] == 4
+
+
+def test_async_path_returns_the_same_not_found_message_as_sync(fake_ollama):
+    processor = LLMProcessor(fake_ollama)
+
+    sync_answer = processor.process_query("Where is the moon?", NOT_FOUND_DOCUMENTS, "acme")
+
+    async def ask():
+        try:
+            return await processor.process_query_async("Where is the moon?", NOT_FOUND_DOCUMENTS, "acme")
+        finally:
+            await processor.client.aclose()
+
+    assert asyncio.run(ask()) == sync_answer == OUT_OF_SCOPE
+
+
+def test_async_path_without_context_does_not_call_ollama(fake_ollama):
+    processor = LLMProcessor(fake_ollama)
+
+    assert asyncio.run(processor.process_query_async("Where is the moon?", [], "acme")) == OUT_OF_SCOPE
+    assert processor.client.stats.snapshot()["requests"] == 0
+
+
+def test_unreachable_ollama_gives_the_same_error_sync_and_async():
+    processor = LLMProcessor("http://127.0.0.1:9")
+
+    sync_answer = processor.process_query("Do you sell anvils?", DOCUMENTS, "acme")
+    async_answer = asyncio.run(processor.process_query_async("Do you sell anvils?", DOCUMENTS, "acme"))
+
+    assert sync_answer == async_answer == "ERROR: LLM service is not running. Ensure Ollama is running: ollama serve"
+    assert processor.client.stats.snapshot()["failures"] == 2
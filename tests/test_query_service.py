@@ -0,0 +1,46 @@
+import numpy as np
+
+from src.profiles.loader import RetrievalResult
+from src.services import query_service
+from src.services.query_service import QueryService
+
+
+class FakeStore:
+    version = 1
+
+    def search_batch(self, queries):
+        return [RetrievalResult(np.zeros(4, "float32"), [i], [(q, 0.9)]) for i, q in enumerate(queries)]
+
+    def match_faq(self, query, query_embedding=None):
+        if query == "faq boom":
+            raise RuntimeError("faq index unreadable")
+        return None
+
+
+def test_batch_isolates_per_item_failures(monkeypatch):
+    monkeypatch.setattr(query_service.profile_manager, "load_profile", lambda client_id: FakeStore())
+
+    def pack(client_id, store, retrieval):
+        if retrieval.documents[0][0] == "pack boom":
+            raise ValueError("cannot pack")
+        return retrieval
+
+    def answer(client_id, store, query, retrieval, context, priority):
+        if query == "llm boom":
+            raise RuntimeError("llm down")
+        return f"answer to {query}", "llm"
+
+    monkeypatch.setattr(query_service.context_packer, "pack", pack)
+    monkeypatch.setattr(QueryService, "_answer", staticmethod(answer))
+
+    response = QueryService.process_batch({
+        "client_id": "plambo",
+        "queries": ["ok one", "faq boom", "", "pack boom", {"query": "llm boom"}, "ok two"],
+    })
+
+    statuses = [(r["index"], r["status"]) for r in response["results"]]
+    assert statuses == [(0, "success"), (1, "error"), (2, "error"), (3, "error"), (4, "error"), (5, "success")]
+    assert response["results"][1]["message"] == "faq index unreadable"
+    assert response["results"][3]["message"] == "cannot pack"
+    assert response["results"][5]["answer"] == "answer to ok two"
+    assert (response["total"], response["succeeded"], response["failed"]) == (6, 2, 4)
@@ -0,0 +1,109 @@
+import datetime
+
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.data_analysis_dckdb.question_parser import QuestionParser
+
+ROWS = {
+    "brand": ["Acme", "Acme", "Globex", "Initech"],
+    "sector": ["Technology", "Retail", "Technology", "Retail"],
+    "salesman": ["Ravi", "Asha", "Ravi", "Meera"],
+    "date": [datetime.date(2024, 1, 3), datetime.date(2024, 1, 1), datetime.date(2024, 1, 2),
+             datetime.date(2024, 1, 1)],
+    "year": [2024, 2023, 2024, 2023],
+    "amount": [100.0, 50.0, 300.0, 25.0],
+    "volume": [1, 2, 3, 4],
+}
+HISTORY_FILTERED = {"0101": ("amount for technology sector", {
+    "sql_query": "select round(sum(\"amount\"), 2) from parquet_data where lower(\"sector\") = 'technology';"})}
+HISTORY_PLAIN = {"0101": ("total amount by brand", {
+    "sql_query": "select \"brand\", sum(\"amount\") from parquet_data group by \"brand\";"})}
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = str(tmp_path / "sales.parquet")
+    table = pa.table(ROWS)
+    pq.write_table(table, path)
+    return table.schema, path
+
+
+@pytest.fixture
+def parser():
+    return QuestionParser(enabled=True)
+
+
+def run(response, path):
+    sql = response["sql_query"].replace("parquet_data", f"parquet_scan('{path}')")
+    return duckdb.connect().execute(sql).fetchall()
+
+
+def test_sum_by_group_is_ordered_by_the_metric(parser, dataset):
+    schema, path = dataset
+    response = parser.parse("total amount by brand", schema, path)
+    assert run(response, path) == [("Globex", 300.0), ("Acme", 150.0), ("Initech", 25.0)]
+    assert response["col_list"] == ["brand", "amount"]
+
+
+def test_ranked_groups_with_limit(parser, dataset):
+    schema, path = dataset
+    response = parser.parse("top 1 salesman by sales", schema, path)
+    assert run(response, path) == [("Ravi", 400.0)]
+
+
+def test_distinct_values(parser, dataset):
+    schema, path = dataset
+    assert run(parser.parse("show unique sectors", schema, path), path) == [("Retail",), ("Technology",)]
+
+
+def test_filter_from_data_values(parser, dataset):
+    schema, path = dataset
+    assert run(parser.parse("amount for technology sector", schema, path), path) == [(400.0,)]
+
+
+def test_time_dimension_is_ordered_chronologically(parser, dataset):
+    schema, path = dataset
+    by_date = parser.parse("amount by date", schema, path)
+    assert [row[0] for row in run(by_date, path)] == [datetime.date(2024, 1, d) for d in (1, 2, 3)]
+    assert by_date["Possible_charts"][0] == "line"
+
+    by_year = parser.parse("total amount by year", schema, path)
+    assert run(by_year, path) == [(2023, 75.0), (2024, 400.0)]
+
+
+def test_ranking_by_time_still_orders_by_metric(parser, dataset):
+    schema, path = dataset
+    assert run(parser.parse("top 1 date by amount", schema, path), path) == [(datetime.date(2024, 1, 2), 300.0)]
+
+
+@pytest.mark.parametrize("question", [
+    "by brand",                       # needs the conversation
+    "amount by brand and salesman",   # two groupings
+    "forecast amount for next month",  # unknown words
+    "amount volume by brand",         # two metrics
+])
+def test_unclear_questions_fall_through(parser, dataset, question):
+    schema, path = dataset
+    assert parser.parse(question, schema, path) is None
+
+
+def test_follow_up_questions_go_to_the_llm(parser, dataset):
+    schema, path = dataset
+    # Would silently drop the technology filter the LLM carries over
+    assert parser.parse("total amount by brand", schema, path, HISTORY_FILTERED) is None
+    assert parser.parse("now total amount by brand", schema, path, HISTORY_PLAIN) is None
+    assert parser.stats()["follow_ups"] == 1  # the second one is not even parsed
+
+
+def test_self_contained_questions_compile_with_history(parser, dataset):
+    schema, path = dataset
+    assert parser.parse("amount for retail sector", schema, path, HISTORY_FILTERED) is not None
+    assert parser.parse("total amount by salesman", schema, path, HISTORY_PLAIN) is not None
+
+
+def test_disabled_parser_compiles_nothing(dataset):
+    schema, path = dataset
+    assert QuestionParser(enabled=False).parse("total amount by brand", schema, path) is None
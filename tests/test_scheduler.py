@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+from src.llm.scheduler import BATCH, INTERACTIVE, LLMScheduler
+from src.utils.errors import QueueFullError
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def queue_waiter(scheduler, priority, outcomes, name):
+    """Start a thread that waits for a slot and records admitted / rejected"""
+
+    def run():
+        try:
+            admitted_at = scheduler.acquire(priority)
+        except QueueFullError:
+            outcomes[name] = "rejected"
+            return
+        outcomes[name] = "admitted"
+        scheduler.release(admitted_at)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_free_slot_admits_immediately():
+    scheduler = LLMScheduler(concurrency=2, max_queue=0)
+    with scheduler.slot():
+        with scheduler.slot(BATCH):
+            assert scheduler.stats()["running"] == 2
+    assert scheduler.stats()["running"] == 0
+
+
+def test_full_queue_rejects_equal_priority_fast():
+    scheduler = LLMScheduler(concurrency=1, max_queue=1, queue_timeout=5)
+    held = scheduler.acquire()
+    outcomes = {}
+    waiter = queue_waiter(scheduler, INTERACTIVE, outcomes, "first")
+    wait_for(lambda: scheduler.stats()["queue_depth"] == 1)
+
+    with pytest.raises(QueueFullError) as error:
+        scheduler.acquire(INTERACTIVE)
+    with pytest.raises(QueueFullError):
+        scheduler.ensure_capacity(INTERACTIVE)
+
+    assert error.value.retry_after >= 1
+    scheduler.release(held)
+    waiter.join(2)
+    assert outcomes == {"first": "admitted"}
+
+
+def test_interactive_call_displaces_newest_batch_waiter():
+    scheduler = LLMScheduler(concurrency=1, max_queue=2, queue_timeout=5)
+    held = scheduler.acquire()
+    outcomes = {}
+    old_batch = queue_waiter(scheduler, BATCH, outcomes, "old_batch")
+    wait_for(lambda: scheduler.stats()["queue_depth"] == 1)
+    new_batch = queue_waiter(scheduler, BATCH, outcomes, "new_batch")
+    wait_for(lambda: scheduler.stats()["queue_depth"] == 2)
+
+    scheduler.ensure_capacity(INTERACTIVE)  # room can be made
+    with pytest.raises(QueueFullError):
+        scheduler.ensure_capacity(BATCH)
+    interactive = queue_waiter(scheduler, INTERACTIVE, outcomes, "interactive")
+    new_batch.join(2)
+    assert outcomes == {"new_batch": "rejected"}
+
+    scheduler.release(held)
+    for thread in (old_batch, interactive):
+        thread.join(2)
+    assert outcomes == {"new_batch": "rejected", "interactive": "admitted", "old_batch": "admitted"}
+    stats = scheduler.stats()
+    assert (stats["displaced"], stats["rejected"], stats["admitted"]) == (1, 1, 3)
+
+
+def test_interactive_overtakes_batch_in_queue():
+    scheduler = LLMScheduler(concurrency=1, max_queue=4, queue_timeout=5)
+    held = scheduler.acquire()
+    order = []
+
+    def run(priority, name):
+        with scheduler.slot(priority):
+            order.append(name)
+
+    threads = [threading.Thread(target=run, args=(BATCH, "batch"), daemon=True)]
+    threads[0].start()
+    wait_for(lambda: scheduler.stats()["queue_depth"] == 1)
+    threads.append(threading.Thread(target=run, args=(INTERACTIVE, "interactive"), daemon=True))
+    threads[1].start()
+    wait_for(lambda: scheduler.stats()["queue_depth"] == 2)
+
+    scheduler.release(held)
+    for thread in threads:
+        thread.join(2)
+    assert order == ["interactive", "batch"]
+
+
+def test_waiter_times_out():
+    scheduler = LLMScheduler(concurrency=1, max_queue=1, queue_timeout=0.05)
+    held = scheduler.acquire()
+    with pytest.raises(QueueFullError):
+        scheduler.acquire()
+    assert scheduler.stats()["timed_out"] == 1 and scheduler.stats()["queue_depth"] == 0
+    scheduler.release(held)
@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+
+from src.llm import semantic_cache as semantic_cache_module
+from src.llm.semantic_cache import SemanticCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(semantic_cache_module, "time", clock)
+    return clock
+
+
+def vec(*values):
+    vector = np.zeros(8, dtype="float32")
+    vector[:len(values)] = values
+    return vector
+
+
+def make_cache(**kwargs):
+    return SemanticCache(**{"max_distance": 0.1, "ttl_seconds": 60, "max_entries": 10, "enabled": True, **kwargs})
+
+
+def test_hit_needs_same_chunks_and_context(clock):
+    cache = make_cache()
+    cache.store("acme", 1, vec(1), [3, 1], "answer", conversation_context="ctx")
+
+    assert cache.lookup("acme", 1, vec(1), [1, 3], conversation_context="ctx") == "answer"  # order does not matter
+    assert cache.lookup("acme", 1, vec(1), [1, 3, 4], conversation_context="ctx") is None
+    assert cache.lookup("acme", 1, vec(1), [1, 3]) is None
+    assert cache.lookup("other", 1, vec(1), [1, 3], conversation_context="ctx") is None
+
+
+def test_distance_threshold(clock):
+    cache = make_cache()
+    cache.store("acme", 1, vec(1), [1], "answer")
+
+    assert cache.lookup("acme", 1, vec(1, 0.3), [1]) == "answer"  # cosine distance ~0.04
+    assert cache.lookup("acme", 1, vec(1, 1), [1]) is None  # cosine distance ~0.29
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_closest_entry_wins(clock):
+    cache = make_cache()
+    cache.store("acme", 1, vec(1, 0.2), [1], "farther")
+    cache.store("acme", 1, vec(1), [1], "closer")
+
+    assert cache.lookup("acme", 1, vec(1, 0.05), [1]) == "closer"
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = make_cache(ttl_seconds=60)
+    cache.store("acme", 1, vec(1), [1], "answer")
+
+    clock.now += 59
+    assert cache.lookup("acme", 1, vec(1), [1]) == "answer"
+    clock.now += 2
+    assert cache.lookup("acme", 1, vec(1), [1]) is None
+    assert cache.stats()["entries"] == {"acme": 0}
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = make_cache(max_entries=2)
+    cache.store("acme", 1, vec(1), [1], "one")
+    cache.store("acme", 1, vec(1), [2], "two")
+    assert cache.lookup("acme", 1, vec(1), [1]) == "one"  # "two" is now least recently used
+
+    cache.store("acme", 1, vec(1), [3], "three")
+
+    assert cache.lookup("acme", 1, vec(1), [2]) is None
+    assert cache.lookup("acme", 1, vec(1), [1]) == "one"
+    assert cache.lookup("acme", 1, vec(1), [3]) == "three"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_new_version_drops_old_entries(clock):
+    cache = make_cache()
+    cache.store("acme", 1, vec(1), [1], "old")
+
+    assert cache.lookup("acme", 2, vec(1), [1]) is None
+    assert cache.lookup("acme", 1, vec(1), [1]) is None
+
+
+def test_calls_with_an_older_version_do_not_reset_the_cache(clock):
+    cache = make_cache()
+    cache.store("acme", 2, vec(1), [1], "new")
+
+    # A request still running on the store a hot reload replaced
+    assert cache.lookup("acme", 1, vec(1), [1]) is None
+    cache.store("acme", 1, vec(1), [1], "old")
+
+    assert cache.lookup("acme", 2, vec(1), [1]) == "new"
+    assert cache.stats()["stale_calls"] == 2
+
+
+def test_invalidate_keeps_the_version_floor(clock):
+    cache = make_cache()
+    cache.store("acme", 2, vec(1), [1], "new")
+    cache.invalidate("acme")
+
+    cache.store("acme", 1, vec(1), [1], "old")
+
+    assert cache.stats()["entries"] == {}
+    assert cache.lookup("acme", 2, vec(1), [1]) is None
+
+
+def test_disabled_cache_stores_nothing(clock):
+    cache = make_cache(enabled=False)
+    cache.store("acme", 1, vec(1), [1], "answer")
+
+    assert cache.lookup("acme", 1, vec(1), [1]) is None
+    assert cache.stats()["entries"] == {}
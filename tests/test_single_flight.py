@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+from src.utils.single_flight import SingleFlight
+
+
+def _run_concurrently(flight, key, func, n=5):
+    """Start n threads calling flight.do(key, func); returns (threads, results, errors)."""
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(flight.do(key, func))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+
+def _wait_for_callers(flight, n):
+    for _ in range(200):
+        if flight.calls >= n:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("callers never arrived")
+
+
+def test_concurrent_calls_collapse_into_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def func():
+        runs.append(1)
+        release.wait(5)
+        return "answer"
+
+    threads, results, errors = _run_concurrently(flight, "q", func)
+    _wait_for_callers(flight, 5)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert results == ["answer"] * 5
+    assert errors == []
+    assert len(runs) == 1
+    assert flight.stats()["executions"] == 1
+    assert flight.stats()["collapsed"] == 4
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_exception_is_shared_with_waiters():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def func():
+        release.wait(5)
+        raise ValueError("boom")
+
+    threads, results, errors = _run_concurrently(flight, "q", func, n=3)
+    _wait_for_callers(flight, 3)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert results == []
+    assert len(errors) == 3
+    assert all(isinstance(e, ValueError) for e in errors)
+    assert flight.executions == 1
+
+
+def test_results_are_not_cached():
+    flight = SingleFlight()
+    counter = iter(range(10))
+
+    assert flight.do("q", lambda: next(counter)) == 0
+    assert flight.do("q", lambda: next(counter)) == 1
+    assert flight.executions == 2
+    assert flight.collapsed == 0
+
+
+def test_different_keys_run_independently():
+    flight = SingleFlight()
+
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.stats()["collapse_rate"] == 0.0
+
+
+def test_key_is_released_after_failure():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("down")
+
+    with pytest.raises(RuntimeError):
+        flight.do("q", fail)
+    assert flight.do("q", lambda: "ok") == "ok"
+    assert flight.stats()["in_flight"] == 0
@@ -0,0 +1,98 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.data_analysis_dckdb.sql_cache import SqlCache, cache_key, normalize_question
+
+SCHEMA = pa.schema([("brand", pa.string()), ("amount", pa.float64())])
+RESPONSE = {
+    "Title": "Amount by Brand",
+    "sql_query": "select brand, sum(amount) as total_amount from parquet_data group by brand;",
+    "col_list": ["brand", "amount"],
+}
+HISTORY = {"0101": ("show brands", {"sql_query": "select distinct brand from parquet_data;", "success": [{}]})}
+
+
+@pytest.fixture
+def parquet_path(tmp_path):
+    path = str(tmp_path / "sales.parquet")
+    pq.write_table(pa.table({"brand": ["a", "b"], "amount": [1.0, 2.0]}, schema=SCHEMA), path)
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SqlCache(path=str(tmp_path / "sql_cache.sqlite"), memory_entries=2, disk_entries=3, ttl_seconds=60)
+
+
+def test_normalize_question_ignores_case_spacing_and_trailing_punctuation():
+    assert normalize_question("  Total Amount  by Brand? ") == normalize_question("total amount by brand")
+    assert normalize_question("amount for 3.5 units") == "amount for 3.5 units"
+
+
+def test_key_covers_every_prompt_input():
+    base = cache_key("total amount by brand", SCHEMA, HISTORY, [("q", "select 1")], prompt_version=2)
+    assert base == cache_key("Total amount by brand?", SCHEMA, HISTORY, [("q", "select  1")], prompt_version=2)
+    other_schema = pa.schema([("brand", pa.string()), ("amount", pa.int64())])
+    assert base != cache_key("total amount by brand", other_schema, HISTORY, [("q", "select 1")], prompt_version=2)
+    assert base != cache_key("total amount by brand", SCHEMA, {}, [("q", "select 1")], prompt_version=2)
+    assert base != cache_key("total amount by brand", SCHEMA, HISTORY, [], prompt_version=2)
+    assert base != cache_key("total amount by brand", SCHEMA, HISTORY, [("q", "select 1")], prompt_version=3)
+
+
+def test_history_result_rows_do_not_change_the_key():
+    other_rows = {"0101": ("show brands", {"sql_query": "select distinct brand from parquet_data;",
+                                           "success": [{"brand": "x"}]})}
+    assert cache_key("q", SCHEMA, HISTORY) == cache_key("q", SCHEMA, other_rows)
+
+
+def test_round_trip_strips_result_fields(cache, parquet_path):
+    key = cache_key("total amount by brand", SCHEMA, None)
+    assert cache.get(key, SCHEMA, parquet_path) is None
+
+    cache.put(key, dict(RESPONSE, success=[{"brand": "a"}], question="total amount by brand"))
+    cached = cache.get(key, SCHEMA, parquet_path)
+
+    assert cached == RESPONSE
+    cached["Title"] = "changed"
+    assert cache.get(key, SCHEMA, parquet_path)["Title"] == "Amount by Brand"
+    assert cache.stats()["memory_hits"] == 2 and cache.stats()["misses"] == 1
+
+
+def test_entries_survive_a_restart(cache, parquet_path):
+    cache.put("k", RESPONSE)
+    reopened = SqlCache(path=cache.path, ttl_seconds=60)
+
+    assert reopened.get("k", SCHEMA, parquet_path) == RESPONSE
+    assert reopened.stats()["disk_hits"] == 1
+
+
+def test_query_that_no_longer_plans_is_dropped(cache, parquet_path):
+    cache.put("missing_column", dict(RESPONSE, col_list=["brand", "region"]))
+    cache.put("bad_sql", dict(RESPONSE, sql_query="select nope from parquet_data"))
+
+    assert cache.get("missing_column", SCHEMA, parquet_path) is None
+    assert cache.get("bad_sql", SCHEMA, parquet_path) is None
+    assert cache.stats()["stale"] == 2 and cache.stats()["disk_entries"] == 0
+
+
+def test_expired_entries_are_misses(tmp_path, parquet_path):
+    cache = SqlCache(path=str(tmp_path / "ttl.sqlite"), ttl_seconds=-1)
+    cache.put("k", RESPONSE)
+    assert cache.get("k", SCHEMA, parquet_path) is None
+
+
+def test_tiers_evict_least_recently_used(cache, parquet_path):
+    for key in ("a", "b", "c", "d"):
+        cache.put(key, RESPONSE)
+
+    stats = cache.stats()
+    assert (stats["memory_entries"], stats["disk_entries"]) == (2, 3)
+    assert cache.get("a", SCHEMA, parquet_path) is None
+    assert cache.get("b", SCHEMA, parquet_path) == RESPONSE
+
+
+def test_disabled_cache_stores_nothing(tmp_path, parquet_path):
+    cache = SqlCache(path=str(tmp_path / "off.sqlite"), enabled=False)
+    cache.put("k", RESPONSE)
+    assert cache.get("k", SCHEMA, parquet_path) is None
@@ -0,0 +1,149 @@
+import threading
+from types import SimpleNamespace
+
+import pyarrow as pa
+import pytest
+
+from src.data_analysis_dckdb import sql_examples as module
+from src.data_analysis_dckdb.sql_cache import schema_fingerprint
+from src.data_analysis_dckdb.sql_examples import SqlExampleIndex, compact_history, format_examples
+from tests.conftest import FakeEncoder
+
+SALES = pa.schema([("brand", pa.string()), ("amount", pa.float64())])
+HR = pa.schema([("department", pa.string()), ("salary", pa.float64())])
+BY_BRAND = {"sql_query": "select brand, sum(amount)\n from parquet_data group by brand"}
+
+
+class FakeDb:
+    """connect_engine / fetch_data / disconnect_engine over canned Session_Management rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def connect_engine(self):
+        return "connection", 1
+
+    def disconnect_engine(self, connect):
+        pass
+
+    def fetch_data(self, query, connect):
+        return SimpleNamespace(itertuples=lambda: iter(self.rows)), 1
+
+
+@pytest.fixture
+def index(monkeypatch):
+    monkeypatch.setattr(module, "embedding_service", FakeEncoder())
+    examples = SqlExampleIndex(top_k=2, min_similarity=-1.0, refresh_seconds=3600)
+    # No background thread in tests; refresh() is called directly where needed
+    monkeypatch.setattr(examples, "start", lambda: None)
+    return examples
+
+
+def test_compact_history_keeps_question_and_sql_only():
+    history = {"2": ("by brand", dict(BY_BRAND, success=[{"brand": "a"}] * 100)), "1": ("hi", "not a dict")}
+    pairs = compact_history(history)
+    assert pairs == [("by brand", "select brand, sum(amount) from parquet_data group by brand")]
+    assert format_examples(pairs) == "Q: by brand\nSQL: select brand, sum(amount) from parquet_data group by brand"
+    assert format_examples([]) == "None"
+
+
+def test_examples_are_scoped_to_user_and_schema(index):
+    index.add("total amount by brand", BY_BRAND, SALES, "alice")
+    index.add("salary by department", {"sql_query": "select department, sum(salary) from parquet_data"}, HR, "alice")
+    index.add("amount for acme brand", {"sql_query": "select sum(amount) where brand = 'acme'"}, SALES, "bob")
+    index._drain_pending()
+
+    assert index.similar("amount by brand", SALES, "alice") == [
+        ("total amount by brand", "select brand, sum(amount) from parquet_data group by brand")]
+    assert [q for q, _ in index.similar("amount by brand", SALES, "bob")] == ["amount for acme brand"]
+    assert index.similar("amount by brand", SALES, "carol") == []
+
+
+def test_most_similar_first_and_history_excluded(index):
+    index.add("total amount by brand", BY_BRAND, SALES, "alice")
+    index.add("average amount", {"sql_query": "select avg(amount) from parquet_data"}, SALES, "alice")
+    index._drain_pending()
+
+    assert index.similar("total amount by brand", SALES, "alice")[0][0] == "total amount by brand"
+    excluded = index.similar("total amount by brand", SALES, "alice",
+                             exclude=[("q", "select brand, sum(amount) from parquet_data group by brand")])
+    assert excluded == [("average amount", "select avg(amount) from parquet_data")]
+
+
+def test_refresh_loads_stored_pairs_and_skips_unscoped_ones(index):
+    fingerprint = schema_fingerprint(SALES)
+    index.connection = index.db_funct = FakeDb([
+        SimpleNamespace(user_id="alice", question="top brands", sql_query="select brand from parquet_data",
+                        schema_fingerprint=fingerprint),
+        SimpleNamespace(user_id="alice", question="legacy", sql_query="select 1", schema_fingerprint=None),
+    ])
+
+    index.refresh()
+    index.refresh()  # nothing new is embedded twice
+
+    assert index.stats()["examples"] == 1 and index.stats()["loaded"]
+    assert index.similar("brands", SALES, "alice") == [("top brands", "select brand from parquet_data")]
+
+
+def test_lookup_never_waits_for_the_store(monkeypatch):
+    monkeypatch.setattr(module, "embedding_service", FakeEncoder())
+    release = threading.Event()
+    examples = SqlExampleIndex(refresh_seconds=3600)
+    monkeypatch.setattr(examples, "refresh", release.wait)  # a slow Postgres read + embed
+
+    assert examples.similar("amount by brand", SALES, "alice") == []
+    assert examples._thread is not None and examples._thread.is_alive()
+    release.set()
+
+
+def test_disabled_index_returns_nothing(index):
+    index.enabled = False
+    index.add("total amount by brand", BY_BRAND, SALES, "alice")
+    index._drain_pending()
+    assert index.similar("total amount by brand", SALES, "alice") == []
+
+
+def test_add_does_not_embed_on_the_request_thread(index, monkeypatch):
+    encoder = FakeEncoder()
+    monkeypatch.setattr(module, "embedding_service", encoder)
+
+    index.add("total amount by brand", BY_BRAND, SALES, "alice")
+
+    assert encoder.calls == [] and index.stats()["pending"] == 1
+    index._drain_pending()
+    assert encoder.calls == [["total amount by brand"]] and index.stats()["examples"] == 1
+
+
+def test_background_thread_embeds_added_pairs(monkeypatch):
+    monkeypatch.setattr(module, "embedding_service", FakeEncoder())
+    examples = SqlExampleIndex(min_similarity=-1.0, refresh_seconds=3600)
+    monkeypatch.setattr(examples, "refresh", lambda: None)
+
+    examples.add("total amount by brand", BY_BRAND, SALES, "alice")
+    for _ in range(200):
+        if examples.stats()["examples"]:
+            break
+        threading.Event().wait(0.01)
+
+    assert examples.similar("amount by brand", SALES, "alice")[0][0] == "total amount by brand"
+
+
+class FailingEncoder(FakeEncoder):
+    def encode_documents(self, texts, batch_size: int = 64):
+        raise RuntimeError("encoder out of memory")
+
+
+def test_pairs_whose_embedding_failed_are_retried_by_refresh(index, monkeypatch):
+    monkeypatch.setattr(module, "embedding_service", FailingEncoder())
+    index.add("top brands", {"sql_query": "select brand from parquet_data"}, SALES, "alice")
+    index._drain_pending()
+    assert index.stats()["examples"] == 0 and index.stats()["add_failures"] == 1
+
+    monkeypatch.setattr(module, "embedding_service", FakeEncoder())
+    index.connection = index.db_funct = FakeDb([
+        SimpleNamespace(user_id="alice", question="top brands", sql_query="select brand from parquet_data",
+                        schema_fingerprint=schema_fingerprint(SALES)),
+    ])
+    index.refresh()
+
+    assert index.similar("brands", SALES, "alice") == [("top brands", "select brand from parquet_data")]
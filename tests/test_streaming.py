@@ -0,0 +1,180 @@
+import json
+
+import numpy as np
+import pytest
+
+from scripts import fake_ollama
+from src.llm.processor import LLMProcessor
+from src.llm.scheduler import LLMScheduler
+from src.llm.semantic_cache import SemanticCache
+from src.profiles.loader import RetrievalResult
+from src.services import query_service
+from src.services.query_service import QueryService
+from src.utils.errors import QueueFullError
+
+OUT_OF_SCOPE = ("This question is not within the scope of the selected client. "
+                "Would you like me to perform a web search for this instead?")
+DOCUMENTS = [("Acme sells anvils.", 0.9)]
+
+
+class BrokenStreamHandler(fake_ollama.FakeOllamaHandler):
+    """Drops the connection after a few streamed chunks, as a crashed Ollama would"""
+
+    def _send_chunk(self, body: dict):
+        self.sent = getattr(self, "sent", 0) + 1
+        if self.sent > 3:
+            raise ConnectionResetError("ollama crashed")
+        super()._send_chunk(body)
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    """Start a fake Ollama that streams the given answer; returns its base URL"""
+    servers = []
+
+    def start(answer: str, handler=fake_ollama.FakeOllamaHandler) -> str:
+        monkeypatch.setattr(fake_ollama, "_answer_for", lambda prompt: answer)
+        server = fake_ollama.start_fake_ollama(0, handler=handler)
+        servers.append(server)
+        host, port = server.server_address
+        return f"http://{host}:{port}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def stream(url: str):
+    return list(LLMProcessor(url).stream_query("Do you sell anvils?", DOCUMENTS, "acme"))
+
+
+def test_normal_answer_is_streamed_in_order(ollama):
+    answer = "- Acme sells anvils.\n- They ship in three days and accept returns for thirty days."
+    events = stream(ollama(answer))
+
+    assert {event for event, _ in events} == {"token"}
+    assert "".join(text for _, text in events) == answer
+    assert len(events) > 2  # text after the held-back prefix arrives token by token
+
+
+def test_not_found_in_prefix_stops_early(ollama):
+    events = stream(ollama("- The provided context does not contain information about anvils.\n- " + "filler " * 50))
+
+    assert events == [("token", OUT_OF_SCOPE)]
+
+
+def test_not_found_only_at_the_end_sends_a_correction(ollama):
+    answer = "- Acme sells anvils.\n- However, the context does not say what they cost."
+    events = stream(ollama(answer))
+
+    assert events[-1] == ("correction", OUT_OF_SCOPE)
+    assert "".join(text for event, text in events if event == "token") == answer
+
+
+def test_short_answer_is_checked_when_the_stream_ends(ollama):
+    events = stream(ollama("- No mention of anvils."))
+
+    assert events == [("token", OUT_OF_SCOPE)]
+
+
+def test_upstream_error_mid_stream(ollama):
+    events = stream(ollama("- Acme sells anvils.\n- " + "more " * 40, handler=BrokenStreamHandler))
+
+    assert events[-1][0] == "error"
+    assert events[-1][1].startswith("ERROR: LLM processing failed")
+
+
+def test_unreachable_ollama_is_an_error_event():
+    events = list(LLMProcessor("http://127.0.0.1:9").stream_query("q", DOCUMENTS, "acme"))
+
+    assert events == [("error", "ERROR: LLM service is not running. Ensure Ollama is running: ollama serve")]
+
+
+def test_no_context_never_calls_ollama():
+    processor = LLMProcessor("http://127.0.0.1:9")
+
+    assert list(processor.stream_query("q", [], "acme")) == [("token", OUT_OF_SCOPE)]
+    assert processor.client.stats.snapshot()["requests"] == 0
+
+
+class FakeStore:
+    version = 1
+
+    def match_faq(self, query, query_embedding=None):
+        return None
+
+    def search(self, query):
+        return RetrievalResult(np.ones(4, dtype="float32"), [7], list(DOCUMENTS))
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """QueryService wired to a fake store, a private semantic cache and a one-slot scheduler"""
+    cache = SemanticCache(enabled=True)
+    scheduler = LLMScheduler(concurrency=1, max_queue=0)
+    monkeypatch.setattr(query_service.profile_manager, "load_profile", lambda client_id: FakeStore())
+    monkeypatch.setattr(query_service.context_packer, "pack", lambda client_id, store, retrieval: retrieval)
+    monkeypatch.setattr(query_service, "semantic_cache", cache)
+    monkeypatch.setattr(query_service, "llm_scheduler", scheduler)
+
+    def use(url):
+        monkeypatch.setattr(query_service, "llm_processor", LLMProcessor(url))
+
+    return cache, scheduler, use
+
+
+def sse(frames):
+    events = []
+    for frame in frames:
+        name, data = frame.strip().split("\n")
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_completed_stream_is_cached_and_replayed(ollama, service):
+    cache, scheduler, use = service
+    use(ollama("- Acme sells anvils.\n- Anvils ship in three days."))
+    payload = {"client_id": "acme", "query": "Do you sell anvils?"}
+
+    first = sse(QueryService.stream(payload))
+    second = sse(QueryService.stream(payload))
+
+    assert first[-1][0] == "done"
+    assert first[-1][1]["answer"] == "- Acme sells anvils.\n- Anvils ship in three days."
+    assert first[-1][1]["answer_source"] == "llm"
+    assert first[-1][1]["time_to_first_token_ms"] is not None
+    assert second[-1][1]["answer_source"] == "semantic_cache"
+    assert second[-1][1]["answer"] == first[-1][1]["answer"]
+    assert scheduler.metrics["admitted"] == 1
+
+
+def test_correction_replaces_the_streamed_answer(ollama, service):
+    cache, _, use = service
+    use(ollama("- Acme sells anvils.\n- However, the context does not say what they cost."))
+
+    events = sse(QueryService.stream({"client_id": "acme", "query": "How much is an anvil?"}))
+
+    assert ("correction", {"answer": OUT_OF_SCOPE}) in events
+    assert events[-1][1]["answer"] == OUT_OF_SCOPE
+    assert cache.lookup("acme", 1, np.ones(4, dtype="float32"), [7]) == OUT_OF_SCOPE
+
+
+def test_failed_stream_is_not_cached(ollama, service):
+    cache, scheduler, use = service
+    use(ollama("- Acme sells anvils.\n- " + "more " * 40, handler=BrokenStreamHandler))
+
+    events = sse(QueryService.stream({"client_id": "acme", "query": "Do you sell anvils?"}))
+
+    assert events[-1][1]["status"] == "error"
+    assert cache.lookup("acme", 1, np.ones(4, dtype="float32"), [7]) is None
+    assert scheduler.stats()["running"] == 0  # the slot is released even though the stream failed
+
+
+def test_full_queue_is_rejected_before_the_response_starts(service):
+    _, scheduler, use = service
+    use("http://127.0.0.1:9")
+    scheduler.acquire()  # the only slot is busy and no one may queue
+
+    with pytest.raises(QueueFullError):
+        QueryService.stream({"client_id": "acme", "query": "Do you sell anvils?"})
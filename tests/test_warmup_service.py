@@ -0,0 +1,61 @@
+import pytest
+
+from src.config.settings import EMBEDDING_BACKEND
+from src.services import warmup_service as warmup_module
+from src.services.warmup_service import WarmupService
+from tests.conftest import FakeEncoder
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    """Two clients: 'good' on the default encoder, 'custom' on its own backend and without a built index"""
+    monkeypatch.setattr(warmup_module, "CLIENTS", {"good": {}, "custom": {"embedding_backend": "onnx-int8"}})
+    encoders = {}
+    monkeypatch.setattr(warmup_module, "get_embedding_service",
+                        lambda backend=None: encoders.setdefault(backend, FakeEncoder(backend=backend)))
+
+    class Store:
+        def search(self, query):
+            return []
+
+    def get_store(profile_id):
+        if profile_id == "custom":
+            raise FileNotFoundError("Vector store not found for profile 'custom'")
+        return Store()
+
+    monkeypatch.setattr(warmup_module.profile_manager, "get_store", get_store)
+    monkeypatch.setattr(warmup_module.llm_processor, "warm_up", lambda: None)
+    return encoders
+
+
+def warm(service):
+    service.start()
+    service._thread.join(5)
+    return service
+
+
+def test_each_client_backend_is_warmed(clients):
+    service = warm(WarmupService(enabled=True, required_profiles=[]))
+
+    assert set(clients) == {EMBEDDING_BACKEND, "onnx-int8"}
+    assert service.components[f"embedding_model:{EMBEDDING_BACKEND}"]["status"] == "ready"
+    assert service.components["embedding_model:onnx-int8"]["status"] == "ready"
+
+
+def test_failed_optional_profile_degrades_instead_of_blocking_readiness(clients):
+    service = warm(WarmupService(enabled=True, required_profiles=[]))
+
+    assert service.is_ready()
+    assert service.degraded_components() == ["profile:custom"]
+    assert service.report()["components"]["profile:custom"]["status"] == "failed"
+
+
+def test_failed_required_profile_blocks_readiness(clients):
+    service = warm(WarmupService(enabled=True, required_profiles=["custom"]))
+
+    assert not service.is_ready()
+    assert service.degraded_components() == []
+
+
+def test_disabled_warmup_is_ready_immediately():
+    assert WarmupService(enabled=False).is_ready()